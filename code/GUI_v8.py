@@ -5,9 +5,16 @@ Created on Tue Jul 15 22:21:17 2025
 @author: 11748
 """
 
+import time
+_STARTUP_T0 = time.perf_counter()
+_STARTUP_MARKS = []
+
 import sys
 import os
-import cv2
+import argparse
+import importlib
+import threading
+from collections import OrderedDict
 import json
 import yaml
 import tempfile
@@ -15,13 +22,260 @@ import subprocess
 from datetime import datetime
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton, QLabel, QFileDialog,
                              QStackedWidget, QGraphicsView, QGraphicsScene, QGraphicsEllipseItem, QHBoxLayout,
-                             QComboBox, QLineEdit, QMessageBox, QGraphicsPixmapItem, QSpinBox, QMenuBar, QAction, QDialog, QTextEdit)
-from PyQt5.QtGui import QPixmap, QIcon, QPalette, QImage, QColor, QPainter
-from PyQt5.QtCore import Qt, QRectF
-import numpy as np
-import time
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5.QtCore import QUrl
+                             QComboBox, QLineEdit, QMessageBox, QGraphicsPixmapItem, QSpinBox, QMenuBar, QAction, QDialog, QTextEdit, QSlider)
+from PyQt5.QtGui import QPixmap, QIcon, QPalette, QImage, QColor, QPainter, QPen
+from PyQt5.QtCore import Qt, QRectF, QTimer, QPointF, pyqtSignal
+
+
+def _startup_mark(label):
+    """记录启动阶段的时间点，配合 --profile-startup 输出"""
+    _STARTUP_MARKS.append((label, time.perf_counter()))
+
+
+class _LazyModule:
+    """首次访问属性时才导入的模块代理，cv2 和 numpy 不再拖慢启动"""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+            _startup_mark(f"import {self._name} (lazy)")
+        return getattr(self._module, attr)
+
+
+cv2 = _LazyModule('cv2')
+np = _LazyModule('numpy')
+_startup_mark("import PyQt5")
+
+# 分块金字塔的图块边长（像素）和最多缓存的图块数
+TILE_SIZE = 512
+TILE_CACHE_SIZE = 256
+
+
+class FrameRingBuffer:
+    """播放头附近已解码帧的环形缓存，由后台解码线程填充"""
+    # 损坏、无法解码的帧；播放时跳过，不会停在这里
+    UNREADABLE = object()
+
+    def __init__(self, video_path, lookahead=30, lookbehind=30):
+        self.video_path = video_path
+        self.lookahead = lookahead
+        self.lookbehind = lookbehind
+        self.capacity = lookahead + lookbehind + 8
+
+        cap = cv2.VideoCapture(video_path)
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+
+        self.frames = {}
+        self.playhead = 0
+        self.direction = 1
+        self._backfill = False
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def set_playhead(self, index, direction=None):
+        with self._cond:
+            self.playhead = max(0, min(index, self.frame_count - 1))
+            if direction is not None:
+                self.direction = direction
+            self._cond.notify_all()
+
+    def get(self, index):
+        """返回已解码的帧，尚未解码时返回 None（不阻塞界面），无法解码时返回 UNREADABLE"""
+        with self._cond:
+            return self.frames.get(index)
+
+    def _next_missing(self):
+        # 播放方向上的帧优先顺序解码；反方向的帧只在缓存不足一半时整段回填，避免逐帧 seek
+        ahead, behind = self.lookahead, self.lookbehind
+        if self.direction < 0:
+            ahead, behind = behind, ahead
+
+        hi = min(self.frame_count, self.playhead + ahead)
+        for i in range(self.playhead, hi):
+            if i not in self.frames:
+                return i
+
+        lo = max(0, self.playhead - behind)
+        first = next((j for j in range(lo, self.playhead) if j not in self.frames), None)
+        if first is None:
+            self._backfill = False
+            return None
+        if not self._backfill:
+            buffered = 0
+            while self.playhead - 1 - buffered >= lo and (self.playhead - 1 - buffered) in self.frames:
+                buffered += 1
+            if buffered >= behind // 2:
+                return None
+            self._backfill = True
+        return first
+
+    def _evict(self):
+        if len(self.frames) <= self.capacity:
+            return
+        by_distance = sorted(self.frames, key=lambda k: abs(k - self.playhead), reverse=True)
+        for k in by_distance[:len(self.frames) - self.capacity]:
+            del self.frames[k]
+
+    def _decode_loop(self):
+        cap = cv2.VideoCapture(self.video_path)
+        position = 0
+        while True:
+            with self._cond:
+                if not self._running:
+                    break
+                index = self._next_missing()
+                if index is None:
+                    self._cond.wait(0.05)
+                    continue
+
+            if index != position:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            ret, frame = cap.read()
+            at_end = False
+            if not ret:
+                # 损坏帧记为 UNREADABLE 避免反复重试；后一帧也读不到说明已到视频末尾
+                # （CAP_PROP_FRAME_COUNT 常常偏大），把帧数截到这里
+                frame = self.UNREADABLE
+                at_end = not cap.grab()
+            position = index + 1
+
+            with self._cond:
+                if at_end and index > 0:
+                    self.frame_count = index
+                    self.playhead = min(self.playhead, index - 1)
+                    for k in [k for k in self.frames if k >= index]:
+                        del self.frames[k]
+                else:
+                    self.frames[index] = frame
+                self._evict()
+                self._cond.notify_all()
+        cap.release()
+
+
+class QualityTimeline(QWidget):
+    """整段视频的似然度/跳变时间轴，基于预先聚合的 min/mean/max 金字塔，点击跳转到对应帧"""
+    frameSelected = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(160)
+        self.setMouseTracking(True)
+        self.pyramid = None
+        self.view_start = 0
+        self.view_end = 0
+        self.playhead = 0
+        self._pan_x = None
+
+    def set_pyramid(self, pyramid):
+        self.pyramid = pyramid
+        self.view_start, self.view_end = 0, pyramid['frames']
+        self.update()
+
+    def set_playhead(self, index):
+        self.playhead = index
+        self.update()
+
+    def _frame_at(self, x):
+        span = self.view_end - self.view_start
+        return int(self.view_start + x / max(self.width(), 1) * span)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.black)
+        if self.pyramid is None or self.view_end <= self.view_start:
+            painter.end()
+            return
+
+        width = self.width()
+        jump_height = 40
+        from core.trajectory import query_quality
+        lo, mean, hi, starts = query_quality(self.pyramid, self.view_start, self.view_end, width)
+        columns = len(starts)
+
+        # 每个身体部位一行，颜色取该像素列内的最低似然度：红=低，绿=高
+        likelihood = np.clip(lo[:, :, 0].T, 0, 1)
+        rgb = np.empty(likelihood.shape + (3,), dtype=np.uint8)
+        rgb[..., 0] = (255 * (1 - likelihood)).astype(np.uint8)
+        rgb[..., 1] = (255 * likelihood).astype(np.uint8)
+        rgb[..., 2] = 0
+        rgb = np.ascontiguousarray(rgb)
+        image = QImage(rgb.data, columns, rgb.shape[0], 3 * columns, QImage.Format_RGB888)
+        heat_rect = QRectF(0, 0, width, self.height() - jump_height)
+        painter.drawImage(heat_rect, image)
+
+        # 底部画每列的最大跳变幅度（所有部位中的最大值）
+        jump = hi[:, :, 1].max(axis=1)
+        scale = float(jump.max()) or 1.0
+        xs = (np.arange(columns) + 0.5) * width / columns
+        ys = self.height() - jump / scale * (jump_height - 2) - 1
+        painter.setPen(QPen(Qt.yellow, 1))
+        painter.drawPolyline(*[QPointF(x, y) for x, y in zip(xs, ys)])
+
+        if self.view_start <= self.playhead < self.view_end:
+            x = (self.playhead - self.view_start) / (self.view_end - self.view_start) * width
+            painter.setPen(QPen(Qt.white, 1))
+            painter.drawLine(int(x), 0, int(x), self.height())
+
+        painter.setPen(Qt.white)
+        painter.drawText(4, 12, f"frames {self.view_start} - {self.view_end}")
+        painter.end()
+
+    def wheelEvent(self, event):
+        if self.pyramid is None:
+            return
+        # 以鼠标位置为中心缩放，最小显示 50 帧
+        anchor = self._frame_at(event.pos().x())
+        factor = 0.8 if event.angleDelta().y() > 0 else 1.25
+        span = max(int((self.view_end - self.view_start) * factor), 50)
+        span = min(span, self.pyramid['frames'])
+        ratio = event.pos().x() / max(self.width(), 1)
+        start = int(anchor - ratio * span)
+        self.view_start = max(0, min(start, self.pyramid['frames'] - span))
+        self.view_end = self.view_start + span
+        self.update()
+
+    def mousePressEvent(self, event):
+        if self.pyramid is None:
+            return
+        if event.button() == Qt.LeftButton:
+            self.frameSelected.emit(min(self._frame_at(event.pos().x()), self.pyramid['frames'] - 1))
+        elif event.button() in (Qt.RightButton, Qt.MiddleButton):
+            self._pan_x = event.pos().x()
+
+    def mouseMoveEvent(self, event):
+        if self._pan_x is None or self.pyramid is None:
+            return
+        span = self.view_end - self.view_start
+        shift = int((self._pan_x - event.pos().x()) / max(self.width(), 1) * span)
+        if shift:
+            self._pan_x = event.pos().x()
+            self.view_start = max(0, min(self.view_start + shift, self.pyramid['frames'] - span))
+            self.view_end = self.view_start + span
+            self.update()
+
+    def mouseReleaseEvent(self, event):
+        self._pan_x = None
+
+
 class AnnotateFrame(QGraphicsView):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -29,6 +283,7 @@ class AnnotateFrame(QGraphicsView):
         self.points = {}
         self.point_colors = {}
         self.current_frame_loaded = False
+        self.preview_mode = False
         self.original_pixmap = None
         self.current_color = QColor(Qt.red)
 
@@ -36,6 +291,14 @@ class AnnotateFrame(QGraphicsView):
         self._zoom_start_pos = None
         self._zoom_rect_item = None
         self._zoom = 0
+        self._pan_pos = None
+
+        # 高分辨率帧的分块金字塔：放大时只加载与视口相交的图块
+        self._source_image = None
+        self._display_scale = 1.0
+        self._pyramid = {}
+        self._tiles = {}
+        self._tile_cache = OrderedDict()
         self.shortcut_label = QLabel(self)
         self.shortcut_label.setStyleSheet("""
             QLabel {
@@ -67,17 +330,115 @@ class AnnotateFrame(QGraphicsView):
         if image is None:
             return
         height, width, channel = image.shape
-        bytes_per_line = 3 * width
-        q_image = QImage(image.data, width, height, bytes_per_line, QImage.Format_RGB888).rgbSwapped()
-        pixmap = QPixmap.fromImage(q_image)
-        pixmap = pixmap.scaled(self.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.scene().clear()
-        self.scene().addPixmap(pixmap)
-        self.setSceneRect(QRectF(pixmap.rect()))
+        # 与 QPixmap.scaled(self.size(), Qt.KeepAspectRatio) 得到相同的尺寸，保证标注坐标不变
+        view_w, view_h = self.width(), self.height()
+        fit_w = view_h * width // height
+        if fit_w <= view_w:
+            fit_w, fit_h = max(fit_w, 1), max(view_h, 1)
+        else:
+            fit_w, fit_h = max(view_w, 1), max(view_w * height // width, 1)
+        # 先用 cv2 在 numpy 上缩小，避免把整幅 4K/8K 图转成 QPixmap
+        fitted = cv2.resize(image, (fit_w, fit_h), interpolation=cv2.INTER_AREA)
+        pixmap = self._to_pixmap(fitted)
+
+        self._source_image = image
+        self._display_scale = fit_w / width
+        self._pyramid = {0: image}
+        self._tile_cache = OrderedDict()
         self.original_pixmap = pixmap
+        self.setSceneRect(QRectF(pixmap.rect()))
+        self._draw_base_image()
         self.points = {}
         self.point_colors = {}
         self.current_frame_loaded = True
+        self.preview_mode = False
+
+    def show_preview(self, image):
+        """显示拖动时间轴得到的原始视频帧，预览模式下不可标注"""
+        if image is None:
+            return
+        self.load_frame(image)
+        self.current_frame_loaded = False
+        self.preview_mode = True
+
+    @staticmethod
+    def _to_pixmap(image):
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        q_image = QImage(image.data, width, height, 3 * width, QImage.Format_RGB888).rgbSwapped()
+        return QPixmap.fromImage(q_image)
+
+    def _draw_base_image(self):
+        """清空场景并放置适配窗口大小的底图，放大后的细节由图块覆盖"""
+        self.scene().clear()
+        self._tiles = {}
+        base_item = self.scene().addPixmap(self.original_pixmap)
+        base_item.setZValue(-2)
+        self._update_tiles()
+
+    def _pyramid_level(self, level):
+        if level not in self._pyramid:
+            height, width = self._source_image.shape[:2]
+            size = (max(width >> level, 1), max(height >> level, 1))
+            self._pyramid[level] = cv2.resize(self._pyramid[level - 1] if level - 1 in self._pyramid else self._source_image,
+                                              size, interpolation=cv2.INTER_AREA)
+        return self._pyramid[level]
+
+    def _tile_pixmap(self, key):
+        if key in self._tile_cache:
+            self._tile_cache.move_to_end(key)
+            return self._tile_cache[key]
+        level, tx, ty = key
+        image = self._pyramid_level(level)
+        pixmap = self._to_pixmap(image[ty * TILE_SIZE:(ty + 1) * TILE_SIZE, tx * TILE_SIZE:(tx + 1) * TILE_SIZE])
+        self._tile_cache[key] = pixmap
+        while len(self._tile_cache) > TILE_CACHE_SIZE:
+            self._tile_cache.popitem(last=False)
+        return pixmap
+
+    def _update_tiles(self):
+        """根据当前缩放选择金字塔层级，只加载视口内的图块"""
+        if self._source_image is None:
+            return
+        zoom = self.transform().m11()
+        source_per_scene = 1.0 / self._display_scale
+        if zoom <= 1.0 or source_per_scene <= 1.0:
+            wanted = set()
+        else:
+            # 选择分辨率不低于屏幕像素密度的最粗层级
+            level = max(int(np.floor(np.log2(source_per_scene / zoom))), 0) if source_per_scene > zoom else 0
+            level_scale = self._display_scale * (1 << level)
+            level_h, level_w = self._pyramid_level(level).shape[:2]
+
+            visible = self.mapToScene(self.viewport().rect()).boundingRect().intersected(self.sceneRect())
+            x0 = max(int(visible.left() / level_scale) // TILE_SIZE, 0)
+            y0 = max(int(visible.top() / level_scale) // TILE_SIZE, 0)
+            x1 = min(int(visible.right() / level_scale) // TILE_SIZE, (level_w - 1) // TILE_SIZE)
+            y1 = min(int(visible.bottom() / level_scale) // TILE_SIZE, (level_h - 1) // TILE_SIZE)
+            wanted = {(level, tx, ty) for tx in range(x0, x1 + 1) for ty in range(y0, y1 + 1)}
+
+        for key in list(self._tiles):
+            if key not in wanted:
+                self.scene().removeItem(self._tiles.pop(key))
+        for key in wanted:
+            if key in self._tiles:
+                continue
+            level, tx, ty = key
+            level_scale = self._display_scale * (1 << level)
+            item = QGraphicsPixmapItem(self._tile_pixmap(key))
+            item.setScale(level_scale)
+            item.setPos(tx * TILE_SIZE * level_scale, ty * TILE_SIZE * level_scale)
+            item.setZValue(-1)
+            self.scene().addItem(item)
+            self._tiles[key] = item
+
+    def _add_marker(self, x, y, color):
+        # 标注点保持固定的屏幕大小，放大后不会遮挡爪尖等小部位
+        ellipse = QGraphicsEllipseItem(-2.5, -2.5, 5, 5)
+        ellipse.setPos(x, y)
+        ellipse.setFlag(QGraphicsEllipseItem.ItemIgnoresTransformations)
+        ellipse.setBrush(color)
+        self.scene().addItem(ellipse)
 
     def set_color(self, color):
         if isinstance(color, Qt.GlobalColor):
@@ -89,9 +450,15 @@ class AnnotateFrame(QGraphicsView):
         if self.original_pixmap:
             self.fitInView(self.sceneRect(), Qt.KeepAspectRatio)
             self._zoom = 0
+            self._update_tiles()
 
     def mousePressEvent(self, event):
-        if self._enable_zoom_select and event.button() == Qt.LeftButton:
+        if event.button() == Qt.MiddleButton:
+            # 中键拖动平移
+            self._pan_pos = event.pos()
+            self.viewport().setCursor(Qt.ClosedHandCursor)
+            event.accept()
+        elif self._enable_zoom_select and event.button() == Qt.LeftButton:
             self._zoom_start_pos = self.mapToScene(event.pos())
             if self._zoom_rect_item:
                 self.scene().removeItem(self._zoom_rect_item)
@@ -111,9 +478,7 @@ class AnnotateFrame(QGraphicsView):
                 self.points[animal_id][body_part] = (pos.x(), pos.y())
                 self.point_colors[animal_id][body_part] = color
 
-                ellipse = QGraphicsEllipseItem(pos.x() - 2.5, pos.y() - 2.5, 5, 5)
-                ellipse.setBrush(color)
-                self.scene().addItem(ellipse)
+                self._add_marker(pos.x(), pos.y(), color)
 
                 current_index = parent.region_selector.currentIndex()
                 if current_index < parent.region_selector.count() - 1:
@@ -121,7 +486,12 @@ class AnnotateFrame(QGraphicsView):
                     parent.update_annotation_color()
 
     def mouseMoveEvent(self, event):
-        if self._enable_zoom_select and self._zoom_start_pos:
+        if self._pan_pos is not None:
+            delta = event.pos() - self._pan_pos
+            self._pan_pos = event.pos()
+            self.horizontalScrollBar().setValue(self.horizontalScrollBar().value() - delta.x())
+            self.verticalScrollBar().setValue(self.verticalScrollBar().value() - delta.y())
+        elif self._enable_zoom_select and self._zoom_start_pos:
             end_pos = self.mapToScene(event.pos())
             rect = QRectF(self._zoom_start_pos, end_pos).normalized()
 
@@ -137,13 +507,17 @@ class AnnotateFrame(QGraphicsView):
             super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event):
-        if self._enable_zoom_select and event.button() == Qt.LeftButton and self._zoom_start_pos:
+        if event.button() == Qt.MiddleButton and self._pan_pos is not None:
+            self._pan_pos = None
+            self.viewport().unsetCursor()
+        elif self._enable_zoom_select and event.button() == Qt.LeftButton and self._zoom_start_pos:
             end_pos = self.mapToScene(event.pos())
             rect = QRectF(self._zoom_start_pos, end_pos).normalized()
 
             if rect.width() > 5 and rect.height() > 5:
                 self.fitInView(rect, Qt.KeepAspectRatio)
                 self._zoom = 0
+                self._update_tiles()
 
             if self._zoom_rect_item:
                 self.scene().removeItem(self._zoom_rect_item)
@@ -173,14 +547,24 @@ class AnnotateFrame(QGraphicsView):
             return
 
         self.scale(zoom_factor, zoom_factor)
+        self._update_tiles()
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self._update_tiles()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_tiles()
 
     def erase_specific_point(self, animal_id, body_part):
         """擦除指定动物和部位的标注点"""
+        if self.preview_mode:
+            return
         if animal_id in self.points and body_part in self.points[animal_id]:
             del self.points[animal_id][body_part]
             del self.point_colors[animal_id][body_part]
-            self.scene().clear()
-            self.scene().addPixmap(self.original_pixmap)
+            self._draw_base_image()
             self.restore_annotations()
 
         # 保存擦除操作后的当前帧标注到 JSON
@@ -201,9 +585,7 @@ class AnnotateFrame(QGraphicsView):
         for animal_id, parts in self.points.items():
             for body_part, point in parts.items():
                 color = self.point_colors[animal_id].get(body_part, self.get_parent_app().bodypart_colors.get(body_part, self.current_color))
-                ellipse = QGraphicsEllipseItem(point[0] - 2.5, point[1] - 2.5, 5, 5)
-                ellipse.setBrush(color)
-                self.scene().addItem(ellipse)
+                self._add_marker(point[0], point[1], color)
 
     def save_annotations(self, frame_index, annotations_file):
         """保存当前帧的标注到 JSON 文件"""
@@ -339,25 +721,70 @@ class ADPTApp(QMainWindow):
         self.bodyparts = []
         self.bodypart_colors = {}
         self.frame_interval = 1
+        self.frame_buffer = None
+        self.scrub_active = False
+        self.scrub_direction = 0
+        self.scrub_shown_index = -1
+        self.scrub_timer = QTimer(self)
+        self.scrub_timer.timeout.connect(self._scrub_tick)
+        self.predict_config = None
+        self.review_buffer = None
+        self.review_trajectory = None
+        self.review_direction = 0
+        self.review_shown_index = -1
+        self.review_timer = QTimer(self)
+        self.review_timer.timeout.connect(self._review_tick)
 
         self.create_menu()
         self.create_welcome_page()
         # self.create_video_extraction_page()
-        self.create_annotation_page()
-        self.create_training_page()
-        self.create_prediction_page()
-
         self.stacked_widget.addWidget(self.welcome_page)
         # self.stacked_widget.addWidget(self.video_extraction_page)
-        self.stacked_widget.addWidget(self.annotation_page)
-        self.stacked_widget.addWidget(self.training_page)
-        self.stacked_widget.addWidget(self.prediction_page)
+
+        # 其余页面在第一次显示时才创建，先用空白页占位
+        self.annotation_page = None
+        self.training_page = None
+        self.prediction_page = None
+        self.review_page = None
+        self._page_builders = {
+            1: ('annotation_page', self.create_annotation_page),
+            2: ('training_page', self.create_training_page),
+            3: ('prediction_page', self.create_prediction_page),
+            4: ('review_page', self.create_review_page),
+        }
+        for _ in self._page_builders:
+            self.stacked_widget.addWidget(QWidget())
         self.stacked_widget.setCurrentIndex(0)
         # self.create_discussion_page()
         # self.stacked_widget.addWidget(self.discussion_page)
         
+    def ensure_page(self, index):
+        """按需创建页面并替换占位页"""
+        if index not in self._page_builders:
+            return
+        name, builder = self._page_builders[index]
+        if getattr(self, name) is not None:
+            return
+        start = time.perf_counter()
+        builder()
+        page = getattr(self, name)
+        placeholder = self.stacked_widget.widget(index)
+        current = self.stacked_widget.currentIndex()
+        self.stacked_widget.removeWidget(placeholder)
+        placeholder.deleteLater()
+        self.stacked_widget.insertWidget(index, page)
+        self.stacked_widget.setCurrentIndex(current)
+        print(f"Page '{name}' created in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def show_page(self, index):
+        self.ensure_page(index)
+        self.stacked_widget.setCurrentIndex(index)
+
     def keyPressEvent(self, event):
-        if event.modifiers() == Qt.ControlModifier and event.key() == Qt.Key_A:
+        if self.annotation_page is None:
+            # 标注页尚未创建时快捷键无效
+            super().keyPressEvent(event)
+        elif event.modifiers() == Qt.ControlModifier and event.key() == Qt.Key_A:
             self.load_prev_frame()
             self._reset_zoom()
             event.accept()
@@ -385,7 +812,7 @@ class ADPTApp(QMainWindow):
         menu_bar = self.menuBar()
         menu_bar.setStyleSheet("""QMenuBar {background-color: #333333; color: white;}""")
         welcome_action = QAction("Welcome", self)
-        welcome_action.triggered.connect(lambda: self.stacked_widget.setCurrentIndex(0))
+        welcome_action.triggered.connect(lambda: self.show_page(0))
         menu_bar.addAction(welcome_action)
 
         # extract_action = QAction("Extract Frames", self)
@@ -393,16 +820,20 @@ class ADPTApp(QMainWindow):
         # menu_bar.addAction(extract_action)
 
         annotate_action = QAction("Annotate Frames", self)
-        annotate_action.triggered.connect(lambda: self.stacked_widget.setCurrentIndex(1))
+        annotate_action.triggered.connect(lambda: self.show_page(1))
         menu_bar.addAction(annotate_action)
 
         train_action = QAction("Train Model", self)
-        train_action.triggered.connect(lambda: self.stacked_widget.setCurrentIndex(2))
+        train_action.triggered.connect(lambda: self.show_page(2))
         menu_bar.addAction(train_action)
 
         predict_action = QAction("Analyze Video", self)
-        predict_action.triggered.connect(lambda: self.stacked_widget.setCurrentIndex(3))
+        predict_action.triggered.connect(lambda: self.show_page(3))
         menu_bar.addAction(predict_action)
+
+        review_action = QAction("Review Results", self)
+        review_action.triggered.connect(lambda: self.show_page(4))
+        menu_bar.addAction(review_action)
         
     def create_welcome_page(self):
         self.welcome_page = QWidget()
@@ -568,9 +999,45 @@ class ADPTApp(QMainWindow):
         # 标注区域视图
         self.annotation_view = AnnotateFrame(self)
 
+        # 时间轴：拖动/播放原始视频，可将任意帧加入标注集
+        scrub_layout = QHBoxLayout()
+        play_back_button = QPushButton("◀ Play")
+        play_back_button.clicked.connect(lambda: self._scrub_play(-1))
+        scrub_layout.addWidget(play_back_button)
+
+        pause_button = QPushButton("Pause")
+        pause_button.clicked.connect(lambda: self._scrub_play(0))
+        scrub_layout.addWidget(pause_button)
+
+        play_button = QPushButton("Play ▶")
+        play_button.clicked.connect(lambda: self._scrub_play(1))
+        scrub_layout.addWidget(play_button)
+
+        self.scrub_slider = QSlider(Qt.Horizontal)
+        self.scrub_slider.setEnabled(False)
+        self.scrub_slider.sliderMoved.connect(self._scrub_seek)
+        scrub_layout.addWidget(self.scrub_slider, 1)
+
+        self.scrub_label = QLabel("0 / 0")
+        self.scrub_label.setStyleSheet("color: white;")
+        scrub_layout.addWidget(self.scrub_label)
+
+        add_frame_button = QPushButton("Add Frame")
+        add_frame_button.clicked.connect(self.add_scrubbed_frame)
+        add_frame_button.setStyleSheet("background-color: #5F9EA0; color: white;")
+        scrub_layout.addWidget(add_frame_button)
+
+        back_button = QPushButton("Back to Annotation")
+        back_button.clicked.connect(self._scrub_exit)
+        scrub_layout.addWidget(back_button)
+
+        right_layout = QVBoxLayout()
+        right_layout.addWidget(self.annotation_view, 1)
+        right_layout.addLayout(scrub_layout)
+
         # 主布局调整：左侧布局先添加，右侧标注区域后添加
         layout.addLayout(left_layout, 1)
-        layout.addWidget(self.annotation_view, 4)
+        layout.addLayout(right_layout, 4)
 
         self.annotation_page.setLayout(layout)
 
@@ -740,6 +1207,164 @@ class ADPTApp(QMainWindow):
 
         self.prediction_page.setLayout(layout)
 
+    def create_review_page(self):
+        """分析结果回看页面：播放原视频并实时叠加预测的关键点和骨架"""
+        self.review_page = QWidget()
+        layout = QVBoxLayout()
+
+        button_layout = QHBoxLayout()
+        video_button = QPushButton("Load Video")
+        video_button.clicked.connect(self.load_review_video)
+        video_button.setStyleSheet("background-color: #5F9EA0; color: white;")
+        button_layout.addWidget(video_button)
+
+        result_button = QPushButton("Load Predictions")
+        result_button.clicked.connect(self.load_review_predictions)
+        result_button.setStyleSheet("background-color: #5F9EA0; color: white;")
+        button_layout.addWidget(result_button)
+        layout.addLayout(button_layout)
+
+        self.review_label = QLabel("Load a video and its prediction file (.csv/.h5/.npy)")
+        self.review_label.setAlignment(Qt.AlignCenter)
+        self.review_label.setStyleSheet("color: white;")
+        self.review_label.setMinimumSize(320, 240)
+        layout.addWidget(self.review_label, 1)
+
+        control_layout = QHBoxLayout()
+        play_back_button = QPushButton("◀ Play")
+        play_back_button.clicked.connect(lambda: self._review_play(-1))
+        control_layout.addWidget(play_back_button)
+
+        pause_button = QPushButton("Pause")
+        pause_button.clicked.connect(lambda: self._review_play(0))
+        control_layout.addWidget(pause_button)
+
+        play_button = QPushButton("Play ▶")
+        play_button.clicked.connect(lambda: self._review_play(1))
+        control_layout.addWidget(play_button)
+
+        self.review_slider = QSlider(Qt.Horizontal)
+        self.review_slider.setEnabled(False)
+        self.review_slider.sliderMoved.connect(self.review_seek)
+        control_layout.addWidget(self.review_slider, 1)
+
+        self.review_frame_label = QLabel("0 / 0")
+        self.review_frame_label.setStyleSheet("color: white;")
+        control_layout.addWidget(self.review_frame_label)
+        layout.addLayout(control_layout)
+
+        # 似然度/跳变时间轴：滚轮缩放，右键拖动平移，左键跳转
+        self.quality_timeline = QualityTimeline()
+        self.quality_timeline.frameSelected.connect(self.review_jump)
+        layout.addWidget(self.quality_timeline)
+
+        self.review_page.setLayout(layout)
+
+    def load_review_video(self):
+        options = QFileDialog.Options()
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Video", "", "Video Files (*.mp4 *.avi)", options=options)
+        if not file_path:
+            return
+        self.review_timer.stop()
+        if self.review_buffer is not None:
+            self.review_buffer.stop()
+        self.review_buffer = FrameRingBuffer(file_path)
+        self.review_buffer.start()
+        self.review_direction = 0
+        self.review_shown_index = -1
+        self.review_slider.setRange(0, max(self.review_buffer.frame_count - 1, 0))
+        self.review_slider.setValue(0)
+        self.review_slider.setEnabled(True)
+        self.review_timer.start(max(int(1000 / self.review_buffer.fps), 1))
+
+    def load_review_predictions(self):
+        if self.config is None:
+            QMessageBox.warning(self, "Warning", "Please load a config first")
+            return
+        options = QFileDialog.Options()
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Predictions", "",
+                                                   "Prediction Files (*.csv *.h5 *.npy)", options=options)
+        if not file_path:
+            return
+        from core.trajectory import load_trajectory
+        try:
+            self.review_trajectory = load_trajectory(file_path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load predictions: {e}")
+            return
+        self.review_shown_index = -1
+        print(f"Loaded predictions {file_path}: {self.review_trajectory.shape}")
+
+        from core.trajectory import load_quality_pyramid
+        self.quality_timeline.set_pyramid(load_quality_pyramid(file_path))
+
+    def _review_style(self):
+        """从训练/预测配置中取骨架、颜色和 pcutoff"""
+        kp_con = [{'name': i, 'bodypart': eval(skeleton)} for i, skeleton in enumerate(self.config.get('skeleton', []))]
+        predict_config = self.predict_config or {}
+        colors = [eval(color) for color in predict_config.get('colors', [])] or [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+        pcutoff = predict_config.get('pcutoff', 0.2)
+        return kp_con, colors, pcutoff
+
+    def review_seek(self, index):
+        if self.review_buffer is None:
+            return
+        self.review_buffer.set_playhead(index)
+        self.review_shown_index = -1
+
+    def review_jump(self, index):
+        """从时间轴跳转到指定帧"""
+        if self.review_buffer is None:
+            return
+        self.review_direction = 0
+        self.review_seek(index)
+        self.review_slider.setValue(index)
+
+    def _review_play(self, direction):
+        if self.review_buffer is None:
+            QMessageBox.warning(self, "Warning", "Please load a video first")
+            return
+        self.review_direction = direction
+        self.review_buffer.set_playhead(self.review_buffer.playhead, direction if direction != 0 else None)
+
+    def _review_tick(self):
+        buffer = self.review_buffer
+        if buffer is None:
+            return
+        index = buffer.playhead
+        if self.review_direction != 0 and self.review_shown_index == index:
+            next_index = index + self.review_direction
+            if 0 <= next_index < buffer.frame_count:
+                buffer.set_playhead(next_index)
+                index = next_index
+            else:
+                self.review_direction = 0
+        if index == self.review_shown_index:
+            return
+        frame = buffer.get(index)
+        if frame is None:
+            return
+        if frame is FrameRingBuffer.UNREADABLE:
+            # 保留上一帧画面，下一次定时器回调越过这一帧
+            self.review_shown_index = index
+            return
+
+        frame = frame.copy()
+        trajectory = self.review_trajectory
+        if trajectory is not None and self.config is not None and index < len(trajectory):
+            from core.trajectory import draw_pose
+            kp_con, colors, pcutoff = self._review_style()
+            draw_pose(frame, trajectory[index], kp_con, colors, pcutoff, self.config['NUM_KEYPOINT'])
+
+        pixmap = AnnotateFrame._to_pixmap(frame)
+        self.review_label.setPixmap(pixmap.scaled(self.review_label.size(), Qt.KeepAspectRatio, Qt.FastTransformation))
+        self.review_shown_index = index
+        self.review_slider.blockSignals(True)
+        self.review_slider.setValue(index)
+        self.review_slider.blockSignals(False)
+        self.review_frame_label.setText(f"{index} / {buffer.frame_count}")
+        self.quality_timeline.set_playhead(index)
+
     def load_video(self):
         """加载一个新视频并保存当前视频的最后一帧和整合的JSON文件"""
         if self.frames_cache:
@@ -773,6 +1398,9 @@ class ADPTApp(QMainWindow):
             self.frames_cache = []
             self.current_frame_index = 0
 
+            # 重启时间轴的后台解码
+            self._start_frame_buffer()
+
             QMessageBox.information(self, "Info", "Please enter the number of frames to extract.")
 
             # 重置选择器到第一项
@@ -813,6 +1441,9 @@ class ADPTApp(QMainWindow):
 
     def save_current_frame_annotations(self, frame_index):
         """保存指定帧的标注到JSON文件和带标注的图片"""
+        if self.annotation_view.preview_mode:
+            # 预览的是时间轴上的原始帧，当前帧的标注已在进入预览前保存
+            return
         if not self.frames_cache or not self.annotations_file or frame_index >= len(self.frames_cache):
             print("Warning: No frames or invalid frame index.")
             return
@@ -838,6 +1469,8 @@ class ADPTApp(QMainWindow):
 
     def load_frame_by_index(self, index):
         """加载指定索引的帧和标注"""
+        self.scrub_active = False
+        self.scrub_direction = 0
         if 0 <= index < len(self.frames_cache):
             frame = self.frames_cache[index]
             self.annotation_view.load_frame(frame)
@@ -896,7 +1529,7 @@ class ADPTApp(QMainWindow):
 
             self.video_label.setText(f"Extracted {len(self.frames_cache)} frames.")
             if self.frames_cache:
-                self.stacked_widget.setCurrentIndex(2)  # 切换到标注页面
+                self.show_page(2)  # 切换到标注页面
                 self.load_frame_by_index(0)  # 加载第一帧
         except ValueError as e:
             QMessageBox.critical(self, "Error", f"Invalid frame count input: {e}")
@@ -962,6 +1595,7 @@ class ADPTApp(QMainWindow):
             QMessageBox.critical(self, "Error", f"Failed to update config: {e}")
 
     def update_config_selections(self):
+        self.ensure_page(1)
         if self.config:
             self.bodyparts = self.config.get('bodyparts', [])
             animal_count = self.config.get('num_classes', 1)
@@ -1051,6 +1685,109 @@ class ADPTApp(QMainWindow):
             QMessageBox.critical(self, "Error", f"Video analysis failed: {e}")
 
 
+    def _start_frame_buffer(self):
+        """为当前视频启动后台解码线程和时间轴"""
+        self.scrub_timer.stop()
+        if self.frame_buffer is not None:
+            self.frame_buffer.stop()
+        self.frame_buffer = FrameRingBuffer(self.video_path)
+        self.frame_buffer.start()
+        self.scrub_active = False
+        self.scrub_direction = 0
+        self.scrub_shown_index = -1
+        self.scrub_slider.setRange(0, max(self.frame_buffer.frame_count - 1, 0))
+        self.scrub_slider.setValue(0)
+        self.scrub_slider.setEnabled(True)
+        self.scrub_label.setText(f"0 / {self.frame_buffer.frame_count}")
+        # 按源视频帧率驱动播放
+        self.scrub_timer.start(max(int(1000 / self.frame_buffer.fps), 1))
+
+    def _scrub_enter(self):
+        """进入预览前先保存当前帧标注"""
+        if not self.annotation_view.preview_mode and self.frames_cache:
+            self.save_current_frame_annotations(self.current_frame_index)
+        self.scrub_active = True
+
+    def _scrub_seek(self, index):
+        if self.frame_buffer is None:
+            return
+        self._scrub_enter()
+        self.frame_buffer.set_playhead(index)
+
+    def _scrub_play(self, direction):
+        if self.frame_buffer is None:
+            QMessageBox.warning(self, "Warning", "Please load a video first")
+            return
+        if direction != 0:
+            self._scrub_enter()
+        self.scrub_direction = direction
+        self.frame_buffer.set_playhead(self.frame_buffer.playhead, direction if direction != 0 else None)
+
+    def _scrub_tick(self):
+        """定时器回调：推进播放头并显示已解码的帧；帧未解码时停留等待而不是跳帧"""
+        buffer = self.frame_buffer
+        if buffer is None:
+            return
+        index = buffer.playhead
+        if self.scrub_direction != 0 and self.scrub_shown_index == index:
+            next_index = index + self.scrub_direction
+            if 0 <= next_index < buffer.frame_count:
+                buffer.set_playhead(next_index)
+                index = next_index
+            else:
+                self.scrub_direction = 0
+
+        if not self.scrub_active or index == self.scrub_shown_index:
+            return
+        frame = buffer.get(index)
+        if frame is None:
+            return
+        self.scrub_shown_index = index
+        if frame is not FrameRingBuffer.UNREADABLE:
+            self.annotation_view.show_preview(frame)
+        self.scrub_slider.blockSignals(True)
+        self.scrub_slider.setValue(index)
+        self.scrub_slider.blockSignals(False)
+        self.scrub_label.setText(f"{index} / {buffer.frame_count}")
+
+    def _scrub_exit(self):
+        """停止预览，回到当前标注帧"""
+        self.scrub_active = False
+        self.scrub_direction = 0
+        self.scrub_shown_index = -1
+        if self.frames_cache:
+            self.load_frame_by_index(self.current_frame_index)
+
+    def add_scrubbed_frame(self):
+        """将时间轴上当前预览的帧加入标注集"""
+        if self.frame_buffer is None or not self.annotation_view.preview_mode:
+            QMessageBox.warning(self, "Warning", "Please scrub to a frame first")
+            return
+        frame = self.frame_buffer.get(self.scrub_shown_index)
+        if frame is None or frame is FrameRingBuffer.UNREADABLE:
+            return
+        self.scrub_direction = 0
+
+        os.makedirs(self.base_output_folder, exist_ok=True)
+        # 之前提取（可能已标注）的帧文件不能覆盖：先把它们接到帧列表后面，
+        # 帧序号与 frame_N.png 保持一致，新帧用第一个未被占用的序号
+        new_index = len(self.frames_cache)
+        frame_path = os.path.join(self.base_output_folder, f"frame_{new_index}.png")
+        while os.path.exists(frame_path):
+            self.frames_cache.append(cv2.imread(frame_path))
+            new_index += 1
+            frame_path = os.path.join(self.base_output_folder, f"frame_{new_index}.png")
+        cv2.imwrite(frame_path, frame)
+        self.frames_cache.append(frame.copy())
+        print(f"Added video frame {self.scrub_shown_index} as {frame_path}")
+
+        self.scrub_shown_index = -1
+        self.current_frame_index = new_index
+        self.load_frame_by_index(new_index)
+        if self.region_selector.count() > 0:
+            self.region_selector.setCurrentIndex(0)
+        self.video_label.setText(f"Extracted {len(self.frames_cache)} frames")
+
     def _zoom_in_img(self):
         self.annotation_view.enable_zoom_select_mode()
 
@@ -1058,10 +1795,40 @@ class ADPTApp(QMainWindow):
         self.annotation_view.reset_view()
 
 
+def _report_startup(app, budget_ms=None):
+    """打印启动各阶段耗时；超过预算时以非零状态退出，便于发现启动变慢"""
+    app.processEvents()
+    _startup_mark("first paint")
+    print("\nStartup profile (ms):")
+    previous = _STARTUP_T0
+    for label, stamp in _STARTUP_MARKS:
+        print(f"  {label:<28s} {(stamp - previous) * 1000:8.1f}   total {(stamp - _STARTUP_T0) * 1000:8.1f}")
+        previous = stamp
+    total_ms = (_STARTUP_MARKS[-1][1] - _STARTUP_T0) * 1000
+    if budget_ms is not None and total_ms > budget_ms:
+        print(f"Startup took {total_ms:.1f} ms, over the budget of {budget_ms:.1f} ms")
+        app.exit(1)
+    else:
+        app.exit(0)
+
+
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description='ADPT GUI')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='print a startup timing report after the first paint and exit')
+    parser.add_argument('--startup-budget', type=float, default=None,
+                        help='with --profile-startup, exit with status 1 if startup exceeds this many ms')
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    _startup_mark("QApplication")
 
     window = ADPTApp()
+    _startup_mark("ADPTApp.__init__")
     window.show()
+    _startup_mark("window.show")
+
+    if args.profile_startup:
+        QTimer.singleShot(0, lambda: _report_startup(app, args.startup_budget))
 
     sys.exit(app.exec_())
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:02:11 2026
+
+@author: tang
+"""
+
+import warnings
+warnings.filterwarnings('ignore')
+import os
+import json
+import time
+import platform
+import argparse
+from datetime import datetime
+import yaml
+import numpy as np
+from imgaug.augmentables.kps import KeypointsOnImage
+from core.data_aug import data_augmentation, BatchAugmenter, AUGMENTATION_PRESETS
+
+
+def synthetic_batch(batch_size, IMG_SIZE_H, IMG_SIZE_W, channels, NUM_KEYPOINT, seed=0):
+    rng = np.random.default_rng(seed)
+    images = rng.integers(0, 256, (batch_size, IMG_SIZE_H, IMG_SIZE_W, channels), dtype=np.uint8)
+    keypoints = rng.uniform(0, 1, (batch_size, NUM_KEYPOINT, 2)) * [IMG_SIZE_W, IMG_SIZE_H]
+    return images, keypoints.astype(np.float32)
+
+
+def time_per_image(images, keypoints, repeats, aug=None):
+    aug = aug or data_augmentation()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for image, kps in zip(images, keypoints):
+            aug(image=image, keypoints=KeypointsOnImage.from_xy_array(kps, shape=image.shape))
+    return time.perf_counter() - start
+
+
+def time_batched(images, keypoints, repeats, augmentation=None):
+    aug = BatchAugmenter(augmentation, seed=0)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        aug(images, keypoints)
+    return time.perf_counter() - start
+
+
+def time_augmenter(augmenter, images, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        augmenter(images=list(images))
+    return time.perf_counter() - start
+
+
+def pipeline_steps(aug):
+    """(name, probability, augmenter) for every step of the Sequential, Sometimes unwrapped."""
+    steps = []
+    for i, child in enumerate(aug):
+        p, inner = 1.0, child
+        if hasattr(child, 'then_list'):
+            p, inner = child.p.p.value, child.then_list[0]
+        steps.append((f'{i:02d}_{type(inner).__name__}', float(p), inner))
+    return steps
+
+
+def _rate(n, seconds):
+    return {'images_per_s': n / seconds, 'ms_per_image': seconds / n * 1000}
+
+
+def run_benchmark(sizes, batch_sizes, channels, num_kps, repeats, augmentation=None):
+    aug = data_augmentation(augmentation)
+    results = []
+    for IMG_SIZE_H, IMG_SIZE_W in sizes:
+        for batch_size in batch_sizes:
+            images, keypoints = synthetic_batch(batch_size, IMG_SIZE_H, IMG_SIZE_W, channels, num_kps)
+            n = batch_size * repeats
+            entry = {'height': IMG_SIZE_H, 'width': IMG_SIZE_W, 'batch_size': batch_size, 'augmenters': {}}
+            for name, p, augmenter in pipeline_steps(aug):
+                rate = _rate(n, time_augmenter(augmenter, images, repeats))
+                # expected cost per image inside the pipeline = probability x cost when applied
+                rate['probability'] = p
+                rate['expected_ms_per_image'] = p * rate['ms_per_image']
+                entry['augmenters'][name] = rate
+            entry['pipeline_per_image'] = _rate(n, time_per_image(images, keypoints, repeats, aug))
+            entry['pipeline_batched'] = _rate(n, time_augmenter(aug, images, repeats))
+            entry['batch_augmenter'] = _rate(n, time_batched(images, keypoints, repeats, augmentation))
+            results.append(entry)
+    return results
+
+
+def check_presets(IMG_SIZE_H, IMG_SIZE_W, batch_size, channels, num_kps, repeats):
+    """Measure every preset at the training size against its budget_ms."""
+    images, keypoints = synthetic_batch(batch_size, IMG_SIZE_H, IMG_SIZE_W, channels, num_kps)
+    n = batch_size * repeats
+    costs = {}
+    print(f"\nPresets at {IMG_SIZE_W}x{IMG_SIZE_H}:")
+    for name, preset in AUGMENTATION_PRESETS.items():
+        ms = time_per_image(images, keypoints, repeats, data_augmentation(name)) / n * 1000
+        costs[name] = {'ms_per_image': ms, 'budget_ms': preset['budget_ms'], 'within_budget': ms <= preset['budget_ms']}
+        status = 'ok' if ms <= preset['budget_ms'] else 'OVER BUDGET'
+        print(f"  {name:<10s} {ms:8.2f} ms/image  budget {preset['budget_ms']:6.2f}  {status}"
+              f"  ({costs['full']['ms_per_image'] / ms if 'full' in costs else 1.0:.2f}x cheaper than full)")
+    return costs
+
+
+def print_results(results, previous=None):
+    previous = {(r['height'], r['width'], r['batch_size']): r for r in (previous or [])}
+    for entry in results:
+        old = previous.get((entry['height'], entry['width'], entry['batch_size']))
+        print(f"\n{entry['width']}x{entry['height']}, batch size {entry['batch_size']}")
+        print(f"  {'augmenter':<40s} {'p':>5s} {'images/s':>10s} {'ms/image':>9s} {'expected':>9s}")
+        rows = [(name, r) for name, r in entry['augmenters'].items()]
+        rows += [(key, entry[key]) for key in ('pipeline_per_image', 'pipeline_batched', 'batch_augmenter')]
+        for name, r in rows:
+            line = f"  {name:<40s} {r.get('probability', 1.0):5.2f} {r['images_per_s']:10.1f} {r['ms_per_image']:9.2f}"
+            line += f" {r['expected_ms_per_image']:9.2f}" if 'expected_ms_per_image' in r else ' ' * 10
+            if old is not None:
+                before = old['augmenters'].get(name) or old.get(name)
+                if before:
+                    line += f"  ({before['ms_per_image'] / r['ms_per_image']:.2f}x vs previous)"
+            print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='augmentation throughput')
+    parser.add_argument('--config', type=str, default = 'config.yaml')
+    parser.add_argument('--sizes', type=str, default = None, help='comma separated WxH, defaults to the configured training and original sizes')
+    parser.add_argument('--batch_sizes', type=str, default = None, help='comma separated, defaults to BATCH_SIZE')
+    parser.add_argument('--repeats', type=int, default = 10)
+    parser.add_argument('--output', type=str, default = None, help='JSON file for the results (default bench_results/augmentation_<time>.json)')
+    parser.add_argument('--compare', type=str, default = None, help='earlier JSON results to compare against')
+    parser.add_argument('--presets', action='store_true', help='also check every augmentation preset against its cost budget')
+    args = parser.parse_args()
+    with open(args.config, 'r', encoding='utf-8') as f:
+        result = yaml.load(f.read(), Loader=yaml.FullLoader)
+
+    if args.sizes:
+        sizes = [tuple(int(v) for v in size.split('x'))[::-1] for size in args.sizes.split(',')]
+    else:
+        sizes = [(result['IMG_SIZE_H'], result['IMG_SIZE_W']), (result['IMG_SIZE_H_ori'], result['IMG_SIZE_W_ori'])]
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',')] if args.batch_sizes else [result['BATCH_SIZE']]
+
+    num_kps = result['NUM_KEYPOINT'] * result['num_classes']
+    results = run_benchmark(sizes, batch_sizes, result['channels'], num_kps, args.repeats, result.get('augmentation'))
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)['results']
+    print_results(results, previous)
+    presets = None
+    if args.presets:
+        presets = check_presets(result['IMG_SIZE_H'], result['IMG_SIZE_W'], batch_sizes[0], result['channels'], num_kps, args.repeats)
+
+    output = args.output or os.path.join('bench_results', datetime.now().strftime('augmentation_%Y%m%d_%H%M%S.json'))
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'date': datetime.now().isoformat(), 'machine': platform.platform(), 'processor': platform.processor(),
+                   'cpu_count': os.cpu_count(), 'repeats': args.repeats, 'augmentation': result.get('augmentation'), 'results': results,
+                   'presets': presets}, f, indent=4)
+    print(f'\nResults saved to {output}')
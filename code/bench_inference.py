@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 10:31:09 2026
+
+@author: tang
+"""
+
+import warnings
+warnings.filterwarnings('ignore')
+import os
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+from datetime import datetime
+import yaml
+import numpy as np
+from config.config_training import configuration
+from config.config_predicting import configuration_predict
+from core.tf_runtime import add_runtime_arguments, runtime_options, configure_runtime, describe_runtime
+
+
+def time_model(infer, batch_size, IMG_SIZE_H, IMG_SIZE_W, repeats):
+    """Model-only frames/s on a blank batch, after one call to trace the graph."""
+    batch = np.zeros((batch_size, IMG_SIZE_H, IMG_SIZE_W, 3), dtype=np.float32)
+    infer(batch)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        infer(batch)
+    return batch_size * repeats / (time.perf_counter() - start)
+
+
+def time_loading(model_path, predict_args, IMG_SIZE_H, IMG_SIZE_W, repeats):
+    """Seconds to load the model and to run its first frame (tracing), then the median single-frame latency in ms."""
+    from core.inference import load_model, make_infer
+    start = time.perf_counter()
+    infer = make_infer(load_model(model_path, predict_args))
+    load_s = time.perf_counter() - start
+    frame = np.zeros((1, IMG_SIZE_H, IMG_SIZE_W, 3), dtype=np.float32)
+    start = time.perf_counter()
+    infer(frame)
+    first_s = time.perf_counter() - start
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        infer(frame)
+        latencies.append(time.perf_counter() - start)
+    return infer, load_s, first_s, float(np.median(latencies)) * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='model load time, latency and inference frames/s for a range of batch sizes')
+    parser.add_argument('--config', type=str, default = 'config.yaml')
+    parser.add_argument('--config_predict', type=str, default = 'config_predict.yaml')
+    parser.add_argument('--models', type=str, default = None, help='comma-separated model paths to compare: checkpoint, SavedModel directory, .tflite (default model_path)')
+    parser.add_argument('--batch_sizes', type=str, default = '1,8,16,32,64')
+    parser.add_argument('--repeats', type=int, default = 10, help='model-only batches per batch size, and x10 single frames for the latency')
+    parser.add_argument('--frames', type=int, default = 500, help='frames of the first video analysed end to end per batch size (0: skip)')
+    parser.add_argument('--output', type=str, default = None, help='JSON file for the results (default bench_results/inference_<time>.json)')
+    add_runtime_arguments(parser)
+    args = parser.parse_args()
+    with open(args.config, 'r', encoding='utf-8') as f:
+        result = yaml.load(f.read(), Loader=yaml.FullLoader)
+    with open(args.config_predict, 'r', encoding='utf-8') as f:
+        result_predict = yaml.load(f.read(), Loader=yaml.FullLoader)
+    runtime = configure_runtime(runtime_options(result, args))
+    print('\nRuntime: ' + describe_runtime(runtime))
+    from core.inference import analyze_video
+
+    IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts, early_stop,centre,num_classes = configuration(result)
+    videos,save_video,model_path,colors,pcutoff,scorer = configuration_predict(result_predict)
+    predict_args = (IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts,videos,False,model_path,colors,pcutoff,num_classes,scorer,centre)
+
+    results = []
+    workdir = tempfile.mkdtemp(prefix='adpt_bench_')
+    try:
+        for n, path in enumerate(args.models.split(',') if args.models else [model_path]):
+            infer, load_s, first_s, latency_ms = time_loading(path, predict_args, IMG_SIZE_H, IMG_SIZE_W, args.repeats * 10)
+            model = {'model': path, 'load_s': load_s, 'first_frame_s': first_s, 'latency_ms': latency_ms, 'batches': []}
+            print(f'\n{path}\n  load {load_s:.2f} s, first frame {first_s:.2f} s, latency {latency_ms:.1f} ms/frame')
+            for batch_size in [int(b) for b in args.batch_sizes.split(',')]:
+                entry = {'batch_size': batch_size, 'model_frames_per_s': time_model(infer, batch_size, IMG_SIZE_H, IMG_SIZE_W, args.repeats)}
+                if args.frames and videos:
+                    # results go to a temporary directory, the real analysis outputs are left alone
+                    stats = analyze_video(videos[0], infer, IMG_SIZE_H, IMG_SIZE_W, NUM_KEYPOINT, num_classes, bodyparts,
+                                          scorer, batch_size=batch_size, report=False, max_frames=args.frames,
+                                          output=os.path.join(workdir, f'model{n}_batch{batch_size}'))
+                    entry['end_to_end_frames_per_s'] = stats['frames_per_s']
+                model['batches'].append(entry)
+                line = f"  batch {batch_size:4d}: model {entry['model_frames_per_s']:8.1f} frames/s"
+                if 'end_to_end_frames_per_s' in entry:
+                    line += f", end to end {entry['end_to_end_frames_per_s']:8.1f} frames/s"
+                print(line)
+            results.append(model)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join('bench_results', datetime.now().strftime('inference_%Y%m%d_%H%M%S.json'))
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'date': datetime.now().isoformat(), 'machine': platform.platform(), 'processor': platform.processor(),
+                   'cpu_count': os.cpu_count(), 'runtime': runtime, 'results': results}, f, indent=4)
+    print(f'\nResults saved to {output}')
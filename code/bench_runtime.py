@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 11:05:38 2026
+
+@author: tang
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import glob
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+import yaml
+import cv2
+from core.tf_runtime import RUNTIME_DEFAULTS, runtime_options, bf16_supported, describe_runtime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def settings_grid(base, args):
+    """The configured runtime plus one variation per requested value (one factor at a time)."""
+    grid = [('config', dict(base))]
+    variations = [('xla', [bool(int(v)) for v in args.xla.split(',')] if args.xla else []),
+                  ('onednn', [bool(int(v)) for v in args.onednn.split(',')] if args.onednn else []),
+                  ('intra_op_threads', [int(v) for v in args.intra_op_threads.split(',')] if args.intra_op_threads else []),
+                  ('inter_op_threads', [int(v) for v in args.inter_op_threads.split(',')] if args.inter_op_threads else []),
+                  ('precision', args.precision.split(',') if args.precision else [])]
+    for key, values in variations:
+        for value in values:
+            if value == base[key]:
+                continue
+            if value == 'mixed_bfloat16' and not bf16_supported():
+                print('Skipping mixed_bfloat16, this CPU has no native bfloat16 support.')
+                continue
+            setting = dict(base)
+            setting[key] = value
+            grid.append((f'{key}={value}', setting))
+    return grid
+
+
+def _runtime_flags(setting):
+    flags = []
+    for key in RUNTIME_DEFAULTS:
+        value = setting[key]
+        if value is None:
+            continue
+        flags += [f'--{key}', str(int(value)) if isinstance(value, bool) else str(value)]
+    return flags
+
+
+def _run(script, workdir, config, config_predict, setting, extra=()):
+    """Run train.py or predict.py in workdir so checkpoints and outputs never touch the real ones."""
+    with open(os.path.join(workdir, 'config.yaml'), 'w', encoding='utf-8') as f:
+        yaml.dump(config, f, allow_unicode=True)
+    with open(os.path.join(workdir, 'config_predict.yaml'), 'w', encoding='utf-8') as f:
+        yaml.dump(config_predict, f, allow_unicode=True)
+    cmd = [sys.executable, os.path.join(HERE, script), '--config', 'config.yaml', '--config_predict', 'config_predict.yaml']
+    start = time.perf_counter()
+    proc = subprocess.run(cmd + _runtime_flags(setting) + list(extra), cwd=workdir, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f'{script} failed with {describe_runtime(setting)}:\n{proc.stdout[-2000:]}\n{proc.stderr[-2000:]}')
+    return seconds
+
+
+def _marginal(short_units, short_seconds, long_units, long_seconds):
+    # the difference of two runs cancels TensorFlow start-up, graph building and XLA compilation
+    seconds = max(long_seconds - short_seconds, 1e-9)
+    return {'per_s': (long_units - short_units) / seconds, 'startup_s': short_seconds - short_units * seconds / (long_units - short_units)}
+
+
+def _trained_steps(workdir):
+    # the training steps train() ran, as counted by train.py --telemetry
+    summaries = glob.glob(os.path.join(workdir, 'telemetry', '*', 'summary.json'))
+    if not summaries:
+        raise RuntimeError(f'train.py wrote no telemetry summary in {workdir}')
+    steps = 0
+    for summary in summaries:
+        with open(summary, 'r') as f:
+            steps += json.load(f).get('steps', 0)
+    return steps
+
+
+def bench_train(config, config_predict, setting, epochs):
+    runs = []
+    for n in (1, 1 + epochs):
+        workdir = tempfile.mkdtemp(prefix='adpt_bench_')
+        try:
+            run_config = dict(config, EPOCHS=n, WARMUP_EPOCHS=min(config['WARMUP_EPOCHS'], 1))
+            seconds = _run('train.py', workdir, run_config, config_predict, setting, ['--telemetry', 'telemetry'])
+            runs.append((_trained_steps(workdir), seconds))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    rate = _marginal(runs[0][0], runs[0][1], runs[1][0], runs[1][1])
+    return {'steps_per_s': rate['per_s'], 'startup_s': rate['startup_s'], 'steps_per_epoch': runs[0][0]}
+
+
+def write_clip(video, path, frames):
+    cap = cv2.VideoCapture(video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    writer = None
+    written = 0
+    while written < frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if writer is None:
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (frame.shape[1], frame.shape[0]))
+        writer.write(frame)
+        written += 1
+    cap.release()
+    if writer is not None:
+        writer.release()
+    return written
+
+
+def bench_predict(config, config_predict, setting, video, frames):
+    runs = []
+    for n in (max(frames // 10, 1), frames):
+        workdir = tempfile.mkdtemp(prefix='adpt_bench_')
+        try:
+            os.makedirs(os.path.join(workdir, 'videos'))
+            n = write_clip(video, os.path.join(workdir, 'videos', 'clip.avi'), n)
+            run_predict = dict(config_predict, Video_path=os.path.join(workdir, 'videos') + '/', Video_type='avi',
+                               save_predicted_video=False)
+            runs.append((n, _run('predict.py', workdir, config, run_predict, setting)))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    rate = _marginal(runs[0][0], runs[0][1], runs[1][0], runs[1][1])
+    return {'frames_per_s': rate['per_s'], 'startup_s': rate['startup_s']}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='training steps/s and inference frames/s for TensorFlow runtime settings')
+    parser.add_argument('--config', type=str, default = 'config.yaml')
+    parser.add_argument('--config_predict', type=str, default = 'config_predict.yaml')
+    parser.add_argument('--mode', type=str, default = 'both', choices=['train', 'predict', 'both'])
+    parser.add_argument('--xla', type=str, default = '0,1', help='comma separated values to try')
+    parser.add_argument('--onednn', type=str, default = '0,1')
+    parser.add_argument('--intra_op_threads', type=str, default = None, help='e.g. 8,16,32')
+    parser.add_argument('--inter_op_threads', type=str, default = None, help='e.g. 1,2,4')
+    parser.add_argument('--precision', type=str, default = 'float32,mixed_bfloat16')
+    parser.add_argument('--epochs', type=int, default = 2, help='timed training epochs after a one epoch warm-up run')
+    parser.add_argument('--frames', type=int, default = 500, help='frames of the first video used for inference timing')
+    parser.add_argument('--output', type=str, default = None, help='JSON file for the results (default bench_results/runtime_<time>.json)')
+    args = parser.parse_args()
+    with open(args.config, 'r', encoding='utf-8') as f:
+        result = yaml.load(f.read(), Loader=yaml.FullLoader)
+    with open(args.config_predict, 'r', encoding='utf-8') as f:
+        result_predict = yaml.load(f.read(), Loader=yaml.FullLoader)
+
+    # the runs happen in temporary directories, so every path has to be absolute
+    config = dict(result, IMG_DIR=os.path.abspath(result['IMG_DIR']), JSON=os.path.abspath(result['JSON']))
+    config_predict = dict(result_predict, model_path=os.path.abspath(result_predict['model_path']))
+    videos = sorted(os.path.join(result_predict['Video_path'], name) for name in os.listdir(result_predict['Video_path'])
+                    if name.endswith('.' + result_predict['Video_type'])) if args.mode != 'train' else []
+    if args.mode != 'train' and not videos:
+        raise SystemExit('No videos found in ' + result_predict['Video_path'])
+
+    results = []
+    for name, setting in settings_grid(runtime_options(result), args):
+        entry = {'name': name, 'runtime': setting}
+        print(f'\n{name}: {describe_runtime(setting)}')
+        config['runtime'] = setting
+        if args.mode in ('train', 'both'):
+            entry['train'] = bench_train(config, config_predict, setting, args.epochs)
+            print(f"  train   {entry['train']['steps_per_s']:8.2f} steps/s  (start-up {entry['train']['startup_s']:.1f} s)")
+        if args.mode in ('predict', 'both'):
+            entry['predict'] = bench_predict(config, config_predict, setting, videos[0], args.frames)
+            print(f"  predict {entry['predict']['frames_per_s']:8.2f} frames/s (start-up {entry['predict']['startup_s']:.1f} s)")
+        results.append(entry)
+
+    baseline = results[0]
+    print(f"\n{'setting':<32s} {'steps/s':>9s} {'frames/s':>9s}")
+    for entry in results:
+        line = f"  {entry['name']:<30s}"
+        for key, unit in (('train', 'steps_per_s'), ('predict', 'frames_per_s')):
+            if key in entry:
+                line += f" {entry[key][unit]:9.2f} ({entry[key][unit] / baseline[key][unit]:.2f}x)"
+        print(line)
+
+    output = args.output or os.path.join('bench_results', datetime.now().strftime('runtime_%Y%m%d_%H%M%S.json'))
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'date': datetime.now().isoformat(), 'machine': platform.platform(), 'processor': platform.processor(),
+                   'cpu_count': os.cpu_count(), 'bf16': bf16_supported(), 'results': results}, f, indent=4)
+    print(f'\nResults saved to {output}')
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 11:20:16 2026
+
+@author: tang
+"""
+
+import os
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import numpy as np
+import tensorflow as tf
+
+# config.yaml entries that change how a run trains but not the batches it is fed
+RUN_SETTINGS = ('initial_learning_rate', 'Tranfer_LR', 'alpha', 'EPOCHS', 'WARMUP_EPOCHS', 'early_stop', 'initial_weight', 'runtime')
+
+
+def cache_key(fingerprint, config, image_keys, batches):
+    """
+    Same for runs that augment the same frames (image_keys, in any order)
+    with the same settings and seed (shuffle_num), whatever their learning
+    rates and epochs.
+    """
+    digest = hashlib.sha1()
+    digest.update(fingerprint.encode())
+    digest.update(json.dumps({k: v for k, v in config.items() if k not in RUN_SETTINGS}, sort_keys=True, default=str).encode())
+    digest.update(json.dumps(sorted(map(str, image_keys))).encode())
+    digest.update(str(batches).encode())
+    return digest.hexdigest()[:16]
+
+
+def cache_size(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def evict(root, budget_bytes, keep=()):
+    """Delete the least recently used caches under root until all of them fit in budget_bytes; return the deleted ones."""
+    caches = []
+    for name in os.listdir(root) if os.path.isdir(root) else []:
+        path = os.path.join(root, name)
+        stamp = os.path.join(path, 'last_used')
+        if os.path.isdir(path):
+            caches.append((os.path.getmtime(stamp) if os.path.exists(stamp) else 0, path, cache_size(path)))
+    total = sum(size for _, _, size in caches)
+    removed = []
+    for _, path, size in sorted(caches):
+        if total <= budget_bytes:
+            break
+        if os.path.abspath(path) in [os.path.abspath(k) for k in keep]:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed.append(path)
+    return removed
+
+
+class EpochCache(tf.keras.utils.Sequence):
+    """
+    Replay `epochs` augmented epochs of a keras Sequence from disk. While
+    epoch e % epochs is not in `directory` yet, the batches are built by the
+    Sequence (decoded, augmented, with their targets) and written as .npy
+    files; the epoch is committed when all of its batches are written. From
+    then on, in this run and in later runs with the same key, the epoch is
+    read memory-mapped instead of augmented again. An epoch cut short (early
+    stopping, an interrupted run) is discarded. After every committed epoch
+    the least recently used caches next to this one are evicted down to
+    `budget_bytes`.
+    """
+    def __init__(self, sequence, directory, epochs, start_epoch=0, budget_bytes=None):
+        self.sequence = sequence
+        self.directory = directory
+        self.epochs = epochs
+        self.epoch = start_epoch
+        self.budget_bytes = budget_bytes
+        self.length = len(sequence)
+        self.hits, self.misses = 0, 0
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'last_used'), 'w') as f:
+            f.write(time.strftime('%Y-%m-%d %H:%M:%S'))
+        for name in os.listdir(directory):
+            if name.endswith('.part'):
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        self._evict()
+        self._open()
+
+    def _epoch_dir(self):
+        return os.path.join(self.directory, f'epoch_{self.epoch % self.epochs}')
+
+    def _open(self):
+        self.cached = os.path.isdir(self._epoch_dir())
+        self._written = set()
+
+    def _evict(self):
+        if self.budget_bytes is not None:
+            for path in evict(os.path.dirname(os.path.abspath(self.directory)), self.budget_bytes, keep=[self.directory]):
+                print(f'\nAugmented epoch cache {path} evicted (least recently used).')
+
+    def __len__(self):
+        return self.length
+
+    @staticmethod
+    def _load(directory, index):
+        with open(os.path.join(directory, f'{index}.structure'), 'rb') as f:
+            structure = pickle.load(f)
+        leaves = [np.load(os.path.join(directory, f'{index}_{j}.npy'), mmap_mode='r') for j in range(len(tf.nest.flatten(structure)))]
+        return tf.nest.pack_sequence_as(structure, leaves)
+
+    def __getitem__(self, index):
+        if self.cached:
+            self.hits += 1
+            return self._load(self._epoch_dir(), index)
+        part = self._epoch_dir() + '.part'
+        if index in self._written:
+            # fit peeks at the first batch before it starts the epoch
+            return self._load(part, index)
+        batch = self.sequence[index]
+        self.misses += 1
+        os.makedirs(part, exist_ok=True)
+        leaves = tf.nest.flatten(batch)
+        for j, leaf in enumerate(leaves):
+            np.save(os.path.join(part, f'{index}_{j}.npy'), np.asarray(leaf))
+        with open(os.path.join(part, f'{index}.structure'), 'wb') as f:
+            pickle.dump(tf.nest.map_structure(lambda leaf: None, batch), f)
+        self._written.add(index)
+        return batch
+
+    def on_epoch_end(self):
+        if not self.cached and len(self._written) == self.length:
+            os.replace(self._epoch_dir() + '.part', self._epoch_dir())
+            self._evict()
+        self.epoch += 1
+        self.sequence.on_epoch_end()
+        self._open()
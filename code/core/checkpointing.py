@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 15:12:09 2026
+
+@author: tang
+"""
+
+import os
+import json
+import time
+import shutil
+import tensorflow as tf
+
+
+def model_dir(animal, save_path):
+    # same layout as the checkpoints train() writes, e.g. singel_mouse_model/_117481/cp.ckpt
+    return os.path.join(animal + '_model', save_path)
+
+
+def resume_dir(animal, save_path):
+    return os.path.join(model_dir(animal, save_path), 'resume')
+
+
+def read_state(directory):
+    """Last completed epoch and schedule of an interrupted run, None if there is nothing to resume."""
+    try:
+        with open(os.path.join(directory, 'state.json'), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def clear_state(directory):
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class TrainingCheckpoint(tf.keras.callbacks.Callback):
+    """
+    Save model weights, optimizer state (moments, iteration count) and the
+    epoch counter after every epoch, so an interrupted run continues where it
+    stopped instead of starting from scratch. With restore=True the latest
+    checkpoint in `directory` is loaded when training begins; optimizer slots
+    that do not exist yet are filled in as soon as they are created.
+    """
+    def __init__(self, directory, EPOCHS, restore=False, max_to_keep=2):
+        super().__init__()
+        self.directory = directory
+        self.EPOCHS = EPOCHS
+        self.restore = restore
+        self.max_to_keep = max_to_keep
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+
+    def on_train_begin(self, logs=None):
+        self.checkpoint = tf.train.Checkpoint(model=self.model, optimizer=self.model.optimizer, epoch=self.epoch)
+        self.manager = tf.train.CheckpointManager(self.checkpoint, self.directory, max_to_keep=self.max_to_keep)
+        if self.restore and self.manager.latest_checkpoint:
+            self.checkpoint.restore(self.manager.latest_checkpoint).expect_partial()
+            print(f'\nResumed from {self.manager.latest_checkpoint} (epoch {int(self.epoch.numpy())})')
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch.assign(epoch + 1)
+        self.manager.save(checkpoint_number=epoch + 1)
+        # state.json last, so it never points at a checkpoint that was not written
+        state = {'epoch': epoch + 1, 'EPOCHS': self.EPOCHS, 'time': time.time()}
+        tmp = os.path.join(self.directory, 'state.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, os.path.join(self.directory, 'state.json'))
@@ -5,32 +5,226 @@ Created on Tue Jan  9 03:29:02 2024
 @author: tang
 """
 
+import numpy as np
+import cv2
 import imgaug.augmenters as iaa
-def data_augmentation():
-    aug = iaa.Sequential(
-        [       
-            iaa.Sometimes(0.5, iaa.Affine(rotate=(-25, 25))),
-            iaa.Sometimes(0.33, iaa.Affine(translate_percent={"x": (-0.2, 0.2), "y": (-0.2, 0.2)})),
-            iaa.Sometimes(0.5, iaa.Affine(scale=(0.5, 1.25))),
-                iaa.Sometimes(0.5, iaa.MotionBlur(k =  7, angle = [-90, 90])),
-                iaa.Sometimes(0.5, iaa.CoarseDropout(0.02, size_percent=0.3, per_channel=0.5)),
-                iaa.Sometimes(0.5, iaa.ElasticTransformation(sigma=5)),
-                # iaa.AdditiveGaussianNoise(loc=0, scale=(0.0, 0.05*255), per_channel=0.5),
-                # iaa.Grayscale(alpha=(0.5, 1.0)),
-                    # translate_percent={"x": (-0.12, 0.12), "y": (-0.20, 0.03)})),
-                iaa.Sometimes(
-                    0.1, iaa.AllChannelsHistogramEqualization()#"histeq"
-                ),
-                iaa.Sometimes(0.1, iaa.AllChannelsCLAHE()),#"clahe"
-                # iaa.Sometimes(cfg_cnt["logratio"], iaa.LogContrast(**opt))#"log"
-                # iaa.Sometimes(cfg_cnt["linearratio"], iaa.LinearContrast(**opt)),#"linear"
-                # iaa.Sometimes(cfg_cnt["sigmoidratio"], iaa.SigmoidContrast(**opt)),#"sigmoid"
-                # iaa.Sometimes(cfg_cnt["gammaratio"], iaa.GammaContrast(**opt)),#"gamma"
-                # iaa.Sometimes(0.3, iaa.Sharpen(False)),#"sharpen"
-                iaa.Sometimes(0.1, iaa.Emboss(alpha=(0.0,1.0),strength=(0.5,1.5))),#"emboss"
-                iaa.Sometimes(0.4, iaa.CropAndPad(percent=(-0.15, 0.15))),#, keep_size=False)),#"emboss"
-                # iaa.Sometimes(0.1, iaa.EdgeDetect(False)),#"edge"
-                # iaa.Resize({"height": IMG_SIZE_H, "width": IMG_SIZE_W}, interpolation="linear")
-        ]
-    )
-    return aug
\ No newline at end of file
+
+
+# Augmentation pipelines as data. Every op is an imgaug augmenter name, the
+# probability of its Sometimes wrapper and its keyword arguments. In params a
+# two-element list is a (low, high) range and {choice: [...]} a discrete choice.
+# budget_ms is the per-image cost budget at the training size (IMG_SIZE_H x
+# IMG_SIZE_W), checked by `python bench_augmentation.py --presets`. The values
+# are measured, not estimated: `python bench_augmentation.py --sizes 640x480
+# --presets --repeats 10` (batch 8, imgaug 0.4.0, OpenCV 4.10) on one core of an
+# Intel Xeon server CPU, Linux, gave full 20.4-26.0, balanced 8.3-9.4 and fast
+# 4.2-5.1 ms/image over four runs; each budget is the slowest run plus at least 15%.
+# Other CPUs need their own measurement.
+AUGMENTATION_PRESETS = {
+    'full': {
+        'budget_ms': 30.0,
+        'ops': [
+            {'op': 'Affine', 'probability': 0.5, 'params': {'rotate': [-25, 25]}},
+            {'op': 'Affine', 'probability': 0.33, 'params': {'translate_percent': {'x': [-0.2, 0.2], 'y': [-0.2, 0.2]}}},
+            {'op': 'Affine', 'probability': 0.5, 'params': {'scale': [0.5, 1.25]}},
+            {'op': 'MotionBlur', 'probability': 0.5, 'params': {'k': 7, 'angle': {'choice': [-90, 90]}}},
+            {'op': 'CoarseDropout', 'probability': 0.5, 'params': {'p': 0.02, 'size_percent': 0.3, 'per_channel': 0.5}},
+            {'op': 'ElasticTransformation', 'probability': 0.5, 'params': {'sigma': 5}},
+            {'op': 'AllChannelsHistogramEqualization', 'probability': 0.1, 'params': {}},
+            {'op': 'AllChannelsCLAHE', 'probability': 0.1, 'params': {}},
+            {'op': 'Emboss', 'probability': 0.1, 'params': {'alpha': [0.0, 1.0], 'strength': [0.5, 1.5]}},
+            {'op': 'CropAndPad', 'probability': 0.4, 'params': {'percent': [-0.15, 0.15]}},
+        ],
+    },
+    # full without the elastic warp, the most expensive op
+    'balanced': {
+        'budget_ms': 12.0,
+        'ops': [
+            {'op': 'Affine', 'probability': 0.5, 'params': {'rotate': [-25, 25]}},
+            {'op': 'Affine', 'probability': 0.33, 'params': {'translate_percent': {'x': [-0.2, 0.2], 'y': [-0.2, 0.2]}}},
+            {'op': 'Affine', 'probability': 0.5, 'params': {'scale': [0.5, 1.25]}},
+            {'op': 'MotionBlur', 'probability': 0.5, 'params': {'k': 7, 'angle': {'choice': [-90, 90]}}},
+            {'op': 'CoarseDropout', 'probability': 0.5, 'params': {'p': 0.02, 'size_percent': 0.3, 'per_channel': 0.5}},
+            {'op': 'AllChannelsHistogramEqualization', 'probability': 0.1, 'params': {}},
+            {'op': 'AllChannelsCLAHE', 'probability': 0.1, 'params': {}},
+            {'op': 'Emboss', 'probability': 0.1, 'params': {'alpha': [0.0, 1.0], 'strength': [0.5, 1.5]}},
+            {'op': 'CropAndPad', 'probability': 0.4, 'params': {'percent': [-0.15, 0.15]}},
+        ],
+    },
+    # one combined affine warp, crop/pad and cheap occlusion only; at least 3x cheaper than full
+    'fast': {
+        'budget_ms': 6.0,
+        'ops': [
+            {'op': 'Affine', 'probability': 0.7, 'params': {'rotate': [-25, 25], 'scale': [0.5, 1.25],
+                                                            'translate_percent': {'x': [-0.2, 0.2], 'y': [-0.2, 0.2]}}},
+            {'op': 'CoarseDropout', 'probability': 0.5, 'params': {'p': 0.02, 'size_percent': 0.3, 'per_channel': 0.5}},
+            {'op': 'CropAndPad', 'probability': 0.4, 'params': {'percent': [-0.15, 0.15]}},
+        ],
+    },
+}
+
+
+def augmentation_ops(augmentation=None):
+    """Resolve the `augmentation` entry of config.yaml (None, a preset name or a dict) to a list of ops."""
+    if augmentation is None:
+        augmentation = {}
+    if isinstance(augmentation, str):
+        augmentation = {'preset': augmentation}
+    if augmentation.get('ops'):
+        return augmentation['ops']
+    preset = augmentation.get('preset', 'full')
+    if preset not in AUGMENTATION_PRESETS:
+        raise ValueError(f'Unknown augmentation preset: {preset} (choose from {", ".join(AUGMENTATION_PRESETS)})')
+    return AUGMENTATION_PRESETS[preset]['ops']
+
+
+def _param(value):
+    if isinstance(value, dict):
+        if set(value) == {'choice'}:
+            return list(value['choice'])
+        return {k: _param(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return tuple(_param(v) for v in value)
+    return value
+
+
+def build_op(spec, seed=None):
+    kwargs = {k: _param(v) for k, v in spec.get('params', {}).items()}
+    if seed is not None:
+        kwargs['seed'] = seed
+    return getattr(iaa, spec['op'])(**kwargs)
+
+
+def data_augmentation(augmentation=None):
+    ops = []
+    for spec in augmentation_ops(augmentation):
+        op = build_op(spec)
+        probability = spec.get('probability', 1.0)
+        ops.append(op if probability >= 1.0 else iaa.Sometimes(probability, op))
+    aug = iaa.Sequential(ops)
+    return aug
+
+
+# parameters BatchAugmenter can fold into its single affine warp
+_GEOMETRIC_PARAMS = {'Affine': {'rotate', 'scale', 'translate_percent'}, 'CropAndPad': {'percent'}}
+
+
+class BatchAugmenter:
+    """
+    Batched counterpart of data_augmentation() built from the same ops and
+    probabilities.
+
+    Parameters for the whole batch are sampled in one go. The Affine and
+    CropAndPad ops are folded into a single affine matrix per image, so every
+    image is resampled once and keypoints are transformed with one matrix
+    product. Every other op runs through imgaug on the images selected for
+    it, keypoints included, so ops that move pixels (Fliplr,
+    PerspectiveTransform, ElasticTransformation ...) move the keypoints too.
+
+    Unlike the Sequential, the folded ops are applied before all the others.
+
+    Only the sampling and the matrices are batched: the warp itself is one
+    cv2.warpAffine per image. One cv2.remap over the zero-bordered, stacked
+    batch and tf.raw_ops.ImageProjectiveTransformV3 on the batch measured 3x
+    and 5x slower on one core (a batch of 8 x 480 x 640: 31 ms for the loop,
+    90 ms remap, 159 ms TensorFlow).
+
+    train() applies its own data_augmentation() pipeline image by image, so
+    this class is used by bench_augmentation.py only.
+    """
+    def __init__(self, augmentation=None, seed=None):
+        self.rng = np.random.default_rng(seed)
+        imgaug_seed = int(self.rng.integers(2 ** 31 - 1))
+        self.geometric = []
+        self.others = []
+        for i, spec in enumerate(augmentation_ops(augmentation)):
+            probability = spec.get('probability', 1.0)
+            if spec['op'] in _GEOMETRIC_PARAMS:
+                unsupported = set(spec.get('params', {})) - _GEOMETRIC_PARAMS[spec['op']]
+                if unsupported:
+                    raise ValueError(f'BatchAugmenter cannot fold {spec["op"]} parameters: {", ".join(sorted(unsupported))}')
+                self.geometric.append((probability, spec))
+            else:
+                self.others.append((probability, build_op(spec, imgaug_seed + i)))
+
+    def _uniform(self, value, size, default):
+        if value is None:
+            return np.full(size, float(default))
+        if isinstance(value, (list, tuple)):
+            return self.rng.uniform(value[0], value[1], size)
+        return np.full(size, float(value))
+
+    def _op_matrices(self, spec, n, h, w):
+        params = spec.get('params', {})
+        matrices = np.broadcast_to(np.eye(3), (n, 3, 3)).copy()
+        if spec['op'] == 'CropAndPad':
+            # each side is sampled independently, then the image is resized back
+            sides = self._uniform(params.get('percent'), (n, 4), 0.0)
+            top, right, bottom, left = sides[:, 0] * h, sides[:, 1] * w, sides[:, 2] * h, sides[:, 3] * w
+            matrices[:, 0, 0] = w / (w + left + right)
+            matrices[:, 1, 1] = h / (h + top + bottom)
+            matrices[:, 0, 2] = left * matrices[:, 0, 0]
+            matrices[:, 1, 2] = top * matrices[:, 1, 1]
+            return matrices
+
+        # Affine: scale and rotate about the image centre, then translate
+        angle = np.deg2rad(self._uniform(params.get('rotate'), n, 0.0))
+        factor = self._uniform(params.get('scale'), n, 1.0)
+        translate = params.get('translate_percent', {})
+        if not isinstance(translate, dict):
+            translate = {'x': translate, 'y': translate}
+        tx = self._uniform(translate.get('x'), n, 0.0) * w
+        ty = self._uniform(translate.get('y'), n, 0.0) * h
+        cos, sin = factor * np.cos(angle), factor * np.sin(angle)
+        matrices[:, 0, 0], matrices[:, 0, 1] = cos, -sin
+        matrices[:, 1, 0], matrices[:, 1, 1] = sin, cos
+        matrices[:, 0, 2] = w / 2.0 - cos * w / 2.0 + sin * h / 2.0 + tx
+        matrices[:, 1, 2] = h / 2.0 - sin * w / 2.0 - cos * h / 2.0 + ty
+        return matrices
+
+    def sample_affine(self, n, h, w):
+        """Sample n 3x3 matrices composing the geometric ops in pipeline order."""
+        matrices = np.broadcast_to(np.eye(3), (n, 3, 3)).copy()
+        for probability, spec in self.geometric:
+            op = self._op_matrices(spec, n, h, w)
+            op[self.rng.random(n) >= probability] = np.eye(3)
+            matrices = op @ matrices
+        return matrices
+
+    def __call__(self, images, keypoints):
+        """
+        images: uint8 array (B, H, W, C); keypoints: float array (B, K, 2),
+        missing keypoints as NaN. Returns augmented copies of both.
+        """
+        images = np.asarray(images)
+        keypoints = np.asarray(keypoints, dtype=np.float32)
+        n, h, w = images.shape[:3]
+
+        matrices = self.sample_affine(n, h, w)
+        out = np.empty_like(images)
+        identity = np.all(np.isclose(matrices, np.eye(3)), axis=(1, 2))
+        for i in range(n):
+            if identity[i]:
+                out[i] = images[i]
+            else:
+                warped = cv2.warpAffine(images[i], matrices[i, :2], (w, h), flags=cv2.INTER_LINEAR,
+                                        borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+                out[i] = warped.reshape(out[i].shape)
+        kps = keypoints @ matrices[:, :2, :2].transpose(0, 2, 1) + matrices[:, None, :2, 2]
+
+        probabilities = np.array([p for p, _ in self.others])
+        selected = self.rng.random((len(self.others), n)) < probabilities[:, None]
+        for (_, augmenter), chosen in zip(self.others, selected):
+            idx = np.flatnonzero(chosen)
+            if len(idx) == 0:
+                continue
+            # imgaug leaves the keypoints alone for ops that only change pixel values
+            missing = np.isnan(kps[idx])
+            sub_images, sub_kps = augmenter(images=list(out[idx]), keypoints=list(np.nan_to_num(kps[idx])))
+            kps[idx] = np.where(missing, np.nan, np.asarray(sub_kps, dtype=np.float32))
+            out[idx] = np.asarray(sub_images)
+        return out, kps
+
+
+def data_augmentation_batch(augmentation=None, seed=None):
+    return BatchAugmenter(augmentation, seed)
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:40:27 2026
+
+@author: tang
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+import cv2
+
+
+def read_annotations(JSON, IMG_DIR):
+    """Return (image paths, joints) from merged_annotations.json, joints as (N, num_classes * NUM_KEYPOINT, 2)."""
+    with open(JSON, 'r') as f:
+        annotations = json.load(f)
+    paths, joints = [], []
+    for annotation in annotations:
+        img_path = annotation['img_path'].replace('\\', '/')
+        paths.append(img_path if os.path.isabs(img_path) else os.path.join(IMG_DIR, img_path))
+        joints.append([[np.nan if x is None else x, np.nan if y is None else y] for x, y, _ in annotation['joints']])
+    return paths, np.asarray(joints, dtype=np.float32)
+
+
+def split_dataset(num_samples, TrainingFraction, shuffle_num):
+    """Deterministic train/test split for a given shuffle_num."""
+    order = np.random.RandomState(shuffle_num).permutation(num_samples)
+    num_train = int(round(num_samples * TrainingFraction))
+    return np.sort(order[:num_train]), np.sort(order[num_train:])
+
+
+def load_image(path, global_scale, IMG_SIZE_H, IMG_SIZE_W):
+    """Read a frame, downsample it by global_scale and pad/crop it to IMG_SIZE_H x IMG_SIZE_W."""
+    image = cv2.imread(path)
+    if image is None:
+        raise IOError(f'Cannot read image: {path}')
+    if global_scale != 1:
+        image = cv2.resize(image, None, fx=global_scale, fy=global_scale, interpolation=cv2.INTER_AREA)
+    out = np.zeros((IMG_SIZE_H, IMG_SIZE_W, image.shape[2]), dtype=np.uint8)
+    h, w = min(IMG_SIZE_H, image.shape[0]), min(IMG_SIZE_W, image.shape[1])
+    out[:h, :w] = image[:h, :w]
+    return out
+
+
+def dataset_fingerprint(JSON, paths):
+    """Hash of the annotation file and the size/mtime of every image it references."""
+    digest = hashlib.sha1()
+    with open(JSON, 'rb') as f:
+        digest.update(f.read())
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f'{path}|{stat.st_size}|{stat.st_mtime_ns}'.encode())
+    return digest.hexdigest()
+
+
+def frame_keys(paths, joints):
+    """One key per labelled frame, changing when either the image path or its labels change."""
+    return [hashlib.sha1(path.encode() + np.nan_to_num(kps, nan=-1).astype(np.float32).tobytes()).hexdigest()
+            for path, kps in zip(paths, joints)]
+
+
+def trained_frames_path(model_dir):
+    return os.path.join(model_dir, 'trained_frames.json')
+
+
+def load_trained_frames(model_dir):
+    try:
+        with open(trained_frames_path(model_dir), 'r') as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def save_trained_frames(model_dir, keys):
+    os.makedirs(model_dir, exist_ok=True)
+    with open(trained_frames_path(model_dir), 'w') as f:
+        json.dump(sorted(keys), f)
+
+
+def new_frame_indices(paths, joints, indices, trained):
+    """Indices of frames that are not in the trained set, new or relabelled since the last training."""
+    keys = frame_keys(paths, joints)
+    return np.asarray([i for i in indices if keys[i] not in trained], dtype=np.int64)
+
+
+def split_path(model_dir):
+    return os.path.join(model_dir, 'split.json')
+
+
+def _json_key(key):
+    if isinstance(key, bytes):
+        return key.decode()
+    return key.item() if isinstance(key, np.generic) else key
+
+
+def save_split(model_dir, train_keys, train, test_keys, test):
+    """
+    Record the split train() made: its image keys and their annotation
+    indices (None where unmatched), test None if it was not seen.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    split = {'train_keys': [_json_key(k) for k in train_keys], 'train': list(train),
+             'test_keys': None if test_keys is None else [_json_key(k) for k in test_keys], 'test': test}
+    with open(split_path(model_dir), 'w') as f:
+        json.dump(split, f)
+
+
+def load_split(model_dir):
+    """The split recorded by save_split, None if there is none."""
+    try:
+        with open(split_path(model_dir), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def recorded_split(model_dir, JSON, IMG_DIR):
+    """
+    Train/test annotation indices of the split train() made for the model in
+    model_dir, from its split.json, with the keys resolved against the
+    current merged_annotations.json. Raises ValueError when there is no
+    record or a recorded frame is no longer annotated: a split recomputed
+    from shuffle_num is not the one the model was trained on.
+    """
+    split = load_split(model_dir)
+    if split is None or split['test_keys'] is None:
+        raise ValueError(f'no train/test split recorded in {split_path(model_dir)}')
+    train, test = key_indices(split['train_keys'], JSON, IMG_DIR), key_indices(split['test_keys'], JSON, IMG_DIR)
+    missing = sum(i is None for i in train + test)
+    if missing:
+        raise ValueError(f'{missing} frames of the split in {split_path(model_dir)} are not in {JSON}')
+    return np.asarray(train, dtype=np.int64), np.asarray(test, dtype=np.int64)
+
+
+def oversample(image_keys, indices, new_idx, repeats):
+    """
+    image_keys (a list or an array, kept as such) with the keys whose
+    annotation index in `indices` is in new_idx repeated `repeats` times in all.
+    """
+    extra = [key for key, i in zip(image_keys, indices) if i in new_idx] * (repeats - 1)
+    if isinstance(image_keys, np.ndarray):
+        return np.concatenate([image_keys, np.asarray(extra, dtype=image_keys.dtype)])
+    return list(image_keys) + extra
+
+
+def key_indices(keys, JSON, IMG_DIR):
+    """
+    Annotation index of every image key of the datasets train() builds, None
+    where a key matches no annotation. A key is an index into
+    merged_annotations.json or an image path as written there, joined with
+    IMG_DIR or, when the name is unique, just the file name.
+    """
+    with open(JSON, 'r') as f:
+        annotations = json.load(f)
+    lookup, names = {}, {}
+    for i, annotation in enumerate(annotations):
+        img_path = annotation['img_path'].replace('\\', '/')
+        for form in (annotation['img_path'], img_path, os.path.join(IMG_DIR, img_path).replace('\\', '/')):
+            lookup.setdefault(os.path.normpath(form), i)
+        names.setdefault(os.path.basename(img_path), []).append(i)
+    indices = []
+    for key in keys:
+        if isinstance(key, (int, np.integer)) and not isinstance(key, bool):
+            indices.append(int(key) if 0 <= key < len(annotations) else None)
+            continue
+        key = (key.decode() if isinstance(key, bytes) else str(key)).replace('\\', '/')
+        index = lookup.get(os.path.normpath(key))
+        if index is None and len(names.get(os.path.basename(key), ())) == 1:
+            index = names[os.path.basename(key)][0]
+        indices.append(index)
+    return indices
+
+
+def shard_indices(indices, index, num_shards):
+    """Strided shard for data-parallel worker `index`; all shards have the same length so workers run the same number of steps."""
+    indices = np.asarray(indices)
+    return indices[index::num_shards][:len(indices) // num_shards]
+
+
+def shard_keys(image_keys, index, num_shards):
+    """shard_indices for the image_keys of a Sequence, a list or an array, kept as such."""
+    positions = shard_indices(np.arange(len(image_keys)), index, num_shards)
+    if isinstance(image_keys, np.ndarray):
+        return image_keys[positions]
+    return [image_keys[i] for i in positions]
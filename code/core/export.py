@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 29 10:12:51 2026
+
+@author: tang
+"""
+
+import os
+import json
+from datetime import datetime
+import numpy as np
+import tensorflow as tf
+
+
+def serving_function(model, IMG_SIZE_H, IMG_SIZE_W):
+    """Inference-only forward pass with a fixed (batch, IMG_SIZE_H, IMG_SIZE_W, 3) float32 input; outputs output_0, output_1 ..."""
+    @tf.function(input_signature=[tf.TensorSpec([None, IMG_SIZE_H, IMG_SIZE_W, 3], tf.float32, name='image')])
+    def serve(image):
+        outputs = model(image, training=False)
+        if not isinstance(outputs, (list, tuple)):
+            outputs = [outputs]
+        return {f'output_{i}': tf.cast(output, tf.float32) for i, output in enumerate(outputs)}
+    return serve
+
+
+def export_saved_model(model, directory, IMG_SIZE_H, IMG_SIZE_W):
+    """
+    Save only the weights and the serving function: loading it needs
+    neither core.predict nor the training graph.
+    """
+    module = tf.Module()
+    module.model = model
+    module.serve = serving_function(model, IMG_SIZE_H, IMG_SIZE_W)
+    tf.saved_model.save(module, directory, signatures={'serving_default': module.serve})
+    return directory
+
+
+def export_tflite(saved_model_dir, output_file, float16=False):
+    """TFLite flatbuffer of an exported SavedModel, float32 or with float16 weights."""
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    if float16:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    with open(output_file, 'wb') as f:
+        f.write(converter.convert())
+    return output_file
+
+
+def quantize_int8(saved_model_dir, images):
+    """
+    Full-integer TFLite model: weights and activations in int8, with the
+    activation ranges calibrated on `images` (preprocessed model inputs,
+    iterated once).
+    Input and output stay float32, so the model is a drop-in replacement.
+    """
+    def representative_dataset():
+        for image in images:
+            yield [np.asarray(image, dtype=np.float32)[None]]
+
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    return converter.convert()
+
+
+def bodypart_rmse(poses, joints, bodyparts):
+    """
+    RMSE in pixels per bodypart over all individuals, poses (N, parts, 3) from
+    decode_outputs against annotated joints (N, parts, 2), missing as NaN.
+    """
+    poses = np.asarray(poses, dtype=np.float32).reshape(len(poses), -1, len(bodyparts), 3)
+    joints = np.asarray(joints, dtype=np.float32).reshape(len(joints), -1, len(bodyparts), 2)
+    squared = ((poses[..., :2] - joints) ** 2).sum(axis=-1)
+    return {part: float(np.sqrt(np.nanmean(squared[:, :, k]))) if np.isfinite(squared[:, :, k]).any() else None
+            for k, part in enumerate(bodyparts)}
+
+
+def rmse_increase(float_rmse, int8_rmse, max_increase):
+    """
+    Per-bodypart rows of both RMSEs and the increase, for the bodyparts
+    annotated in the held-out frames, and the bodyparts whose RMSE rose by
+    more than max_increase pixels.
+    """
+    rows, failed = [], []
+    for part, rmse in float_rmse.items():
+        if rmse is None:
+            continue
+        increase = int8_rmse[part] - rmse
+        rows.append({'bodypart': part, 'float_rmse': rmse, 'int8_rmse': int8_rmse[part], 'increase': increase})
+        if increase > max_increase:
+            failed.append(part)
+    return rows, failed
+
+
+def write_export_info(directory, info):
+    info = dict(info, date=datetime.now().isoformat())
+    with open(os.path.join(directory, 'export.json'), 'w') as f:
+        json.dump(info, f, indent=4)
+
+
+def output_order(names):
+    """The output_<n> names of serving_function in model order: output_2 before output_10."""
+    return sorted(names, key=lambda name: int(name.rsplit('_', 1)[1]))
+
+
+class SavedModelRunner:
+    """Runs the serving signature of a SavedModel directory on a batch and returns the outputs as numpy arrays, in model order."""
+    def __init__(self, directory):
+        # the loaded object owns the variables, keep it alive with the signature
+        self.module = tf.saved_model.load(directory)
+        self.fn = self.module.signatures['serving_default']
+        self.input_name = list(self.fn.structured_input_signature[1])[0]
+
+    def __call__(self, batch):
+        outputs = self.fn(**{self.input_name: tf.convert_to_tensor(batch, dtype=tf.float32)})
+        return [outputs[name].numpy() for name in output_order(outputs)]
+
+
+class TFLiteRunner:
+    """
+    Runs a .tflite model on a batch. The input is resized when the batch size
+    changes, and the interpreter uses TensorFlow's intra-op thread count, so
+    the runtime settings and worker pinning apply to it as well. Outputs come
+    in model order, taken from the serving signature; the converter does not
+    keep the order of the output tensors.
+    """
+    def __init__(self, model_file):
+        threads = tf.config.threading.get_intra_op_parallelism_threads() or None
+        self.interpreter = tf.lite.Interpreter(model_path=model_file, num_threads=threads)
+        self.input = self.interpreter.get_input_details()[0]
+        self.outputs = self.interpreter.get_output_details()
+        if 'serving_default' in self.interpreter.get_signature_list():
+            details = self.interpreter.get_signature_runner('serving_default').get_output_details()
+            self.outputs = [details[name] for name in output_order(details)]
+        self.batch_size = None
+
+    def __call__(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        if batch.shape[0] != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input['index'], batch.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = batch.shape[0]
+        self.interpreter.set_tensor(self.input['index'], _quantize(batch, self.input))
+        self.interpreter.invoke()
+        return [_dequantize(self.interpreter.get_tensor(output['index']), output)
+                for output in self.outputs]
+
+
+def _quantize(array, detail):
+    # models converted with integer input take quantized values, float models the array as is
+    if detail['dtype'] in (np.int8, np.uint8):
+        scale, zero_point = detail['quantization']
+        info = np.iinfo(detail['dtype'])
+        return np.clip(np.round(array / scale + zero_point), info.min, info.max).astype(detail['dtype'])
+    return array
+
+
+def _dequantize(array, detail):
+    if detail['dtype'] in (np.int8, np.uint8):
+        scale, zero_point = detail['quantization']
+        return (array.astype(np.float32) - zero_point) * scale
+    return array
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:02:37 2026
+
+@author: tang
+"""
+
+import inspect
+import tensorflow as tf
+
+
+class FitHook:
+    """
+    Extend the model.fit call made inside the compiled core.train, whose
+    train() signature is fixed. While the context is active, tf.keras.Model.fit
+    adds `callbacks` to the ones train() passes, starts at `initial_epoch` and
+    sets `fit_kwargs` (e.g. workers) where this Keras version's fit accepts
+    them. on_fit(model, x, validation_data), if given, is called before
+    training starts and may return more fit keyword arguments.
+    """
+    def __init__(self, callbacks=(), initial_epoch=0, fit_kwargs=None, on_fit=None):
+        self.callbacks = list(callbacks)
+        self.initial_epoch = initial_epoch
+        self.fit_kwargs = dict(fit_kwargs or {})
+        self.on_fit = on_fit
+        self.calls = 0
+
+    def __enter__(self):
+        self._fit = tf.keras.Model.fit
+        signature = inspect.signature(self._fit)
+        hook = self
+
+        def fit(model, *args, **kwargs):
+            hook.calls += 1
+            arguments = signature.bind(model, *args, **kwargs).arguments
+            # **kwargs of fit itself come back as one entry
+            arguments.update(arguments.pop('kwargs', {}))
+            if hook.on_fit is not None:
+                extra = hook.on_fit(model, arguments.get('x'), arguments.get('validation_data'))
+                arguments.update(hook.supported(extra or {}, signature))
+            arguments['callbacks'] = list(arguments.get('callbacks') or []) + hook.callbacks
+            if hook.initial_epoch:
+                arguments['initial_epoch'] = hook.initial_epoch
+            arguments.update(hook.supported(hook.fit_kwargs, signature))
+            arguments.pop('self')
+            return hook._fit(model, **arguments)
+
+        tf.keras.Model.fit = fit
+        return self
+
+    def __exit__(self, *exc):
+        tf.keras.Model.fit = self._fit
+        if self.calls == 0 and exc[0] is None:
+            print('\ntrain() never called model.fit, the training extensions were not applied.')
+        return False
+
+    @staticmethod
+    def supported(fit_kwargs, signature):
+        accepted = {key: value for key, value in fit_kwargs.items() if key in signature.parameters}
+        for key in set(fit_kwargs) - set(accepted):
+            print(f'\nThis Keras version does not support fit({key}=...), ignored.')
+        return accepted
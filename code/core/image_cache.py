@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 13:05:52 2026
+
+@author: tang
+"""
+
+import os
+import hashlib
+import multiprocessing as mp
+import numpy as np
+import cv2
+from matplotlib import pyplot as plt
+
+
+def _norm(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _to_uint8(image):
+    """The uint8 frame a float32 image in [0, 1] was made from (plt.imread of a png), None if there is none."""
+    if image.dtype != np.float32:
+        return None
+    compact = np.rint(image * 255).astype(np.uint8)
+    return compact if np.array_equal(np.divide(compact, 255, dtype=np.float32), image) else None
+
+
+class ImageCache:
+    """
+    Keep the dataset frames train() decodes, as .npy files under `directory`,
+    while the context is active. cv2.imread and plt.imread are replaced:
+    a frame of `paths` read for the first time is decoded as usual and stored,
+    later reads (later epochs, later runs) load the stored array instead of
+    decoding the image again. Entries are keyed by the reader, its arguments
+    and the path, size and mtime of the image, so an edited image is decoded
+    again. plt.imread returns float32 for a png; it is stored as the uint8
+    it was made from and converted back exactly on load. The frames are kept
+    at their original resolution, train() resizes them in its augmentation.
+    """
+    def __init__(self, directory, paths):
+        self.directory = directory
+        self.paths = {_norm(path) for path in paths}
+        # shared with the forked processes of --processes
+        self.hits, self.misses = mp.Value('l', 0), mp.Value('l', 0)
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry(self, reader, path, args):
+        stat = os.stat(path)
+        key = f'{reader}|{_norm(path)}|{stat.st_size}|{stat.st_mtime_ns}|{args!r}'
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def read(self, reader, original, path, *args, **kwargs):
+        if not isinstance(path, str) or kwargs or _norm(path) not in self.paths:
+            return original(path, *args, **kwargs)
+        entry = self._entry(reader, path, args)
+        if os.path.exists(entry + '.npy'):
+            with self.hits.get_lock():
+                self.hits.value += 1
+            return np.load(entry + '.npy')
+        if os.path.exists(entry + '.u8.npy'):
+            with self.hits.get_lock():
+                self.hits.value += 1
+            return np.divide(np.load(entry + '.u8.npy'), 255, dtype=np.float32)
+        image = original(path, *args)
+        if image is None:
+            return image
+        with self.misses.get_lock():
+            self.misses.value += 1
+        compact = _to_uint8(image)
+        target = entry + ('.npy' if compact is None else '.u8.npy')
+        tmp = f'{target}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, image if compact is None else compact)
+        os.replace(tmp, target)
+        return image
+
+    def __enter__(self):
+        self._originals = {'cv2': cv2.imread, 'plt': plt.imread}
+        cv2.imread = lambda path, *args, **kwargs: self.read('cv2', self._originals['cv2'], path, *args, **kwargs)
+        plt.imread = lambda path, *args, **kwargs: self.read('plt', self._originals['plt'], path, *args, **kwargs)
+        return self
+
+    def __exit__(self, *exc):
+        cv2.imread, plt.imread = self._originals['cv2'], self._originals['plt']
+        return False
+
+    def summary(self):
+        if self.hits.value + self.misses.value == 0:
+            return 'train() read none of its images through cv2.imread or plt.imread, the image cache was not used.'
+        return f'Image cache {self.directory}: {self.hits.value} images loaded, {self.misses.value} decoded and stored.'
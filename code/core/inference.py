@@ -0,0 +1,624 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 14:40:12 2026
+
+@author: tang
+"""
+
+import os
+import glob
+import json
+import time
+import shutil
+import hashlib
+import multiprocessing as mp
+from functools import partial
+import numpy as np
+import cv2
+from core.pipeline import Pipeline, Stage
+from core.sharding import match_identities
+from core.trajectory import trajectory_cache_path, draw_pose
+
+
+class _Captured(BaseException):
+    # BaseException so a broad `except Exception` inside predict() cannot swallow it
+    pass
+
+
+# positions of videos, save_video and IMG_SIZE_H, IMG_SIZE_W in the predict() arguments
+_VIDEOS, _SAVE_VIDEO, _SIZE = 23, 24, slice(3, 5)
+
+
+def capture_model(predict_args):
+    """
+    Build the ADPT network the way core.predict.predict does and return it
+    with its weights loaded. predict() is run with the usual arguments but no
+    videos, and stopped right after it loads the checkpoint; should a later
+    version load its weights some other way, it finishes without touching a
+    video and the missing model is reported. The network has to take
+    IMG_SIZE_H x IMG_SIZE_W images, the input preprocess() prepares.
+    """
+    import tensorflow as tf
+    from core.predict import predict
+    args = list(predict_args)
+    args[_VIDEOS], args[_SAVE_VIDEO] = [], False
+    captured = {}
+    load_weights = tf.keras.Model.load_weights
+
+    def capture(self, *args, **kwargs):
+        status = load_weights(self, *args, **kwargs)
+        if status is not None and hasattr(status, 'expect_partial'):
+            status.expect_partial()
+        captured['model'] = self
+        raise _Captured()
+
+    tf.keras.Model.load_weights = capture
+    try:
+        predict(*args)
+    except _Captured:
+        pass
+    finally:
+        tf.keras.Model.load_weights = load_weights
+    if 'model' not in captured:
+        raise RuntimeError('core.predict.predict finished without loading a model, the network cannot be captured')
+    model = captured['model']
+    size = tuple(predict_args[_SIZE])
+    if tuple(model.input_shape[1:3]) != size:
+        raise RuntimeError(f'the captured network takes {model.input_shape[1:3]} images, not IMG_SIZE_H x IMG_SIZE_W {size}')
+    return model
+
+
+def is_checkpoint(model_path):
+    """True for a training checkpoint (cp.ckpt), which only core.predict can load; False for the formats of export.py and saved Keras models."""
+    return not (os.path.isdir(model_path) or model_path.endswith(('.keras', '.h5', '.tflite')))
+
+
+def load_model(model_path, predict_args):
+    """
+    The model for model_path: an exported SavedModel directory or .tflite
+    file (export.py) is run as is, a saved Keras model is loaded directly and
+    a training checkpoint (cp.ckpt) is built through core.predict.
+    """
+    import tensorflow as tf
+    from core.export import SavedModelRunner, TFLiteRunner
+    if model_path.endswith('.tflite'):
+        return TFLiteRunner(model_path)
+    if os.path.isdir(model_path):
+        return SavedModelRunner(model_path)
+    if model_path.endswith(('.keras', '.h5')):
+        return tf.keras.models.load_model(model_path, compile=False)
+    return capture_model(predict_args)
+
+
+def make_infer(model):
+    """batch (B, H, W, C) float32 -> list of numpy outputs."""
+    import tensorflow as tf
+    from core.export import SavedModelRunner, TFLiteRunner
+    if isinstance(model, (SavedModelRunner, TFLiteRunner)):
+        return model
+
+    @tf.function(reduce_retracing=True)
+    def forward(batch):
+        return model(batch, training=False)
+
+    def infer(batch):
+        outputs = forward(tf.convert_to_tensor(batch))
+        if not isinstance(outputs, (list, tuple)):
+            outputs = [outputs]
+        return [np.asarray(output) for output in outputs]
+    return infer
+
+
+# ImageNet channel means subtracted by keras.applications.resnet.preprocess_input, in BGR order
+_IMAGENET_BGR_MEAN = np.array([103.939, 116.779, 123.68], dtype=np.float32)
+
+
+def preprocess(frame, IMG_SIZE_H, IMG_SIZE_W, out=None):
+    """
+    A BGR video frame as network input, like core.predict: resized to
+    IMG_SIZE_H x IMG_SIZE_W (bilinear) and converted to RGB, then
+    keras.applications.resnet.preprocess_input, which turns it back into BGR
+    and subtracts the ImageNet means. The two channel swaps cancel, so the
+    frame is used in its own channel order.
+    """
+    if out is None:
+        out = np.empty((IMG_SIZE_H, IMG_SIZE_W, 3), dtype=np.float32)
+    out[:] = cv2.resize(frame, (IMG_SIZE_W, IMG_SIZE_H), interpolation=cv2.INTER_LINEAR)
+    out -= _IMAGENET_BGR_MEAN
+    return out
+
+
+class FrameBatcher:
+    """
+    Preprocess frames straight into fixed-size (batch_size, H, W, 3) tensors.
+    The last partial batch is padded with blank rows, so the model always
+    sees the same input shape and is traced once; `indices` holds the frame
+    index of every real row and the padded rows are dropped after inference.
+    `sizes` holds the (height, width) of every frame, to map poses back.
+    """
+    def __init__(self, batch_size, IMG_SIZE_H, IMG_SIZE_W, keep_frames=False):
+        self.batch_size = batch_size
+        self.shape = (batch_size, IMG_SIZE_H, IMG_SIZE_W, 3)
+        self.keep_frames = keep_frames
+        self._new()
+
+    def _new(self):
+        self.images = np.zeros(self.shape, dtype=np.float32)
+        self.indices = []
+        self.sizes = []
+        self.frames = []
+
+    def add(self, index, frame):
+        preprocess(frame, self.shape[1], self.shape[2], out=self.images[len(self.indices)])
+        self.indices.append(index)
+        self.sizes.append(frame.shape[:2])
+        self.frames.append(frame if self.keep_frames else None)
+        return self.flush() if len(self.indices) == self.batch_size else []
+
+    def flush(self):
+        if not self.indices:
+            return []
+        batch = (np.asarray(self.indices), np.asarray(self.sizes), self.frames, self.images)
+        self._new()
+        return [batch]
+
+
+def find_peak(heatmap):
+    """
+    x, y (in heatmap cells) and likelihood of one bodypart, as core.predict
+    finds them: the cells at or above half the heatmap maximum are split into
+    connected components and the largest one is kept, so a single stray cell
+    cannot win over the blob of the bodypart. The position is the centroid
+    of that component and the likelihood its highest value.
+    """
+    peak = float(heatmap.max())
+    binary = (heatmap >= (0.5 * peak if peak > 0 else peak)).astype(np.uint8)
+    _, labels, stats, centroids = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    x, y = centroids[largest]
+    return x, y, float(heatmap[labels == largest].max())
+
+
+def decode_outputs(outputs, num_parts, sizes):
+    """
+    Poses (B, num_parts, 3) as x, y in video pixels and likelihood, from the
+    heatmap output (the one with num_parts = NUM_KEYPOINT * num_classes
+    channels, individual by individual). sizes are the (height, width) of
+    the frames, per frame or one for all.
+    """
+    heatmaps = next((o for o in outputs if o.ndim == 4 and o.shape[-1] == num_parts), None)
+    if heatmaps is None:
+        raise ValueError(f'no model output has {num_parts} heatmap channels (NUM_KEYPOINT x num_classes), '
+                         f'got outputs of shape {[o.shape for o in outputs]}')
+    B, Ho, Wo, K = heatmaps.shape
+    poses = np.empty((B, K, 3), dtype=np.float32)
+    for b in range(B):
+        for k in range(K):
+            poses[b, k] = find_peak(heatmaps[b, :, :, k])
+    sizes = np.broadcast_to(np.asarray(sizes, dtype=np.float32).reshape(-1, 2), (B, 2))
+    # cell centres to pixel centres of the frame
+    poses[:, :, 0] = (poses[:, :, 0] + 0.5) * (sizes[:, 1:] / Wo) - 0.5
+    poses[:, :, 1] = (poses[:, :, 1] + 0.5) * (sizes[:, :1] / Ho) - 0.5
+    return poses
+
+
+class IdentityTracker:
+    """
+    Keeps every individual of a multi-animal model in its own columns: the
+    individuals of each frame are reordered to best match the previous frame
+    (core.sharding.match_identities), like the tracker of core.predict.
+    Frames must come in order; `last` seeds the first one.
+    """
+    def __init__(self, num_classes, pcutoff=0.0, last=None):
+        self.num_classes = num_classes
+        self.pcutoff = pcutoff
+        self.last = None if last is None else np.array(last, dtype=np.float32)
+
+    def __call__(self, poses):
+        if self.num_classes == 1:
+            return poses
+        poses = np.array(poses, dtype=np.float32)
+        individuals = poses.reshape(len(poses), self.num_classes, -1, 3)
+        for pose, order in zip(poses, individuals):
+            if self.last is not None:
+                perm, _ = match_identities(self.last[None], pose[None], self.num_classes, self.pcutoff)
+                order[:] = order[list(perm)]
+            self.last = pose.copy()
+        return poses
+
+
+def output_base(video, scorer):
+    return os.path.splitext(video)[0] + '_' + scorer
+
+
+def frame_count(video):
+    cap = cv2.VideoCapture(video)
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return count
+
+
+def model_fingerprint(model_path):
+    """Names, sizes and modification times of the checkpoint files (or of a saved model directory)."""
+    if os.path.isdir(model_path):
+        files = [os.path.join(root, name) for root, _, names in os.walk(model_path) for name in names]
+        top = model_path
+    else:
+        files = glob.glob(glob.escape(model_path) + '*')
+        top = os.path.dirname(model_path)
+    digest = hashlib.sha1()
+    for f in sorted(files):
+        stat = os.stat(f)
+        digest.update(f'{os.path.relpath(f, top)}|{stat.st_size}|{stat.st_mtime_ns}'.encode())
+    return digest.hexdigest()
+
+
+def analysis_key(model_path, settings):
+    """
+    Identifies the model and the analyse_video settings that change the
+    results; batch and queue sizes only change the speed and are left out.
+    """
+    settings = {k: v for k, v in settings.items() if k not in ('batch_size', 'queue_size', 'checkpoint_every')}
+    digest = hashlib.sha1(model_fingerprint(model_path).encode())
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def video_fingerprint(video, key):
+    stat = os.stat(video)
+    return hashlib.sha1(f'{key}|{os.path.basename(video)}|{stat.st_size}|{stat.st_mtime_ns}'.encode()).hexdigest()
+
+
+def read_manifest(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(path, state):
+    # written in full and renamed, a crash leaves the previous manifest intact
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=4)
+    os.replace(path + '.tmp', path)
+
+
+def is_complete(state, fingerprint, total, csv_file):
+    """True when a manifest records a finished analysis of the same video, model and settings."""
+    return (state is not None and state.get('fingerprint') == fingerprint and state.get('total') == total
+            and state['complete'] and os.path.exists(csv_file))
+
+
+def open_at(video, index):
+    """
+    A capture of video whose next read() returns frame `index`. The seek is
+    checked on the timestamp of the frame it decodes, the one before index:
+    CAP_PROP_POS_FRAMES only echoes the requested position on many backends.
+    When that frame is not where a constant frame rate puts it (inexact
+    seeking, variable frame rate, a start offset), the video is reopened and
+    read forward from the start instead (grab() skips the colour conversion
+    of frames that are thrown away).
+    """
+    cap = cv2.VideoCapture(video)
+    if index == 0:
+        return cap
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if fps > 0 and cap.set(cv2.CAP_PROP_POS_FRAMES, index - 1) and cap.grab():
+        if abs(cap.get(cv2.CAP_PROP_POS_MSEC) - (index - 1) * 1000 / fps) < 500 / fps:
+            return cap
+    cap.release()
+    cap = cv2.VideoCapture(video)
+    for _ in range(index):
+        if not cap.grab():
+            break
+    return cap
+
+
+def write_csv(trajectory, csv_file, scorer, bodyparts, num_classes):
+    """DLC-style csv (scorer / individuals / bodyparts / coords header rows) as read back by core.trajectory."""
+    import pandas as pd
+    individuals = [f'individual{i + 1}' for i in range(num_classes)]
+    columns = [(scorer, individual, part, coord) for individual in individuals for part in bodyparts
+               for coord in ('x', 'y', 'likelihood')]
+    names = ['scorer', 'individuals', 'bodyparts', 'coords']
+    if num_classes == 1:
+        columns = [(s, p, c) for s, _, p, c in columns]
+        names = ['scorer', 'bodyparts', 'coords']
+    frame = pd.DataFrame(np.asarray(trajectory).reshape(len(trajectory), -1),
+                         columns=pd.MultiIndex.from_tuples(columns, names=names))
+    frame.to_csv(csv_file)
+
+
+def analyze_video(video, infer, IMG_SIZE_H, IMG_SIZE_W, NUM_KEYPOINT, num_classes, bodyparts, scorer,
+                  save_video=False, colors=None, pcutoff=0.0, kp_con=(), batch_size=8, queue_size=8, report=True,
+                  max_frames=None, output=None, resume_key=None, checkpoint_every=10000, force=False, frame_range=None):
+    """
+    Analyse one video with overlapping stages:
+    decode -> preprocess/batch -> inference -> pose decoding -> writing.
+    batch_size is the inference batch (batch_size in config_predict.yaml).
+    Poses go straight into a memory-mapped (frames, parts, 3) trajectory next
+    to the csv, so the review page opens it without conversion. output
+    replaces the default <video>_<scorer> base name of the result files.
+    frame_range (first, end) analyses only those frames; the trajectory
+    then starts at frame `first`.
+
+    With a resume_key (analysis_key of the model and settings) the progress
+    is recorded in <base>.analysis.json: every checkpoint_every frames the
+    trajectory is flushed and the number of committed frames written. A video
+    whose manifest is complete for the same model, settings and video file is
+    skipped, an interrupted one continues after its last committed frame
+    (from frame 0 when a labelled video is saved, as a cut-off mp4 cannot be
+    appended to). force re-analyses regardless.
+    Returns frame count, wall time, frames/s and per-stage statistics.
+    """
+    num_parts = NUM_KEYPOINT * num_classes
+    base = output or output_base(video, scorer)
+    csv_file = base + '.csv'
+    cache = trajectory_cache_path(csv_file)
+    manifest = base + '.analysis.json'
+    first, total = 0, frame_count(video)
+    if frame_range is not None:
+        first, total = frame_range[0], min(total, frame_range[1]) - frame_range[0]
+        if resume_key is not None:
+            resume_key = f'{resume_key}|{frame_range[0]}-{frame_range[1]}'
+    if max_frames is not None:
+        total = min(total, max_frames)
+    shape = (total, num_parts, 3)
+
+    fingerprint = video_fingerprint(video, resume_key) if resume_key is not None else None
+    state = read_manifest(manifest) if fingerprint is not None and not force else None
+    start = 0
+    trajectory = None
+    if is_complete(state, fingerprint, total, csv_file):
+        if report:
+            print(f'{os.path.basename(video)}: already analysed with this model and configuration, skipped')
+        return {'video': video, 'frames': state['frames_done'], 'resumed_from': 0, 'seconds': 0.0, 'frames_per_s': 0.0,
+                'skipped': True, 'stages': []}
+    if state is not None and state.get('fingerprint') == fingerprint and state.get('total') == total:
+        if not state['complete'] and state['frames_done'] > 0 and not save_video and os.path.exists(cache):
+            trajectory = np.load(cache, mmap_mode='r+')
+            if trajectory.shape == shape and trajectory.dtype == np.float32:
+                start = state['frames_done']
+            else:
+                trajectory = None
+    if trajectory is None:
+        trajectory = np.lib.format.open_memmap(cache, mode='w+', dtype=np.float32, shape=shape)
+    if fingerprint is not None:
+        write_manifest(manifest, {'fingerprint': fingerprint, 'total': total, 'frames_done': start, 'complete': False})
+    if start and report:
+        print(f'{os.path.basename(video)}: resuming at frame {start} of {total}')
+
+    cap = open_at(video, first + start)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    writer = None
+    written = committed = start
+    batcher = FrameBatcher(batch_size, IMG_SIZE_H, IMG_SIZE_W, keep_frames=save_video)
+    # a resumed analysis carries the identities on from the last committed frame
+    tracker = IdentityTracker(num_classes, pcutoff, last=trajectory[start - 1] if start else None)
+
+    def commit():
+        nonlocal committed
+        trajectory.flush()
+        committed = written
+        write_manifest(manifest, {'fingerprint': fingerprint, 'total': total, 'frames_done': committed, 'complete': False})
+
+    def decode():
+        index = start
+        while index < total:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield index, frame
+            index += 1
+
+    def batch(item):
+        return batcher.add(*item)
+
+    def infer_stage(item):
+        indices, sizes, frames, images = item
+        return [(indices, sizes, frames, infer(images))]
+
+    def postprocess(item):
+        indices, sizes, frames, outputs = item
+        outputs = [output[:len(indices)] for output in outputs]
+        return [(indices, frames, tracker(decode_outputs(outputs, num_parts, sizes)))]
+
+    def write(item):
+        nonlocal writer, written
+        indices, frames, poses = item
+        trajectory[indices] = poses
+        written = max(written, int(indices[-1]) + 1)
+        if fingerprint is not None and written - committed >= checkpoint_every:
+            commit()
+        if save_video:
+            for frame, pose in zip(frames, poses):
+                if writer is None:
+                    writer = cv2.VideoWriter(base + '_labeled.mp4', cv2.VideoWriter_fourcc(*'mp4v'), fps,
+                                             (frame.shape[1], frame.shape[0]))
+                writer.write(draw_pose(frame, pose, kp_con, colors, pcutoff, NUM_KEYPOINT))
+        return []
+
+    frames_of = lambda item: len(item[0])
+    pipeline = Pipeline([Stage('decode', decode),
+                         Stage('batch', batch, finish=batcher.flush, size=lambda item: 1 if len(item) == 2 else len(item[0])),
+                         Stage('inference', infer_stage, size=frames_of),
+                         Stage('postprocess', postprocess, size=frames_of),
+                         Stage('write', write, size=frames_of)], queue_size=queue_size)
+    began = time.perf_counter()
+    try:
+        stages = pipeline.run()
+    except BaseException:
+        # frames are written in order, so everything up to `written` can be kept
+        if fingerprint is not None and written > committed:
+            commit()
+        raise
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+    seconds = time.perf_counter() - began
+
+    trajectory.flush()
+    frames = written
+    del trajectory
+    poses = np.load(cache, mmap_mode='r')
+    write_csv(poses[:frames], csv_file, scorer, bodyparts, num_classes)
+    if frames < len(poses):
+        # the container over-reported its frame count
+        poses = np.array(poses[:frames])
+        np.save(cache, poses)
+    del poses
+    os.utime(cache)  # newer than the csv, so core.trajectory.load_trajectory uses it as is
+    if fingerprint is not None:
+        write_manifest(manifest, {'fingerprint': fingerprint, 'total': total, 'frames_done': frames, 'complete': True})
+    rate = (frames - start) / max(seconds, 1e-9)
+    if report:
+        print(f'{os.path.basename(video)}: {frames - start} frames in {seconds:.1f} s, {rate:.1f} frames/s')
+        pipeline.report('frames')
+    return {'video': video, 'frames': frames, 'resumed_from': start, 'seconds': seconds, 'frames_per_s': rate, 'stages': stages}
+
+
+def render_labeled(video, trajectory, output_file, kp_con, colors, pcutoff, NUM_KEYPOINT):
+    """Labelled video drawn from a finished trajectory in one sequential pass."""
+    cap = cv2.VideoCapture(video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    writer = None
+    try:
+        for pose in trajectory:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if writer is None:
+                writer = cv2.VideoWriter(output_file, cv2.VideoWriter_fourcc(*'mp4v'), fps, (frame.shape[1], frame.shape[0]))
+            writer.write(draw_pose(frame, pose, kp_con, colors, pcutoff, NUM_KEYPOINT))
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+
+
+_worker = {}
+
+
+def _init_worker(core_sets, runtime, model_path, predict_args):
+    from core.scheduler import pin_to_cores
+    from core.tf_runtime import configure_runtime
+    cores = core_sets.get()
+    pin_to_cores(cores)
+    configure_runtime(dict(runtime, intra_op_threads=len(cores), inter_op_threads=min(len(cores), 2)))
+    # the model is built once per worker and reused for all its videos
+    _worker['infer'] = make_infer(load_model(model_path, predict_args))
+
+
+def _analyze_in_worker(video, settings):
+    result = analyze_video(video, _worker['infer'], report=False, **settings)
+    result.pop('stages')
+    return result
+
+
+def _analyze_shard(task):
+    video, settings = task
+    return _analyze_in_worker(video, settings)
+
+
+def analyze_videos(videos, workers, runtime, model_path, predict_args, settings):
+    """
+    Spread videos over `workers` processes, each pinned to its own cores with
+    TensorFlow's thread pools capped to them. Videos are handed out longest
+    first, so one long recording started last cannot leave the other
+    workers idle at the end. Prints one line per finished video. There are
+    never more workers than videos or usable cores.
+    """
+    from core.scheduler import partition_cores, fit_to_cores
+    if not videos:
+        print('No videos to analyse.')
+        return []
+    order = sorted(videos, key=frame_count, reverse=True)
+    core_sets = partition_cores(fit_to_cores(min(workers, len(videos)), 'workers'))
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    for cores in core_sets:
+        queue.put(cores)
+    results = []
+    start = time.perf_counter()
+    with ctx.Pool(len(core_sets), initializer=_init_worker, initargs=(queue, runtime, model_path, predict_args)) as pool:
+        for n, result in enumerate(pool.imap_unordered(partial(_analyze_in_worker, settings=settings), order, chunksize=1), 1):
+            results.append(result)
+            if result.get('skipped'):
+                print(f"[{n}/{len(order)}] {os.path.basename(result['video'])}: already analysed, skipped")
+                continue
+            resumed = f", resumed at frame {result['resumed_from']}" if result['resumed_from'] else ''
+            print(f"[{n}/{len(order)}] {os.path.basename(result['video'])}: {result['frames']} frames in "
+                  f"{result['seconds']:.0f} s ({result['frames_per_s']:.1f} frames/s{resumed})")
+    seconds = time.perf_counter() - start
+    frames = sum(r['frames'] - r['resumed_from'] for r in results if not r.get('skipped'))
+    print(f'\n{len(results)} videos, {frames} frames analysed in {seconds:.0f} s with {len(core_sets)} workers '
+          f'({frames / max(seconds, 1e-9):.1f} frames/s overall)')
+    return results
+
+
+def analyze_sharded(videos, shards, overlap, runtime, model_path, predict_args, settings):
+    """
+    Analyse each video as `shards` time ranges at once, one process per
+    range pinned to its own cores, and stitch the ranges (core.sharding)
+    into the usual <video>_<scorer> outputs. Every range but the first
+    starts `overlap` frames early; those frames are analysed twice and carry
+    the identities of the individuals across the boundary. Ranges are
+    resumable like whole videos and are removed once the video is stitched.
+    There are never more ranges at a time than usable cores.
+    """
+    from core.scheduler import partition_cores, fit_to_cores
+    from core.sharding import plan_shards, stitch
+    scorer, num_classes = settings['scorer'], settings['num_classes']
+    resume_key = settings.get('resume_key')
+    core_sets = partition_cores(fit_to_cores(shards, 'shards'))
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    for cores in core_sets:
+        queue.put(cores)
+    results = []
+    with ctx.Pool(len(core_sets), initializer=_init_worker, initargs=(queue, runtime, model_path, predict_args)) as pool:
+        for video in videos:
+            base = output_base(video, scorer)
+            csv_file = base + '.csv'
+            manifest = base + '.analysis.json'
+            total = frame_count(video)
+            fingerprint = video_fingerprint(video, resume_key) if resume_key is not None else None
+            state = read_manifest(manifest) if fingerprint is not None and not settings.get('force') else None
+            if is_complete(state, fingerprint, total, csv_file):
+                print(f'{os.path.basename(video)}: already analysed with this model and configuration, skipped')
+                continue
+
+            start = time.perf_counter()
+            plan = plan_shards(total, len(core_sets), overlap)
+            shard_dir = base + '_shards'
+            os.makedirs(shard_dir, exist_ok=True)
+            tasks = [(video, dict(settings, save_video=False, frame_range=(first, end), output=os.path.join(shard_dir, f'part{i:03d}')))
+                     for i, (first, owned, end) in enumerate(plan)]
+            pool.map(_analyze_shard, tasks, chunksize=1)
+
+            cache = trajectory_cache_path(csv_file)
+            parts = [np.load(trajectory_cache_path(task[1]['output'] + '.csv'), mmap_mode='r') for task in tasks]
+            frames, boundaries = stitch(plan, parts, num_classes, cache, settings.get('pcutoff', 0.0))
+            del parts
+            poses = np.load(cache, mmap_mode='r')
+            write_csv(poses, csv_file, scorer, settings['bodyparts'], num_classes)
+            if settings.get('save_video'):
+                render_labeled(video, poses, base + '_labeled.mp4', settings.get('kp_con', ()), settings.get('colors'),
+                               settings.get('pcutoff', 0.0), settings['NUM_KEYPOINT'])
+            del poses
+            os.utime(cache)  # newer than the csv, so core.trajectory.load_trajectory uses it as is
+            if fingerprint is not None:
+                write_manifest(manifest, {'fingerprint': fingerprint, 'total': total, 'frames_done': frames, 'complete': True})
+            shutil.rmtree(shard_dir, ignore_errors=True)
+
+            seconds = time.perf_counter() - start
+            results.append({'video': video, 'frames': frames, 'seconds': seconds, 'frames_per_s': frames / max(seconds, 1e-9),
+                            'boundaries': boundaries})
+            print(f'{os.path.basename(video)}: {frames} frames in {seconds:.0f} s with {len(plan)} shards '
+                  f'({frames / max(seconds, 1e-9):.1f} frames/s)')
+            for n, (perm, error) in enumerate(boundaries, 1):
+                # a large overlap error means the range did not start on the frame it asked for
+                print(f'  boundary {n}: identities {perm}, overlap error {error:.2f} px')
+    return results
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:12:44 2026
+
+@author: tang
+"""
+
+import time
+import random
+import weakref
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+import tensorflow as tf
+
+# attributes of train()'s Sequence that on_epoch_end reshuffles, sent to the workers every epoch
+_EPOCH_STATE = ('image_keys', 'indexes')
+
+
+def batch_seed(seed, epoch, index=None):
+    """
+    Seed of batch `index` of an epoch, so that it is augmented the same way
+    whichever worker builds it, or without `index` of the epoch's shuffle.
+    """
+    return int(np.random.SeedSequence([seed, epoch, 0 if index is None else index + 1]).generate_state(1)[0])
+
+
+def reseed(sequence, seed):
+    """Seed the random generators a batch can draw from: numpy, random and the imgaug augmenters the Sequence holds."""
+    np.random.seed(seed)
+    random.seed(seed)
+    try:
+        from imgaug.augmenters import Augmenter
+    except ImportError:
+        return
+    for value in vars(sequence).values():
+        if isinstance(value, Augmenter):
+            value.seed_(seed)
+
+
+def _layout(leaves):
+    """Byte offset of every array of a batch in a slot, 64-byte aligned, and the slot size."""
+    offsets, size = [], 0
+    for leaf in leaves:
+        offsets.append(size)
+        size += -(-leaf.nbytes // 64) * 64
+    return offsets, size
+
+
+def _work(sequence, worker, workers, seed, buffer, template, control, free, ready, epoch_now, next_index, stop):
+    shapes = [(leaf.shape, leaf.dtype) for leaf in template]
+    offsets, slot_size = _layout(template)
+    slots = len(buffer.buf) // slot_size
+    while not stop.is_set():
+        message = control.get()
+        if message is None:
+            break
+        epoch, state, length = message
+        for name, value in state.items():
+            setattr(sequence, name, value)
+        for index in range(worker, length, workers):
+            # at most `slots` batches ahead of the one the training loop waits for
+            while epoch == epoch_now.value and index >= next_index.value + slots and not stop.is_set():
+                time.sleep(0.001)
+            if epoch != epoch_now.value or stop.is_set():
+                break
+            reseed(sequence, batch_seed(seed, epoch, index))
+            leaves = [np.asarray(leaf) for leaf in tf.nest.flatten(sequence[index])]
+            if [(leaf.shape, leaf.dtype) for leaf in leaves] != shapes:
+                # a batch of another shape (a short last batch) does not fit the slots and is pickled
+                ready.put((epoch, index, None, leaves))
+                continue
+            slot = free.get()
+            for leaf, offset in zip(leaves, offsets):
+                np.ndarray(leaf.shape, leaf.dtype, buffer=buffer.buf, offset=slot * slot_size + offset)[...] = leaf
+            ready.put((epoch, index, slot, None))
+
+
+class ProcessLoader(tf.keras.utils.Sequence):
+    """
+    Serve the batches of a keras Sequence (train()'s own, with its
+    decoding, resizing, augmentation and targets) from `workers` forked
+    processes. Workers write finished batches into preallocated slots of one
+    shared-memory block; the training process copies them out, so no batch
+    is pickled. Batch `index` of epoch `epoch` is built with its generators
+    seeded from (seed, epoch, index) and the key order of every epoch is
+    shuffled under a seed from (seed, epoch), so a run is reproducible for
+    a seed (shuffle_num) whatever the number of workers.
+
+    Batches are built in index order, at most `slots` ahead of the one
+    training waits for, so fit has to ask for them in order (shuffle=False;
+    the Sequence reshuffles its keys itself). Any other request is built in
+    the training process. Needs the fork start method: train()'s Sequence
+    is local to the compiled module and cannot be pickled into a spawned
+    process.
+    """
+    def __init__(self, sequence, workers, seed, slots=None):
+        self.sequence = sequence
+        self.workers = workers
+        self.seed = seed
+        self.epoch = 0
+        self.length = len(sequence)
+        ctx = mp.get_context('fork')
+        reseed(sequence, batch_seed(seed, 0, 0))
+        self.template = sequence[0]
+        leaves = [np.asarray(leaf) for leaf in tf.nest.flatten(self.template)]
+        self.offsets, self.slot_size = _layout(leaves)
+        self.slots = slots or 2 * workers
+        self.buffer = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_size)
+        self.free, self.ready = ctx.Queue(), ctx.Queue()
+        for slot in range(self.slots):
+            self.free.put(slot)
+        self.epoch_now, self.next_index = ctx.Value('l', 0, lock=False), ctx.Value('l', 0, lock=False)
+        self.stop = ctx.Event()
+        self.controls = [ctx.Queue() for _ in range(workers)]
+        self.processes = [ctx.Process(target=_work, daemon=True,
+                                      args=(sequence, w, workers, seed, self.buffer, leaves, self.controls[w],
+                                            self.free, self.ready, self.epoch_now, self.next_index, self.stop))
+                          for w in range(workers)]
+        for process in self.processes:
+            process.start()
+        self._finalizer = weakref.finalize(self, ProcessLoader._shutdown, self.processes, self.controls, self.stop, self.buffer)
+        self.shapes = [(leaf.shape, leaf.dtype) for leaf in leaves]
+        self._pending = {}
+        self._next = 0
+        self._last = (None, None)
+        self._start_epoch()
+
+    def _epoch_state(self):
+        return {name: getattr(self.sequence, name) for name in _EPOCH_STATE if hasattr(self.sequence, name)}
+
+    def _start_epoch(self):
+        self.epoch_now.value = self.epoch
+        self.next_index.value = 0
+        self._next = 0
+        self._last = (None, None)
+        for slot, _ in self._pending.values():
+            if slot is not None:
+                self.free.put(slot)
+        self._pending = {}
+        state = self._epoch_state()
+        for control in self.controls:
+            control.put((self.epoch, state, self.length))
+
+    def __len__(self):
+        return self.length
+
+    def _receive(self, index):
+        while index not in self._pending:
+            try:
+                epoch, i, slot, leaves = self.ready.get(timeout=1.0)
+            except Exception:
+                if not all(process.is_alive() for process in self.processes):
+                    raise RuntimeError('a batch loader process died, see its error above')
+                continue
+            if epoch != self.epoch:
+                if slot is not None:
+                    self.free.put(slot)
+                continue
+            self._pending[i] = (slot, leaves)
+        slot, leaves = self._pending.pop(index)
+        if slot is not None:
+            # copied out, so the slot can be refilled while training uses the batch
+            leaves = [np.array(np.ndarray(shape, dtype, buffer=self.buffer.buf, offset=slot * self.slot_size + offset))
+                      for (shape, dtype), offset in zip(self.shapes, self.offsets)]
+            self.free.put(slot)
+        return tf.nest.pack_sequence_as(self.template, leaves)
+
+    def __getitem__(self, index):
+        if index == self._last[0]:
+            # fit peeks at the first batch before it starts the epoch
+            return self._last[1]
+        if index != self._next:
+            reseed(self.sequence, batch_seed(self.seed, self.epoch, index))
+            return self.sequence[index]
+        batch = self._receive(index)
+        self._next += 1
+        self.next_index.value = self._next
+        self._last = (index, batch)
+        return batch
+
+    def on_epoch_end(self):
+        self.epoch += 1
+        np.random.seed(batch_seed(self.seed, self.epoch))
+        self.sequence.on_epoch_end()
+        self._start_epoch()
+
+    def close(self):
+        self._finalizer()
+
+    @staticmethod
+    def _shutdown(processes, controls, stop, buffer):
+        stop.set()
+        for control in controls:
+            control.put(None)
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        buffer.close()
+        buffer.unlink()
+
+
+class ValidationCache(tf.keras.utils.Sequence):
+    """
+    Keep the batches of train()'s validation Sequence in memory after the
+    first validation pass. The validation frames are not augmented, so every
+    pass would build the same images and heatmap targets again. The
+    Sequence is checked for that first: if building batch 0 twice gives
+    different arrays, nothing is cached. The validation frames stay in the
+    order of the first pass (on_epoch_end does not reshuffle them), which
+    leaves the validation loss, a mean over the same frames, unchanged.
+    Batches beyond budget_bytes are built on every pass as before.
+    """
+    def __init__(self, sequence, budget_bytes):
+        self.sequence = sequence
+        self.budget_bytes = budget_bytes
+        self.batches = {}
+        self.nbytes = 0
+        self.hits, self.misses = 0, 0
+        first, again = tf.nest.flatten(sequence[0]), tf.nest.flatten(sequence[0])
+        self.deterministic = all(np.array_equal(np.asarray(a), np.asarray(b)) for a, b in zip(first, again))
+
+    def __len__(self):
+        return len(self.sequence)
+
+    def __getitem__(self, index):
+        if index in self.batches:
+            self.hits += 1
+            return self.batches[index]
+        batch = self.sequence[index]
+        self.misses += 1
+        size = sum(np.asarray(leaf).nbytes for leaf in tf.nest.flatten(batch))
+        if self.deterministic and self.nbytes + size <= self.budget_bytes:
+            self.batches[index] = batch
+            self.nbytes += size
+        return batch
+
+    def on_epoch_end(self):
+        pass
+
+
+def distribute_sequence(strategy, sequence):
+    """
+    The batches of `sequence` as the input of one worker of a multi-worker
+    strategy. Every worker feeds the batches of its own Sequence (its own
+    shard of the frames) to its replica as they are, with no auto-sharding
+    and no rebatching, so the global batch is the Sequence's batch size times
+    the number of workers. Keras only calls on_epoch_end on a Sequence it
+    iterates itself, so the generator calls it after every pass. Returns the
+    dataset and the steps per epoch to pass to fit.
+    """
+    spec = tf.nest.map_structure(lambda leaf: tf.TensorSpec((None,) + np.shape(leaf)[1:], tf.as_dtype(np.asarray(leaf).dtype)), sequence[0])
+
+    def batches():
+        while True:
+            for index in range(len(sequence)):
+                yield sequence[index]
+            sequence.on_epoch_end()
+
+    def dataset_fn(context):
+        if context.num_replicas_in_sync != context.num_input_pipelines:
+            raise ValueError('one replica per worker is supported, the workers share a single Sequence per process')
+        return tf.data.Dataset.from_generator(batches, output_signature=spec).prefetch(1)
+
+    return strategy.distribute_datasets_from_function(dataset_fn), len(sequence)
+
+
+def fork_available():
+    return 'fork' in mp.get_all_start_methods()
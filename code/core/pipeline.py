@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 10:02:37 2026
+
+@author: tang
+"""
+
+import time
+import queue
+import threading
+
+_END = object()
+
+
+class Stage:
+    """
+    One step of a Pipeline. fn(item) returns an iterable of outputs (empty to
+    drop or buffer the item); finish() is called once the input is exhausted
+    and may return the buffered rest. The first stage is the source and gets
+    no items: fn() is called once and its outputs are the stream.
+    size(item) is the number of frames an item stands for (1 by default),
+    so the rates of batching and per-frame stages are comparable.
+    """
+    def __init__(self, name, fn, finish=None, size=None):
+        self.name = name
+        self.fn = fn
+        self.finish = finish
+        self.size = size or (lambda item: 1)
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_s = 0.0
+        self.starved_s = 0.0   # waiting for the upstream stage
+        self.blocked_s = 0.0   # waiting for room downstream (backpressure)
+
+    def stats(self, wall_s):
+        return {'stage': self.name, 'items_in': self.items_in, 'items_out': self.items_out,
+                'items_per_s': max(self.items_in, self.items_out) / self.busy_s if self.busy_s else None,
+                'busy': self.busy_s / wall_s if wall_s else 0.0, 'starved': self.starved_s / wall_s if wall_s else 0.0,
+                'blocked': self.blocked_s / wall_s if wall_s else 0.0}
+
+
+class Pipeline:
+    """
+    Run stages in their own threads connected by bounded queues, so decoding,
+    inference, post-processing and writing overlap and the end-to-end rate is
+    set by the slowest stage. A full queue blocks its producer (backpressure)
+    instead of buffering without limit. cv2 and TensorFlow release the GIL in
+    their heavy calls, which is what makes threads enough here.
+    """
+    def __init__(self, stages, queue_size=8):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages[1:]]
+        self.error = None
+        self.wall_s = 0.0
+        self._stop = threading.Event()
+
+    def _put(self, stage, q, item):
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        stage.blocked_s += time.perf_counter() - start
+
+    def _call(self, stage, out, fn, *args):
+        # time inside fn plus time spent drawing outputs from it (generators do their work lazily)
+        start = time.perf_counter()
+        outputs = fn(*args)
+        stage.busy_s += time.perf_counter() - start
+        self._emit(stage, out, outputs or ())
+
+    def _emit(self, stage, out, outputs):
+        start = time.perf_counter()
+        for item in outputs:
+            stage.busy_s += time.perf_counter() - start
+            stage.items_out += stage.size(item)
+            if out is not None:
+                self._put(stage, out, item)
+            if self._stop.is_set():
+                return
+            start = time.perf_counter()
+        stage.busy_s += time.perf_counter() - start
+
+    def _run_stage(self, i):
+        stage = self.stages[i]
+        inp = self.queues[i - 1] if i > 0 else None
+        out = self.queues[i] if i < len(self.queues) else None
+        try:
+            if inp is None:
+                self._call(stage, out, stage.fn)
+            else:
+                while not self._stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        item = inp.get(timeout=0.1)
+                    except queue.Empty:
+                        stage.starved_s += time.perf_counter() - start
+                        continue
+                    stage.starved_s += time.perf_counter() - start
+                    if item is _END:
+                        break
+                    stage.items_in += stage.size(item)
+                    self._call(stage, out, stage.fn, item)
+            if stage.finish is not None and not self._stop.is_set():
+                self._call(stage, out, stage.finish)
+        except BaseException as e:
+            self.error = self.error or e
+            self._stop.set()
+        finally:
+            if out is not None and not self._stop.is_set():
+                self._put(stage, out, _END)
+
+    def run(self):
+        """Run to completion, re-raising the first error of any stage. Returns per-stage stats."""
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._run_stage, args=(i,), name=stage.name, daemon=True)
+                   for i, stage in enumerate(self.stages)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self._stop.set()
+            raise
+        self.wall_s = time.perf_counter() - start
+        if self.error is not None:
+            raise self.error
+        return self.stats()
+
+    def stats(self):
+        return [stage.stats(self.wall_s) for stage in self.stages]
+
+    def report(self, unit='items'):
+        print(f"  {'stage':<14s} {unit + '/s':>10s} {'busy':>6s} {'starved':>8s} {'blocked':>8s}")
+        for s in self.stats():
+            rate = f"{s['items_per_s']:10.1f}" if s['items_per_s'] else f"{'-':>10s}"
+            print(f"  {s['stage']:<14s} {rate} {s['busy'] * 100:5.0f}% {s['starved'] * 100:7.0f}% {s['blocked'] * 100:7.0f}%")
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 10:03:26 2026
+
+@author: tang
+"""
+
+import os
+import re
+import sys
+import time
+import subprocess
+
+# per-bodypart result lines printed by train.py
+RMSE_LINE = re.compile(r'^RMSE \((.+)\):\s+(\S+)')
+THREAD_ENV = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition_cores(parallel, cores_per_run=None, cores=None):
+    """
+    Split the usable cores into `parallel` disjoint sets, at most cores_per_run
+    each. Raises ValueError when there are fewer cores than sets: runs would
+    get no core or share one, and synchronous workers can deadlock waiting
+    for each other.
+    """
+    cores = cores or available_cores()
+    parallel = max(parallel, 1)
+    if parallel > len(cores):
+        raise ValueError(f'{parallel} parallel runs need at least {parallel} CPU cores, only {len(cores)} are usable')
+    size = len(cores) // parallel
+    if cores_per_run:
+        size = min(size, cores_per_run)
+    return [cores[i * size:(i + 1) * size] for i in range(parallel)]
+
+
+def fit_to_cores(parallel, what, cores=None):
+    """`parallel` capped at the number of usable cores, with a message when it is lowered."""
+    cores = cores or available_cores()
+    if parallel > len(cores):
+        print(f'Only {len(cores)} usable CPU cores, running {len(cores)} {what} at a time instead of {parallel}.')
+        return len(cores)
+    return parallel
+
+
+def pin_to_cores(cores):
+    """Restrict the current process to `cores` and size the OpenMP/MKL pools to match. Call before importing TensorFlow."""
+    for key in THREAD_ENV:
+        os.environ[key] = str(len(cores))
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+        return
+    try:
+        import psutil
+        psutil.Process().cpu_affinity(list(cores))
+    except (ImportError, AttributeError):
+        pass
+
+
+def _launch(cmd, cwd, log, cores, runtime_flags, extra_env=None):
+    env = dict(os.environ, **(extra_env or {}))
+    for key in THREAD_ENV:
+        env[key] = str(len(cores))
+    if runtime_flags:
+        # train.py / predict.py flags from core.tf_runtime
+        cmd = cmd + ['--intra_op_threads', str(len(cores)), '--inter_op_threads', str(min(len(cores), 2))]
+    kwargs = {}
+    if hasattr(os, 'sched_setaffinity'):
+        kwargs['preexec_fn'] = lambda: os.sched_setaffinity(0, cores)
+    proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT, **kwargs)
+    if 'preexec_fn' not in kwargs:
+        try:
+            import psutil
+            psutil.Process(proc.pid).cpu_affinity(list(cores))
+        except (ImportError, AttributeError):
+            pass  # no affinity on this platform, the thread limits still apply
+    return proc
+
+
+def run_jobs(jobs, core_sets, runtime_flags=True, on_finish=None, poll=1.0):
+    """
+    Run every job as a subprocess, one per core set at a time. A job is a dict
+    with 'name', 'cmd' (argument list), 'cwd', 'log' (file path) and optionally
+    'env' (extra environment variables). Each
+    process is pinned to its cores and its thread pools are sized to match.
+    on_finish(job, returncode) is called as jobs complete.
+    Returns {name: returncode}.
+    """
+    pending = list(jobs)
+    free = [list(cores) for cores in core_sets]
+    running = []
+    returncodes = {}
+    try:
+        while pending or running:
+            while pending and free:
+                job, cores = pending.pop(0), free.pop(0)
+                log = open(job['log'], 'w')
+                proc = _launch(job['cmd'], job['cwd'], log, cores, runtime_flags, job.get('env'))
+                print(f"started {job['name']} on cores {cores[0]}-{cores[-1]}")
+                running.append((job, cores, proc, log))
+            time.sleep(poll)
+            for entry in list(running):
+                job, cores, proc, log = entry
+                if proc.poll() is None:
+                    continue
+                log.close()
+                running.remove(entry)
+                free.append(cores)
+                returncodes[job['name']] = proc.returncode
+                print(f"finished {job['name']} ({'ok' if proc.returncode == 0 else 'exit code ' + str(proc.returncode)})")
+                if on_finish is not None:
+                    on_finish(job, proc.returncode)
+    except KeyboardInterrupt:
+        for job, cores, proc, log in running:
+            proc.terminate()
+            log.close()
+        raise
+    return returncodes
+
+
+def python_cmd(script, *args):
+    return [sys.executable, script] + [str(arg) for arg in args]
+
+
+def parse_rmse(log_file):
+    """{bodypart: RMSE} from the log of a train.py run."""
+    rmse = {}
+    with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = RMSE_LINE.match(line.strip())
+            if match:
+                rmse[match.group(1)] = float(match.group(2))
+    return rmse
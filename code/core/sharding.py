@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 28 09:44:18 2026
+
+@author: tang
+"""
+
+import itertools
+import numpy as np
+
+
+def plan_shards(total, shards, overlap):
+    """
+    Split frames [0, total) into `shards` consecutive ranges. Every range but
+    the first is also analysed from `overlap` frames before its start, frames
+    the previous range owns. Returns (first, owned, end) per range: analysed
+    from `first`, owning [owned, end).
+    """
+    bounds = np.linspace(0, total, shards + 1).round().astype(int)
+    plan = []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        if b > a:
+            plan.append((max(0, int(a) - overlap) if plan else 0, int(a), int(b)))
+    return plan
+
+
+def match_identities(reference, candidate, num_classes, pcutoff=0.0):
+    """
+    Order of the individuals of `candidate` that best matches `reference`
+    over the same frames, both (frames, num_classes * K, 3). The score is the
+    mean keypoint distance over keypoints found (likelihood above pcutoff) in
+    both. Returns perm, with candidate individual perm[a] matching reference
+    individual a, and its mean distance in pixels (nan if nothing was found).
+    """
+    frames = len(reference)
+    ref = np.asarray(reference, dtype=np.float32).reshape(frames, num_classes, -1, 3)
+    cand = np.asarray(candidate, dtype=np.float32).reshape(frames, num_classes, -1, 3)
+    # (frames, reference individual, candidate individual, keypoint)
+    dist = np.linalg.norm(ref[:, :, None, :, :2] - cand[:, None, :, :, :2], axis=-1)
+    valid = (ref[:, :, None, :, 2] > pcutoff) & (cand[:, None, :, :, 2] > pcutoff)
+    sums = np.where(valid, dist, 0).sum(axis=(0, 3))
+    counts = valid.sum(axis=(0, 3))
+
+    best, best_score = tuple(range(num_classes)), np.nan
+    # the identity comes first, so it wins ties and overlaps without detections
+    for perm in itertools.permutations(range(num_classes)):
+        count = sum(counts[a, b] for a, b in enumerate(perm))
+        if count == 0:
+            continue
+        score = sum(sums[a, b] for a, b in enumerate(perm)) / count
+        if np.isnan(best_score) or score < best_score:
+            best, best_score = perm, score
+    return best, float(best_score)
+
+
+def stitch(plan, trajectories, num_classes, out_file, pcutoff=0.0):
+    """
+    Join the trajectories of the ranges of plan_shards (each starting at its
+    `first` frame) into one (frames, parts, 3) .npy at out_file. Every frame
+    is taken from the range that owns it, so it is the frame a single-process
+    analysis produces; the overlaps only carry the identities across the
+    boundaries. A range cut short (the container over-reported its length)
+    ends the trajectory.
+    Returns the frame count and, per boundary, the identity order applied to
+    the next range and the mean keypoint distance in the overlap.
+    """
+    owned_frames = []
+    for (first, owned, end), trajectory in zip(plan, trajectories):
+        n = max(0, min(end, first + len(trajectory)) - owned)
+        owned_frames.append(n)
+        if n < end - owned:
+            break
+    frames = sum(owned_frames)
+    num_parts = trajectories[0].shape[1]
+    out = np.lib.format.open_memmap(out_file, mode='w+', dtype=np.float32, shape=(frames, num_parts, 3))
+    individuals = out.reshape(frames, num_classes, -1, 3)
+
+    boundaries = []
+    position = 0
+    for i, n in enumerate(owned_frames):
+        first, owned, end = plan[i]
+        trajectory = np.asarray(trajectories[i]).reshape(len(trajectories[i]), num_classes, -1, 3)
+        perm = tuple(range(num_classes))
+        if i > 0:
+            # frames [first, owned) are already in `out`, from the previous range and in its identities
+            perm, error = match_identities(out[first:owned], trajectory[:owned - first].reshape(owned - first, num_parts, 3),
+                                           num_classes, pcutoff)
+            boundaries.append((perm, error))
+        individuals[position:position + n] = trajectory[owned - first:owned - first + n][:, list(perm)]
+        position += n
+    out.flush()
+    del out, individuals
+    return frames, boundaries
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 15:36:11 2026
+
+@author: tang
+"""
+
+import os
+import sys
+import json
+import time
+import numpy as np
+import tensorflow as tf
+
+
+def memory_mb():
+    """Current resident memory of this process in MB, None without psutil."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        return None
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process so far in MB, None if it cannot be read."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+class StepTelemetry(tf.keras.callbacks.Callback):
+    """
+    Per-step timing written to steps.jsonl and TensorBoard scalars in log_dir:
+    step time, time waiting for data, examples/s of this process (BATCH_SIZE
+    examples per step, also per worker of a distributed run), current and peak resident
+    memory (rss_mb is null without psutil, peak_rss_mb is the high-water
+    mark).
+
+    Data wait is only measured for a Sequence passed to watch(). Keras fetches
+    its batches in a tf.data thread, one batch or more ahead of the step; a
+    step waits for data when its batch was not fetched yet as the step began,
+    from the step's start (or the fetch's start, if later) until the fetch is
+    done. Steps where the wait is more
+    than stall_fraction of the step time are flagged as stalled. Batch k of an
+    epoch is matched to step k, so fit must not shuffle the batch order.
+    """
+    def __init__(self, log_dir, BATCH_SIZE, scalar_every=10, stall_fraction=0.5):
+        super().__init__()
+        self.log_dir = log_dir
+        self.BATCH_SIZE = BATCH_SIZE
+        self.scalar_every = scalar_every
+        self.stall_fraction = stall_fraction
+        self.records = []
+        self.global_step = 0
+        self.epoch = 0
+        self._fetched = None
+        self._restore = None
+
+    def watch(self, sequence):
+        """Time the batches fit draws from `sequence`, until training ends."""
+        cls = type(sequence)
+        original = cls.__getitem__
+        fetched = self._fetched = {}
+
+        def __getitem__(seq, index):
+            start = time.perf_counter()
+            batch = original(seq, index)
+            if seq is sequence:
+                # the validation Sequence of train() is of the same class
+                fetched[index] = (start, time.perf_counter())
+            return batch
+
+        # special methods are looked up on the class, not on the instance
+        cls.__getitem__ = __getitem__
+        self._restore = (cls, original)
+
+    def on_train_begin(self, logs=None):
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._jsonl = open(os.path.join(self.log_dir, 'steps.jsonl'), 'a')
+        self._writer = tf.summary.create_file_writer(self.log_dir)
+        self._train_start = time.perf_counter()
+        if self._fetched is not None:
+            # the batch fit peeks at to build the model
+            self._fetched.clear()
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch = epoch
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._begin = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        end = time.perf_counter()
+        step_s = end - self._begin
+        data_wait_s = None
+        if self._fetched is not None and batch in self._fetched:
+            start, done = self._fetched.pop(batch)
+            data_wait_s = min(max(done - max(start, self._begin), 0.0), step_s)
+        record = {'epoch': self.epoch, 'step': batch, 'global_step': self.global_step, 'time': time.time(),
+                  'step_s': step_s, 'data_wait_s': data_wait_s,
+                  'stalled': None if data_wait_s is None else data_wait_s > self.stall_fraction * step_s,
+                  'examples_per_s': self.BATCH_SIZE / step_s if step_s > 0 else None,
+                  'rss_mb': memory_mb(), 'peak_rss_mb': peak_memory_mb()}
+        if logs and 'loss' in logs:
+            record['loss'] = float(logs['loss'])
+        self.records.append(record)
+        self._jsonl.write(json.dumps(record) + '\n')
+        if self.global_step % self.scalar_every == 0:
+            with self._writer.as_default():
+                for key in ('step_s', 'data_wait_s', 'examples_per_s', 'rss_mb', 'peak_rss_mb'):
+                    if record[key] is not None:
+                        tf.summary.scalar('telemetry/' + key, record[key], step=self.global_step)
+        self.global_step += 1
+
+    def summary(self):
+        if not self.records:
+            return {}
+        step = np.array([r['step_s'] for r in self.records])
+        timed = [r for r in self.records if r['data_wait_s'] is not None]
+        wait = sum(r['data_wait_s'] for r in timed)
+        return {'steps': len(self.records), 'wall_s': time.perf_counter() - self._train_start,
+                'mean_step_s': float(step.mean()), 'p95_step_s': float(np.percentile(step, 95)),
+                'mean_examples_per_s': float(np.nanmean([r['examples_per_s'] or np.nan for r in self.records])),
+                'data_wait_s': wait if timed else None,
+                'data_wait_fraction': wait / sum(r['step_s'] for r in timed) if timed else None,
+                'stalled_steps': sum(r['stalled'] for r in timed) if timed else None,
+                'peak_rss_mb': self.records[-1]['peak_rss_mb']}
+
+    def on_train_end(self, logs=None):
+        if self._restore is not None:
+            cls, original = self._restore
+            cls.__getitem__ = original
+            self._restore = None
+        self._jsonl.close()
+        self._writer.flush()
+        summary = self.summary()
+        with open(os.path.join(self.log_dir, 'summary.json'), 'w') as f:
+            json.dump(summary, f, indent=4)
+        if not summary:
+            return
+        peak = 'unavailable' if summary['peak_rss_mb'] is None else f"{summary['peak_rss_mb']:.0f} MB"
+        wait = 'data wait not measured' if summary['data_wait_fraction'] is None else \
+            f"{summary['data_wait_fraction']:.0%} of step time waiting for data"
+        print(f"\nTelemetry: {summary['steps']} steps, {summary['mean_step_s'] * 1000:.1f} ms/step, "
+              f"{summary['mean_examples_per_s']:.1f} examples/s, {wait}, peak memory {peak}")
+        if summary['stalled_steps']:
+            print(f"{summary['stalled_steps']} of {summary['steps']} steps spent more than {self.stall_fraction:.0%} of their time "
+                  'waiting for data: the input pipeline is the bottleneck (see --processes, --image_cache, --aug_cache).')
+        print('Per-step log: ' + os.path.join(self.log_dir, 'steps.jsonl'))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 09:40:17 2026
+
+@author: tang
+"""
+
+import os
+import sys
+import platform
+
+# `runtime` entry of config.yaml; command line flags override it
+RUNTIME_DEFAULTS = {
+    'xla': False,              # XLA JIT compilation of the training/inference graphs
+    'intra_op_threads': 0,     # threads inside one op (0: TensorFlow picks, usually all cores)
+    'inter_op_threads': 0,     # ops run in parallel (0: TensorFlow picks)
+    'onednn': None,            # True/False forces TF_ENABLE_ONEDNN_OPTS, None keeps the TensorFlow default
+    'precision': 'float32',    # float32 / mixed_bfloat16 / mixed_float16
+}
+
+PRECISIONS = ('float32', 'mixed_bfloat16', 'mixed_float16')
+
+
+def add_runtime_arguments(parser):
+    parser.add_argument('--xla', type=int, default = None, choices=[0, 1], help='XLA JIT compilation (overrides runtime: xla)')
+    parser.add_argument('--intra_op_threads', type=int, default = None, help='threads used inside one op, 0 lets TensorFlow decide')
+    parser.add_argument('--inter_op_threads', type=int, default = None, help='ops executed in parallel, 0 lets TensorFlow decide')
+    parser.add_argument('--onednn', type=int, default = None, choices=[0, 1], help='force the oneDNN CPU kernels off (0) or on (1)')
+    parser.add_argument('--precision', type=str, default = None, choices=PRECISIONS)
+    return parser
+
+
+def runtime_options(result, args=None):
+    """Merge RUNTIME_DEFAULTS, the runtime entry of config.yaml and command line flags."""
+    options = dict(RUNTIME_DEFAULTS)
+    options.update((result or {}).get('runtime') or {})
+    if options['onednn'] == 'None':
+        options['onednn'] = None
+    if args is not None:
+        for key in RUNTIME_DEFAULTS:
+            value = getattr(args, key, None)
+            if value is not None:
+                options[key] = bool(value) if key in ('xla', 'onednn') else value
+    if options['precision'] not in PRECISIONS:
+        raise ValueError(f'Unknown precision: {options["precision"]} (choose from {", ".join(PRECISIONS)})')
+    return options
+
+
+def bf16_supported():
+    """True if the CPU has native bfloat16 instructions (AVX512-BF16 or AMX)."""
+    if platform.system() == 'Linux':
+        try:
+            with open('/proc/cpuinfo', 'r') as f:
+                flags = f.read()
+        except OSError:
+            return False
+        return 'avx512_bf16' in flags or 'amx_bf16' in flags
+    return False
+
+
+def configure_runtime(options):
+    """
+    Apply the runtime options. Must run before core.train / core.predict are
+    imported: oneDNN is chosen when TensorFlow is imported and the thread
+    pools are fixed once the first op has run.
+    Returns the options actually applied.
+    """
+    options = dict(options)
+    if 'tensorflow' in sys.modules and options['onednn'] is not None:
+        print('\nTensorFlow is already imported, the onednn setting is ignored.')
+    if options['onednn'] is not None:
+        os.environ['TF_ENABLE_ONEDNN_OPTS'] = '1' if options['onednn'] else '0'
+    if options['xla']:
+        # auto-clustering is GPU only unless the CPU global jit flag is set
+        flags = os.environ.get('TF_XLA_FLAGS', '')
+        if '--tf_xla_cpu_global_jit' not in flags:
+            os.environ['TF_XLA_FLAGS'] = (flags + ' --tf_xla_auto_jit=2 --tf_xla_cpu_global_jit').strip()
+
+    import tensorflow as tf
+    if options['intra_op_threads']:
+        tf.config.threading.set_intra_op_parallelism_threads(options['intra_op_threads'])
+    if options['inter_op_threads']:
+        tf.config.threading.set_inter_op_parallelism_threads(options['inter_op_threads'])
+    tf.config.optimizer.set_jit('autoclustering' if options['xla'] else False)
+
+    precision = options['precision']
+    if precision == 'mixed_bfloat16' and not bf16_supported():
+        print('\nThis CPU has no native bfloat16 support, falling back to float32.')
+        precision = 'float32'
+    if precision == 'mixed_float16' and not tf.config.list_physical_devices('GPU'):
+        print('\nmixed_float16 is only faster on GPUs, falling back to float32.')
+        precision = 'float32'
+    tf.keras.mixed_precision.set_global_policy(precision)
+    options['precision'] = precision
+    return options
+
+
+def describe_runtime(options):
+    return ', '.join(f'{key}={options[key]}' for key in RUNTIME_DEFAULTS)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:12:40 2026
+
+@author: tang
+"""
+
+import os
+import numpy as np
+import cv2
+
+GREY = (128, 128, 128)
+
+
+def trajectory_cache_path(prediction_file):
+    return os.path.splitext(prediction_file)[0] + '_trajectory.npy'
+
+
+def _count_header_rows(csv_file):
+    # DLC-style csv: scorer / (individuals) / bodyparts / coords rows before the data
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        for n, line in enumerate(f):
+            try:
+                float(line.split(',')[0])
+                return n
+            except ValueError:
+                continue
+    return 0
+
+
+def load_trajectory(prediction_file):
+    """
+    Load analysed trajectories as a read-only memory-mapped array of shape
+    (frames, individuals * bodyparts, 3) holding x, y and likelihood.
+    csv/h5 outputs are converted once into a .npy file next to them.
+    """
+    if prediction_file.endswith('.npy'):
+        return np.load(prediction_file, mmap_mode='r')
+
+    cache = trajectory_cache_path(prediction_file)
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(prediction_file):
+        return np.load(cache, mmap_mode='r')
+
+    import pandas as pd
+    if prediction_file.endswith(('.h5', '.hdf5')):
+        values = pd.read_hdf(prediction_file).values
+    else:
+        header = _count_header_rows(prediction_file)
+        values = pd.read_csv(prediction_file, header=None, skiprows=header).values[:, 1:]
+    values = values.astype(np.float32)
+
+    trajectory = np.lib.format.open_memmap(cache, mode='w+', dtype=np.float32,
+                                           shape=(len(values), values.shape[1] // 3, 3))
+    trajectory[:] = values[:, :values.shape[1] // 3 * 3].reshape(len(values), -1, 3)
+    trajectory.flush()
+    del trajectory
+    return np.load(cache, mmap_mode='r')
+
+
+def _disk_offsets(radius):
+    dy, dx = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    inside = dy ** 2 + dx ** 2 <= radius ** 2
+    return dy[inside], dx[inside]
+
+
+def draw_pose(frame, pose, kp_con, colors, pcutoff, NUM_KEYPOINT, radius=3):
+    """
+    Draw one frame of keypoints and skeleton in place without looping over
+    keypoints: points are stamped with fancy indexing and all skeleton
+    segments go through a single cv2.polylines call per style.
+    Bodyparts below pcutoff are drawn grey.
+    """
+    h, w = frame.shape[:2]
+    pose = np.asarray(pose, dtype=np.float32)
+    xy = pose[:, :2]
+    valid = np.isfinite(xy).all(axis=1)
+    good = valid & (pose[:, 2] >= pcutoff)
+    num_individuals = len(pose) // NUM_KEYPOINT
+
+    skeleton = np.asarray([con['bodypart'] for con in kp_con], dtype=np.int64).reshape(-1, 2)
+    if len(skeleton):
+        offsets = np.arange(num_individuals)[:, None, None] * NUM_KEYPOINT
+        pairs = (skeleton[None] + offsets).reshape(-1, 2)
+        segments = np.round(np.nan_to_num(xy[pairs])).astype(np.int32)
+        seg_valid = valid[pairs].all(axis=1)
+        seg_good = good[pairs].all(axis=1)
+        cv2.polylines(frame, list(segments[seg_valid & ~seg_good]), False, GREY, 1, cv2.LINE_AA)
+        cv2.polylines(frame, list(segments[seg_good]), False, (255, 255, 255), 1, cv2.LINE_AA)
+
+    dy, dx = _disk_offsets(radius)
+    points = np.round(xy[valid]).astype(np.int64)
+    ys = points[:, 1, None] + dy[None]
+    xs = points[:, 0, None] + dx[None]
+    inside = (ys >= 0) & (ys < h) & (xs >= 0) & (xs < w)
+
+    # colors in config_predict.yaml are RGB per bodypart, frames are BGR
+    palette = np.asarray(colors, dtype=np.uint8)[:, ::-1]
+    part_index = np.arange(len(pose))[valid] % NUM_KEYPOINT
+    point_colors = palette[part_index % len(palette)]
+    point_colors[~good[valid]] = GREY
+    stamp = np.broadcast_to(point_colors[:, None, :], ys.shape + (3,))
+    frame[ys[inside], xs[inside]] = stamp[inside]
+    return frame
+
+
+def quality_pyramid_dir(prediction_file):
+    return os.path.splitext(prediction_file)[0] + '_quality'
+
+
+def _quality_values(trajectory, chunk=1 << 18):
+    """Per-frame likelihood and jump magnitude, shape (frames, individuals * bodyparts, 2)."""
+    values = np.empty((len(trajectory), trajectory.shape[1], 2), dtype=np.float32)
+    for start in range(0, len(trajectory), chunk):
+        end = min(start + chunk, len(trajectory))
+        block = np.asarray(trajectory[max(start - 1, 0):end], dtype=np.float32)
+        likelihood = np.nan_to_num(block[:, :, 2])
+        jump = np.nan_to_num(np.linalg.norm(np.diff(block[:, :, :2], axis=0), axis=2))
+        if start == 0:
+            jump = np.concatenate([np.zeros_like(jump[:1]), jump])
+        values[start:end, :, 0] = likelihood[-(end - start):]
+        values[start:end, :, 1] = jump
+    return values
+
+
+def build_quality_pyramid(prediction_file, factor=4, min_bins=1024):
+    """
+    Precompute a min/mean/max pyramid of likelihood and jump magnitude so a
+    timeline over millions of frames only ever touches about one bin per pixel.
+    Level n holds bins of factor ** n frames; every level is stored as .npy
+    files and read back memory-mapped.
+    """
+    trajectory = load_trajectory(prediction_file)
+    out_dir = quality_pyramid_dir(prediction_file)
+    os.makedirs(out_dir, exist_ok=True)
+
+    level = _quality_values(trajectory)
+    np.save(os.path.join(out_dir, 'level0.npy'), level)
+    lo, mean, hi = level, level, level
+    n = 0
+    while len(lo) > min_bins:
+        n += 1
+        pad = (-len(lo)) % factor
+        shape = (-1, factor) + lo.shape[1:]
+        lo = np.pad(lo, ((0, pad), (0, 0), (0, 0)), mode='edge').reshape(shape).min(axis=1)
+        mean = np.pad(mean, ((0, pad), (0, 0), (0, 0)), mode='edge').reshape(shape).mean(axis=1)
+        hi = np.pad(hi, ((0, pad), (0, 0), (0, 0)), mode='edge').reshape(shape).max(axis=1)
+        np.save(os.path.join(out_dir, f'level{n}.npy'), np.stack([lo, mean, hi]))
+    return load_quality_pyramid(prediction_file)
+
+
+def load_quality_pyramid(prediction_file, factor=4):
+    """Return the pyramid levels as memory-mapped (3, bins, parts, 2) min/mean/max arrays."""
+    out_dir = quality_pyramid_dir(prediction_file)
+    level0 = os.path.join(out_dir, 'level0.npy')
+    source = trajectory_cache_path(prediction_file) if not prediction_file.endswith('.npy') else prediction_file
+    if not os.path.exists(level0) or (os.path.exists(source) and os.path.getmtime(level0) < os.path.getmtime(source)):
+        return build_quality_pyramid(prediction_file, factor)
+
+    base = np.load(level0, mmap_mode='r')
+    levels = [base[None]]
+    n = 1
+    while os.path.exists(os.path.join(out_dir, f'level{n}.npy')):
+        levels.append(np.load(os.path.join(out_dir, f'level{n}.npy'), mmap_mode='r'))
+        n += 1
+    return {'factor': factor, 'frames': len(base), 'levels': levels}
+
+
+def query_quality(pyramid, start, end, columns):
+    """
+    Aggregate frames [start, end) into `columns` bins using the coarsest level
+    whose bins are still narrower than one column. Returns min, mean and max,
+    each of shape (columns, parts, 2), and the first frame of every column.
+    """
+    start, end = max(int(start), 0), min(int(end), pyramid['frames'])
+    columns = max(min(int(columns), end - start), 1)
+    frames_per_column = (end - start) / columns
+
+    n = 0
+    while n + 1 < len(pyramid['levels']) and pyramid['factor'] ** (n + 1) <= frames_per_column:
+        n += 1
+    bin_size = pyramid['factor'] ** n
+    level = pyramid['levels'][n]
+
+    first, last = start // bin_size, -(-end // bin_size)
+    data = np.asarray(level[:, first:last])
+    if len(level) == 1:
+        data = np.repeat(data, 3, axis=0)
+
+    edges = start + (np.arange(columns + 1) * frames_per_column).astype(np.int64)
+    # every bin that overlaps a column counts for it, a bin across a column boundary for both columns
+    lo_bin = edges[:-1] // bin_size - first
+    hi_bin = np.minimum(-(-edges[1:] // bin_size) - first, data.shape[1])
+    counts = hi_bin - lo_bin
+    # reduceat over (lo_bin, hi_bin) pairs; the extra row makes hi_bin == len a valid index
+    data = np.concatenate([data, data[:, -1:]], axis=1)
+    idx = np.stack([lo_bin, hi_bin], axis=1).ravel()
+    lo = np.minimum.reduceat(data[0], idx, axis=0)[::2]
+    mean = np.add.reduceat(data[1], idx, axis=0)[::2] / counts[:, None, None]
+    hi = np.maximum.reduceat(data[2], idx, axis=0)[::2]
+    return lo, mean, hi, edges[:-1]
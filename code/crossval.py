@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 14:27:55 2026
+
+@author: tang
+"""
+
+import warnings
+warnings.filterwarnings('ignore')
+import os
+import csv
+import glob
+import json
+import hashlib
+import argparse
+import yaml
+import numpy as np
+from config.config_training import configuration
+from core.dataset import read_annotations, dataset_fingerprint, load_split
+from core.scheduler import available_cores, partition_cores, run_jobs, python_cmd, parse_rmse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_key(fingerprint, config, train_args):
+    """Changes whenever the data, the configuration (shuffle_num included) or the train.py options change."""
+    digest = hashlib.sha1()
+    digest.update(fingerprint.encode())
+    digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+    digest.update(' '.join(train_args).encode())
+    return digest.hexdigest()
+
+
+def run_model_dir(run_dir, shuffle_num):
+    """The <animal>_model/_<shuffle_num> folder train.py wrote in run_dir, None if there is not exactly one."""
+    found = glob.glob(os.path.join(run_dir, '*_model', f'_{shuffle_num}', 'split.json'))
+    return os.path.dirname(found[0]) if len(found) == 1 else None
+
+
+def read_result(run_dir):
+    try:
+        with open(os.path.join(run_dir, 'result.json'), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def split_overlap(test_sets):
+    """
+    How independent the held-out sets of the runs are: the mean and largest
+    share of frames two test sets have in common, the pairs of runs with the
+    same test set, and how many frames were held out at least once.
+    """
+    test_sets = [set(test) for test in test_sets]
+    shares, identical = [], []
+    for a in range(len(test_sets)):
+        for b in range(a + 1, len(test_sets)):
+            union = test_sets[a] | test_sets[b]
+            shares.append(len(test_sets[a] & test_sets[b]) / max(len(union), 1))
+            if test_sets[a] == test_sets[b]:
+                identical.append((a, b))
+    return {'mean_overlap': float(np.mean(shares)) if shares else None, 'max_overlap': max(shares, default=None),
+            'identical': identical, 'held_out_frames': len(set().union(*test_sets))}
+
+
+def report(out_dir, results, bodyparts, num_frames):
+    ok = [r for r in results if r['status'] == 'ok']
+    table = {}
+    for part in bodyparts:
+        values = np.array([r['rmse'][part] for r in ok if part in r['rmse']])
+        table[part] = {'mean': float(values.mean()) if len(values) else None,
+                       'std': float(values.std(ddof=1)) if len(values) > 1 else None, 'runs': len(values)}
+    means = [r['mean_rmse'] for r in ok]
+    overall = {'mean': float(np.mean(means)) if means else None, 'std': float(np.std(means, ddof=1)) if len(means) > 1 else None,
+               'runs': len(means)}
+    recorded = [r for r in ok if r.get('test') is not None]
+    overlap = split_overlap([[i for i in r['test'] if i is not None] for r in recorded])
+
+    with open(os.path.join(out_dir, 'report.json'), 'w') as f:
+        json.dump({'bodyparts': table, 'average': overall, 'splits': overlap, 'runs': results}, f, indent=4)
+    with open(os.path.join(out_dir, 'report.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['bodypart', 'mean_rmse', 'std_rmse'] + [f"shuffle{r['shuffle_num']}" for r in results])
+        for part in bodyparts:
+            writer.writerow([part, table[part]['mean'], table[part]['std']] + [r['rmse'].get(part) for r in results])
+        writer.writerow(['average', overall['mean'], overall['std']] + [r['mean_rmse'] for r in results])
+
+    def fmt(value):
+        return f'{value:8.3f}' if value is not None else f"{'-':>8s}"
+    print(f"\n{'bodypart':<20s} {'mean':>8s} {'std':>8s}")
+    for part in bodyparts:
+        print(f'{part:<20s} {fmt(table[part]["mean"])} {fmt(table[part]["std"])}')
+    print(f'{"average":<20s} {fmt(overall["mean"])} {fmt(overall["std"])}  ({overall["runs"]} of {len(results)} runs)')
+    if len(recorded) < len(ok):
+        print(f'\n{len(ok) - len(recorded)} runs did not record their split, their test sets are not compared.')
+    if len(recorded) > 1:
+        print(f"\nTest sets: {overlap['mean_overlap'] * 100:.0f}% shared between two runs on average (at most "
+              f"{overlap['max_overlap'] * 100:.0f}%), {overlap['held_out_frames']} of {num_frames} frames held out at least once.")
+    for a, b in overlap['identical']:
+        print(f"WARNING: shuffle {recorded[a]['shuffle_num']} and {recorded[b]['shuffle_num']} held out the same frames, "
+              'their RMSE is not an independent estimate.')
+    print('\nReport: ' + os.path.join(out_dir, 'report.csv'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='repeated random-split validation of train.py, runs trained in parallel')
+    parser.add_argument('--config', type=str, default = 'config.yaml')
+    parser.add_argument('--config_predict', type=str, default = 'config_predict.yaml')
+    parser.add_argument('--repeats', type=int, default = 5, help='runs with shuffle_num, shuffle_num + 1 ...')
+    parser.add_argument('--parallel', type=int, default = None, help='runs trained at the same time (default: all)')
+    parser.add_argument('--cores_per_run', type=int, default = None)
+    parser.add_argument('--output', type=str, default = None, help='default crossval/_<shuffle_num>_r<repeats>')
+    args, train_args = parser.parse_known_args()
+    with open(args.config, 'r', encoding='utf-8') as f:
+        result = yaml.load(f.read(), Loader=yaml.FullLoader)
+
+    # runs work in their own directories, so every path has to be absolute
+    config = dict(result, IMG_DIR=os.path.abspath(result['IMG_DIR']), JSON=os.path.abspath(result['JSON']))
+    IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts, early_stop,centre, num_classes = configuration(config)
+    out_dir = os.path.abspath(args.output or os.path.join('crossval', f'_{shuffle_num}_r{args.repeats}'))
+    paths, joints = read_annotations(JSON, IMG_DIR)
+    fingerprint = dataset_fingerprint(JSON, paths)
+
+    # repeated random-split validation, not k-fold: train() splits the frames itself, seeded by shuffle_num,
+    # so every run gets its own shuffle_num and its own random train/test split, evaluated on its held-out frames
+    shuffles = [shuffle_num + i for i in range(args.repeats)]
+    jobs = []
+    for shuffle in shuffles:
+        run_dir = os.path.join(out_dir, f'shuffle{shuffle}')
+        run_config = dict(config, shuffle_num=shuffle)
+        key = run_key(fingerprint, run_config, train_args)
+        previous = read_result(run_dir)
+        if previous is not None and previous['key'] == key and previous['status'] == 'ok':
+            print(f'shuffle{shuffle} unchanged, reusing its result')
+            continue
+        os.makedirs(run_dir, exist_ok=True)
+        with open(os.path.join(run_dir, 'config.yaml'), 'w', encoding='utf-8') as f:
+            yaml.dump(run_config, f, allow_unicode=True)
+        cmd = python_cmd(os.path.join(HERE, 'train.py'), '--config', 'config.yaml', '--config_predict', os.path.abspath(args.config_predict),
+                         *train_args)
+        jobs.append({'name': f'shuffle{shuffle}', 'cmd': cmd, 'cwd': run_dir, 'log': os.path.join(run_dir, 'train.log'),
+                     'shuffle_num': shuffle, 'key': key})
+
+    def on_finish(job, returncode):
+        rmse = parse_rmse(job['log'])
+        values = [rmse[part] for part in bodyparts if part in rmse]
+        model_dir = run_model_dir(job['cwd'], job['shuffle_num'])
+        split = None if model_dir is None else load_split(model_dir)
+        test = None if split is None else split['test']
+        row = {'shuffle_num': job['shuffle_num'], 'key': job['key'], 'num_test': None if test is None else len(test),
+               'test': test, 'status': 'ok' if returncode == 0 and values else 'failed', 'rmse': rmse,
+               'mean_rmse': float(np.mean(values)) if values else None}
+        with open(os.path.join(job['cwd'], 'result.json'), 'w') as f:
+            json.dump(row, f, indent=4)
+
+    if jobs:
+        # runs beyond the core count wait for a free core set
+        parallel = min(args.parallel or len(jobs), len(available_cores()))
+        run_jobs(jobs, partition_cores(parallel, args.cores_per_run), on_finish=on_finish)
+    results = [read_result(os.path.join(out_dir, f'shuffle{shuffle}')) for shuffle in shuffles]
+    report(out_dir, [r for r in results if r is not None], bodyparts, len(paths))
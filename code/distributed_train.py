@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 09:48:30 2026
+
+@author: tang
+"""
+
+import warnings
+warnings.filterwarnings('ignore')
+import os
+import glob
+import json
+import shutil
+import argparse
+import tempfile
+import yaml
+from core.scheduler import available_cores, partition_cores, run_jobs, python_cmd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def tf_config(num_workers, index, port):
+    cluster = {'worker': [f'localhost:{port + i}' for i in range(num_workers)]}
+    return json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': index}})
+
+
+def launch(num_workers, config, config_predict, train_args, port, log_dir, chief_dir=None, cores_per_worker=None):
+    """
+    Start num_workers train.py processes on localhost, each on its own cores
+    with TF_CONFIG describing the local cluster, and wait for all of them.
+    The chief (worker 0) runs in chief_dir, so its model and checkpoints land
+    where a single-process run would put them; the other workers run in
+    throw-away directories. Returns the return codes and the worker directories.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    workdirs = [chief_dir or tempfile.mkdtemp(prefix='adpt_worker0_')]
+    workdirs += [tempfile.mkdtemp(prefix=f'adpt_worker{i}_') for i in range(1, num_workers)]
+    config_file = os.path.join(log_dir, 'config.yaml')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.dump(config, f, allow_unicode=True)
+
+    jobs = []
+    for i, workdir in enumerate(workdirs):
+        cmd = python_cmd(os.path.join(HERE, 'train.py'), '--config', config_file, '--config_predict', config_predict, *train_args)
+        jobs.append({'name': f'worker{i}', 'cmd': cmd, 'cwd': workdir, 'log': os.path.join(log_dir, f'worker{i}.log'),
+                     'env': {'TF_CONFIG': tf_config(num_workers, i, port)}})
+    # one core set per worker, so all workers start together as the strategy requires
+    returncodes = run_jobs(jobs, partition_cores(num_workers, cores_per_worker))
+    return returncodes, workdirs
+
+
+def chief_summary(telemetry_dir):
+    summaries = sorted(glob.glob(os.path.join(telemetry_dir, '*_worker0', 'summary.json')))
+    if not summaries:
+        return None
+    with open(summaries[-1], 'r') as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='data-parallel training with N local train.py workers (MultiWorkerMirroredStrategy)')
+    parser.add_argument('--config', type=str, default = 'config.yaml')
+    parser.add_argument('--config_predict', type=str, default = 'config_predict.yaml')
+    parser.add_argument('--num_workers', type=int, default = 2)
+    parser.add_argument('--cores_per_worker', type=int, default = None)
+    parser.add_argument('--port', type=int, default = 23456, help='first port of the local cluster')
+    parser.add_argument('--log_dir', type=str, default = 'distributed_logs')
+    parser.add_argument('--scaling', action='store_true', help='measure throughput with 1, 2, 4 ... num_workers workers instead of training')
+    parser.add_argument('--epochs', type=int, default = 1, help='epochs per scaling run')
+    args, train_args = parser.parse_known_args()
+    with open(args.config, 'r', encoding='utf-8') as f:
+        result = yaml.load(f.read(), Loader=yaml.FullLoader)
+    # every worker needs its own cores: the all-reduce waits for the slowest, and workers sharing a core stall each other
+    if args.num_workers > len(available_cores()):
+        raise SystemExit(f'--num_workers {args.num_workers} is more than the {len(available_cores())} usable CPU cores')
+
+    # workers run in their own directories, so every path has to be absolute
+    config = dict(result, IMG_DIR=os.path.abspath(result['IMG_DIR']), JSON=os.path.abspath(result['JSON']))
+    config_predict = os.path.abspath(args.config_predict)
+    log_dir = os.path.abspath(args.log_dir)
+
+    if not args.scaling:
+        returncodes, workdirs = launch(args.num_workers, config, config_predict, train_args, args.port, log_dir,
+                                       chief_dir=os.getcwd(), cores_per_worker=args.cores_per_worker)
+        for workdir in workdirs[1:]:
+            shutil.rmtree(workdir, ignore_errors=True)
+        if any(returncodes.values()):
+            raise SystemExit(f'A worker failed, see the logs in {log_dir}')
+        with open(os.path.join(log_dir, 'worker0.log'), 'r', encoding='utf-8', errors='replace') as f:
+            print(f.read())
+        raise SystemExit(0)
+
+    counts = sorted({n for n in (2 ** i for i in range(args.num_workers.bit_length())) if n <= args.num_workers} | {args.num_workers})
+    config = dict(config, EPOCHS=args.epochs, WARMUP_EPOCHS=min(config['WARMUP_EPOCHS'], 1))
+    rows = []
+    for run, n in enumerate(counts):
+        run_dir = os.path.join(log_dir, f'scaling_{n}')
+        telemetry = os.path.join(run_dir, 'telemetry')
+        returncodes, workdirs = launch(n, config, config_predict, train_args + ['--telemetry', telemetry], args.port + 100 * run,
+                                       run_dir, cores_per_worker=args.cores_per_worker)
+        for workdir in workdirs:
+            shutil.rmtree(workdir, ignore_errors=True)
+        summary = chief_summary(telemetry)
+        if any(returncodes.values()) or summary is None:
+            print(f'{n} workers failed, see the logs in {run_dir}')
+            continue
+        # every worker trains on full BATCH_SIZE batches of its own shard, so the global rate is n x the chief's
+        rows.append({'workers': n, 'examples_per_s': n * summary['mean_examples_per_s'], 'mean_step_s': summary['mean_step_s']})
+
+    if rows:
+        base = rows[0]['examples_per_s'] / rows[0]['workers']
+        print(f"\n{'workers':>8s} {'examples/s':>11s} {'speed-up':>9s} {'efficiency':>11s}")
+        for row in rows:
+            row['speedup'] = row['examples_per_s'] / base
+            row['efficiency'] = row['speedup'] / row['workers']
+            print(f"{row['workers']:8d} {row['examples_per_s']:11.1f} {row['speedup']:9.2f} {row['efficiency'] * 100:10.1f}%")
+        with open(os.path.join(log_dir, 'scaling.json'), 'w') as f:
+            json.dump(rows, f, indent=4)
+        print('\nScaling results: ' + os.path.join(log_dir, 'scaling.json'))
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 29 14:36:07 2026
+
+@author: tang
+"""
+
+import warnings
+warnings.filterwarnings('ignore')
+import os
+import argparse
+import yaml
+import numpy as np
+from config.config_training import configuration
+from config.config_predicting import configuration_predict
+from core.tf_runtime import add_runtime_arguments, runtime_options, configure_runtime, describe_runtime
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='export a training checkpoint to an inference-only SavedModel and TFLite')
+    parser.add_argument('--config', type=str, default = 'config.yaml')
+    parser.add_argument('--config_predict', type=str, default = 'config_predict.yaml')
+    parser.add_argument('--output', type=str, default = None, help='export directory (default: export/ next to model_path)')
+    parser.add_argument('--float16', action='store_true', help='also write a TFLite model with float16 weights')
+    parser.add_argument('--no_tflite', action='store_true', help='only write the SavedModel')
+    add_runtime_arguments(parser)
+    args = parser.parse_args()
+    with open(args.config, 'r', encoding='utf-8') as f:
+        result = yaml.load(f.read(), Loader=yaml.FullLoader)
+    with open(args.config_predict, 'r', encoding='utf-8') as f:
+        result_predict = yaml.load(f.read(), Loader=yaml.FullLoader)
+    # exported in float32 whatever precision training used
+    runtime = configure_runtime(dict(runtime_options(result, args), precision='float32'))
+    print('\nRuntime: ' + describe_runtime(runtime))
+    from core.inference import capture_model, make_infer, model_fingerprint, is_checkpoint
+    from core.export import export_saved_model, export_tflite, write_export_info, SavedModelRunner, TFLiteRunner
+
+    IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts, early_stop,centre,num_classes = configuration(result)
+    videos,save_video,model_path,colors,pcutoff,scorer = configuration_predict(result_predict)
+    if not is_checkpoint(model_path):
+        raise SystemExit(f'{model_path} is already exported, point model_path at the training checkpoint (cp.ckpt)')
+    predict_args = (IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts,videos,False,model_path,colors,pcutoff,num_classes,scorer,centre)
+    out_dir = args.output or os.path.join(os.path.dirname(model_path), 'export')
+    os.makedirs(out_dir, exist_ok=True)
+
+    model = capture_model(predict_args)
+    saved_model = export_saved_model(model, os.path.join(out_dir, 'saved_model'), IMG_SIZE_H, IMG_SIZE_W)
+    exported = {'saved_model': saved_model}
+    if not args.no_tflite:
+        exported['float32'] = export_tflite(saved_model, os.path.join(out_dir, 'model_float32.tflite'))
+        if args.float16:
+            exported['float16'] = export_tflite(saved_model, os.path.join(out_dir, 'model_float16.tflite'), float16=True)
+
+    # every export has to reproduce the checkpoint's outputs on the same batch
+    batch = np.random.default_rng(0).uniform(0, 255, (2, IMG_SIZE_H, IMG_SIZE_W, 3)).astype(np.float32)
+    reference = make_infer(model)(batch)
+    differences = {}
+    for name, path in exported.items():
+        runner = TFLiteRunner(path) if path.endswith('.tflite') else SavedModelRunner(path)
+        outputs = runner(batch)
+        differences[name] = max(float(np.abs(a - b).max()) for a, b in zip(reference, outputs))
+        size = os.path.getsize(path) if os.path.isfile(path) else sum(
+            os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+        print(f'{name:<12s} {size / 2 ** 20:8.1f} MB  max output difference {differences[name]:.2e}  {path}')
+
+    write_export_info(out_dir, {'model_path': model_path, 'model_fingerprint': model_fingerprint(model_path),
+                                'IMG_SIZE_H': IMG_SIZE_H, 'IMG_SIZE_W': IMG_SIZE_W, 'global_scale': global_scale,
+                                'NUM_KEYPOINT': NUM_KEYPOINT, 'num_classes': num_classes, 'bodyparts': bodyparts,
+                                'files': exported, 'max_output_difference': differences})
+    print(f'\nExported to {out_dir}; set model_path in config_predict.yaml to one of the files above.')
@@ -7,16 +7,24 @@ Created on Mon Jan  8 18:49:52 2024
 
 import warnings
 warnings.filterwarnings('ignore')
-from core.predict import predict, predict_picture
 import yaml
 from config.config_training import configuration
 from config.config_predicting import configuration_predict
 import argparse
+from core.tf_runtime import add_runtime_arguments, runtime_options, configure_runtime, describe_runtime
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='argparse testing')
     parser.add_argument('--config', type=str, default = 'config.yaml')
     parser.add_argument('--config_predict', type=str, default = 'config_predict.yaml')
+    parser.add_argument('--pipeline', action='store_true', help='analyse with the streaming engine: decode, inference, pose decoding and writing run concurrently')
+    parser.add_argument('--workers', type=int, default = 0, help='analyse videos in this many processes, longest videos first (uses the streaming engine)')
+    parser.add_argument('--shards', type=int, default = 0, help='analyse each video as this many time ranges in parallel processes and stitch them')
+    parser.add_argument('--overlap', type=int, default = 64, help='frames analysed by both ranges at every shard boundary, used to match identities')
+    parser.add_argument('--queue_size', type=int, default = 8, help='bounded queue length between pipeline stages')
+    parser.add_argument('--checkpoint_every', type=int, default = 10000, help='frames between progress checkpoints of the streaming engine')
+    parser.add_argument('--force', action='store_true', help='re-analyse videos whose results match the model and configuration')
+    add_runtime_arguments(parser)
     args = parser.parse_args()
     json_file = args.config
     # print(json_file)
@@ -28,6 +36,10 @@ if __name__ == '__main__':
     with open(json_file_predict, 'r', encoding='utf-8') as f:
         result_predict = yaml.load(f.read(), Loader=yaml.FullLoader)
     print(result_predict)
+    # TensorFlow settings have to be in place before core.predict builds the graph
+    runtime = configure_runtime(runtime_options(result, args))
+    print('\nRuntime: ' + describe_runtime(runtime))
+    from core.predict import predict, predict_picture
     # print('\nTraining configuration:')
     IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts, early_stop,centre,num_classes = configuration(result)
     # print(result)
@@ -38,9 +50,37 @@ if __name__ == '__main__':
     stride = 8
     evaluate = False # False
     save_path = '_' + str(shuffle_num)
+    # inference batch, independent of the training BATCH_SIZE in config.yaml
+    batch_size = result_predict.get('batch_size', BATCH_SIZE)
+    
+    predict_args = (IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, batch_size, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts,videos,save_video,model_path,colors,pcutoff,num_classes,scorer,centre)
+    
+    from core.inference import is_checkpoint
+    if not is_checkpoint(model_path) and not (args.shards > 0 or args.workers > 0 or args.pipeline):
+        # exported models run without core.predict, on the streaming engine
+        args.pipeline = True
     
     print('\nStart analyzing videos!\n')
-    predict(IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts,videos,save_video,model_path,colors,pcutoff,num_classes,scorer,centre)
+    if args.shards > 0 or args.workers > 0 or args.pipeline:
+        from core.inference import analysis_key
+        settings = dict(IMG_SIZE_H=IMG_SIZE_H, IMG_SIZE_W=IMG_SIZE_W, NUM_KEYPOINT=NUM_KEYPOINT,
+                        num_classes=num_classes, bodyparts=bodyparts, scorer=scorer, save_video=save_video, colors=colors,
+                        pcutoff=pcutoff, kp_con=kp_con, batch_size=batch_size, queue_size=args.queue_size)
+        # finished videos are skipped and interrupted ones resumed while model and settings are unchanged
+        settings.update(resume_key=analysis_key(model_path, settings), checkpoint_every=args.checkpoint_every, force=args.force)
+    if args.shards > 0:
+        from core.inference import analyze_sharded
+        analyze_sharded(videos, args.shards, args.overlap, runtime, model_path, predict_args, settings)
+    elif args.workers > 0:
+        from core.inference import analyze_videos
+        analyze_videos(videos, args.workers, runtime, model_path, predict_args, settings)
+    elif args.pipeline:
+        from core.inference import load_model, make_infer, analyze_video
+        infer = make_infer(load_model(model_path, predict_args))
+        for video in videos:
+            analyze_video(video, infer, **settings)
+    else:
+        predict(*predict_args)
     
     # for idx, bodypart in enumerate(bodyparts):
     #     print('RMSE (' + bodypart + '): ', model_rmse[1][idx])
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 30 10:21:45 2026
+
+@author: tang
+"""
+
+import warnings
+warnings.filterwarnings('ignore')
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+import yaml
+import numpy as np
+import cv2
+from config.config_training import configuration
+from config.config_predicting import configuration_predict
+from core.dataset import read_annotations, recorded_split
+from core.tf_runtime import add_runtime_arguments, runtime_options, configure_runtime, describe_runtime
+
+
+def read_inputs(paths, IMG_SIZE_H, IMG_SIZE_W, sizes=None):
+    """
+    Annotated images prepared exactly like video frames during analysis, read
+    one at a time. The (height, width) of each image is appended to sizes.
+    """
+    from core.inference import preprocess
+    for path in paths:
+        image = cv2.imread(path)
+        if sizes is not None:
+            sizes.append(image.shape[:2])
+        yield preprocess(image, IMG_SIZE_H, IMG_SIZE_W)
+
+
+def evaluate(infer, paths, num_parts, IMG_SIZE_H, IMG_SIZE_W, batch_size):
+    """Poses for the images and the model frames/s (image reading not counted)."""
+    from core.inference import decode_outputs
+    poses = []
+    seconds = 0.0
+    for i in range(0, len(paths), batch_size):
+        sizes = []
+        batch = np.stack(list(read_inputs(paths[i:i + batch_size], IMG_SIZE_H, IMG_SIZE_W, sizes)))
+        if i == 0:
+            infer(batch)  # tracing and buffer allocation are not part of the rate
+        start = time.perf_counter()
+        outputs = infer(batch)
+        seconds += time.perf_counter() - start
+        poses.append(decode_outputs(outputs, num_parts, sizes))
+    return np.concatenate(poses), len(paths) / max(seconds, 1e-9)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='int8 post-training quantization with an accuracy gate on the held-out split')
+    parser.add_argument('--config', type=str, default = 'config.yaml')
+    parser.add_argument('--config_predict', type=str, default = 'config_predict.yaml')
+    parser.add_argument('--saved_model', type=str, default = None, help='exported float model (default export/saved_model next to model_path, created if missing)')
+    parser.add_argument('--calibration', type=int, default = 200, help='training frames used to calibrate the activation ranges')
+    parser.add_argument('--max_increase', type=float, default = 1.0, help='largest accepted RMSE increase of any bodypart, in pixels')
+    parser.add_argument('--batch_size', type=int, default = 8)
+    add_runtime_arguments(parser)
+    args = parser.parse_args()
+    with open(args.config, 'r', encoding='utf-8') as f:
+        result = yaml.load(f.read(), Loader=yaml.FullLoader)
+    with open(args.config_predict, 'r', encoding='utf-8') as f:
+        result_predict = yaml.load(f.read(), Loader=yaml.FullLoader)
+    runtime = configure_runtime(dict(runtime_options(result, args), precision='float32'))
+    print('\nRuntime: ' + describe_runtime(runtime))
+    from core.inference import capture_model, is_checkpoint
+    from core.export import export_saved_model, quantize_int8, bodypart_rmse, rmse_increase, SavedModelRunner, TFLiteRunner
+
+    IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts, early_stop,centre,num_classes = configuration(result)
+    videos,save_video,model_path,colors,pcutoff,scorer = configuration_predict(result_predict)
+    num_parts = NUM_KEYPOINT * num_classes
+
+    saved_model = args.saved_model or os.path.join(os.path.dirname(model_path), 'export', 'saved_model')
+    if not os.path.isdir(saved_model):
+        if not is_checkpoint(model_path):
+            raise SystemExit(f'No SavedModel at {saved_model}; run export.py or pass --saved_model')
+        print(f'Exporting {model_path} to {saved_model}')
+        predict_args = (IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts,videos,False,model_path,colors,pcutoff,num_classes,scorer,centre)
+        export_saved_model(capture_model(predict_args), saved_model, IMG_SIZE_H, IMG_SIZE_W)
+    out_dir = os.path.dirname(os.path.abspath(saved_model))
+    published = os.path.join(out_dir, 'model_int8.tflite')
+    candidate = os.path.join(out_dir, 'model_int8.candidate.tflite')
+
+    # calibrate on training frames, judge on the frames train() held out for the exported model
+    model_dir = os.path.dirname(model_path)
+    if os.path.exists(os.path.join(out_dir, 'export.json')):
+        with open(os.path.join(out_dir, 'export.json'), 'r') as f:
+            model_dir = os.path.dirname(json.load(f)['model_path'])
+    paths, joints = read_annotations(JSON, IMG_DIR)
+    try:
+        train_idx, test_idx = recorded_split(model_dir, JSON, IMG_DIR)
+    except ValueError as e:
+        raise SystemExit(f'Cannot tell which frames the model was tested on: {e}. '
+                         'Retrain with train.py, which records the split train() made.')
+    if len(test_idx) == 0:
+        raise SystemExit('The held-out split is empty (TrainingFraction = 1), there is nothing to check the int8 model on')
+    sample = np.random.RandomState(shuffle_num).permutation(train_idx)[:args.calibration]
+    print(f'Calibrating on {len(sample)} training frames')
+    with open(candidate, 'wb') as f:
+        f.write(quantize_int8(saved_model, read_inputs([paths[i] for i in sample], IMG_SIZE_H, IMG_SIZE_W)))
+
+    test_paths = [paths[i] for i in test_idx]
+    float_poses, float_rate = evaluate(SavedModelRunner(saved_model), test_paths, num_parts, IMG_SIZE_H, IMG_SIZE_W, args.batch_size)
+    int8_poses, int8_rate = evaluate(TFLiteRunner(candidate), test_paths, num_parts, IMG_SIZE_H, IMG_SIZE_W, args.batch_size)
+    float_rmse = bodypart_rmse(float_poses, joints[test_idx], bodyparts)
+    int8_rmse = bodypart_rmse(int8_poses, joints[test_idx], bodyparts)
+
+    rows, failed = rmse_increase(float_rmse, int8_rmse, args.max_increase)
+    print(f"\n{'bodypart':<20s} {'float':>8s} {'int8':>8s} {'increase':>9s}")
+    for row in rows:
+        print(f"{row['bodypart']:<20s} {row['float_rmse']:8.3f} {row['int8_rmse']:8.3f} {row['increase']:9.3f}"
+              f"{'  <- over the limit' if row['bodypart'] in failed else ''}")
+    print(f'\n{len(test_idx)} held-out frames, float {float_rate:.1f} frames/s, int8 {int8_rate:.1f} frames/s '
+          f'({int8_rate / max(float_rate, 1e-9):.1f}x)')
+
+    report = {'date': datetime.now().isoformat(), 'saved_model': saved_model, 'calibration_frames': len(sample),
+              'test_frames': len(test_idx), 'max_increase': args.max_increase, 'bodyparts': rows,
+              'float_frames_per_s': float_rate, 'int8_frames_per_s': int8_rate, 'published': not failed}
+    with open(os.path.join(out_dir, 'quantization.json'), 'w') as f:
+        json.dump(report, f, indent=4)
+    if failed:
+        rejected = os.path.join(out_dir, 'model_int8.rejected.tflite')
+        os.replace(candidate, rejected)
+        print(f'\nNot published: RMSE of {", ".join(failed)} rose by more than {args.max_increase} px. '
+              f'The rejected model is kept as {rejected}; calibrate on more frames or keep the float model.')
+        sys.exit(1)
+    os.replace(candidate, published)
+    print(f'\nPublished {published}; set model_path in config_predict.yaml to it to analyse with the int8 model.')
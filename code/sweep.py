@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 11:20:48 2026
+
+@author: tang
+"""
+
+import warnings
+warnings.filterwarnings('ignore')
+import os
+import csv
+import json
+import hashlib
+import itertools
+import argparse
+import yaml
+import numpy as np
+from core.scheduler import fit_to_cores, partition_cores, run_jobs, python_cmd, parse_rmse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# config keys configuration() passes through eval(), so they are written back as strings
+EVAL_KEYS = ('variation', 'initial_learning_rate', 'alpha', 'Tranfer_LR')
+
+
+def sample_params(spec):
+    """Expand the params of a sweep spec into a list of {key: value} settings."""
+    params = spec['params']
+    if spec.get('search', 'grid') == 'grid':
+        for key, values in params.items():
+            if not isinstance(values, list):
+                raise ValueError(f'Grid search needs a list of values for {key}')
+        keys = list(params)
+        return [dict(zip(keys, values)) for values in itertools.product(*(params[key] for key in keys))]
+
+    rng = np.random.default_rng(spec.get('seed', 0))
+    settings = []
+    for _ in range(spec.get('samples', 8)):
+        setting = {}
+        for key, values in params.items():
+            if isinstance(values, list):
+                setting[key] = values[rng.integers(len(values))]
+            elif values.get('log'):
+                setting[key] = float(np.exp(rng.uniform(np.log(float(values['low'])), np.log(float(values['high'])))))
+            else:
+                setting[key] = float(rng.uniform(float(values['low']), float(values['high'])))
+        settings.append(setting)
+    return settings
+
+
+def run_id(index, setting):
+    digest = hashlib.sha1(json.dumps(setting, sort_keys=True).encode()).hexdigest()[:8]
+    return f'run{index:03d}_{digest}'
+
+
+def run_config(result, setting):
+    config = dict(result, IMG_DIR=os.path.abspath(result['IMG_DIR']), JSON=os.path.abspath(result['JSON']))
+    for key, value in setting.items():
+        config[key] = str(value) if key in EVAL_KEYS else value
+    return config
+
+
+def write_table(sweep_dir, settings, bodyparts):
+    rows = []
+    for name, setting in settings:
+        result_file = os.path.join(sweep_dir, name, 'result.json')
+        if not os.path.exists(result_file):
+            continue
+        with open(result_file, 'r') as f:
+            rows.append(json.load(f))
+    rows.sort(key=lambda row: (row['mean_rmse'] is None, row['mean_rmse'] or 0))
+    keys = sorted({key for _, setting in settings for key in setting})
+    with open(os.path.join(sweep_dir, 'results.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['run'] + keys + ['status', 'mean_rmse'] + bodyparts)
+        for row in rows:
+            writer.writerow([row['run']] + [row['params'].get(key) for key in keys] + [row['status'], row['mean_rmse']]
+                            + [row['rmse'].get(part) for part in bodyparts])
+
+    print(f"\n{'run':<20s} " + ' '.join(f'{key:>12s}' for key in keys) + f" {'mean RMSE':>10s}")
+    for row in rows:
+        mean = f"{row['mean_rmse']:10.3f}" if row['mean_rmse'] is not None else f"{row['status']:>10s}"
+        print(f"{row['run']:<20s} " + ' '.join(f'{str(row["params"].get(key)):>12s}' for key in keys) + ' ' + mean)
+    print('\nResults table: ' + os.path.join(sweep_dir, 'results.csv'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='parallel hyperparameter sweep over config.yaml keys')
+    parser.add_argument('spec', type=str, help='sweep specification, see sweep.yaml')
+    parser.add_argument('--config', type=str, default = 'config.yaml')
+    parser.add_argument('--config_predict', type=str, default = 'config_predict.yaml')
+    parser.add_argument('--output', type=str, default = None, help='sweep directory (default sweeps/<spec name>)')
+    parser.add_argument('--parallel', type=int, default = None, help='runs at the same time (default: from the spec, else 2)')
+    parser.add_argument('--cores_per_run', type=int, default = None)
+    parser.add_argument('--workers', type=int, default = 0, help='batch preparation threads per run (train.py --workers)')
+    args = parser.parse_args()
+    with open(args.config, 'r', encoding='utf-8') as f:
+        result = yaml.load(f.read(), Loader=yaml.FullLoader)
+    with open(args.spec, 'r', encoding='utf-8') as f:
+        spec = yaml.load(f.read(), Loader=yaml.FullLoader)
+
+    sweep_dir = os.path.abspath(args.output or os.path.join('sweeps', os.path.splitext(os.path.basename(args.spec))[0]))
+    settings = [(run_id(i, setting), setting) for i, setting in enumerate(sample_params(spec))]
+    bodyparts = result['bodyparts']
+
+    jobs = []
+    for name, setting in settings:
+        workdir = os.path.join(sweep_dir, name)
+        result_file = os.path.join(workdir, 'result.json')
+        if os.path.exists(result_file):
+            with open(result_file, 'r') as f:
+                if json.load(f)['status'] == 'ok':
+                    continue  # finished in an earlier invocation of this sweep
+        os.makedirs(workdir, exist_ok=True)
+        with open(os.path.join(workdir, 'config.yaml'), 'w', encoding='utf-8') as f:
+            yaml.dump(run_config(result, setting), f, allow_unicode=True)
+        cmd = python_cmd(os.path.join(HERE, 'train.py'), '--config', 'config.yaml', '--config_predict', os.path.abspath(args.config_predict),
+                         '--workers', args.workers)
+        jobs.append({'name': name, 'cmd': cmd, 'cwd': workdir, 'log': os.path.join(workdir, 'train.log'), 'params': setting})
+
+    def on_finish(job, returncode):
+        rmse = parse_rmse(job['log'])
+        values = [rmse[part] for part in bodyparts if part in rmse]
+        row = {'run': job['name'], 'params': job['params'], 'status': 'ok' if returncode == 0 and values else 'failed',
+               'rmse': rmse, 'mean_rmse': float(np.mean(values)) if values else None}
+        with open(os.path.join(job['cwd'], 'result.json'), 'w') as f:
+            json.dump(row, f, indent=4)
+
+    parallel = fit_to_cores(args.parallel or spec.get('parallel', 2), 'runs')
+    core_sets = partition_cores(parallel, args.cores_per_run or spec.get('cores_per_run'))
+    print(f'\n{len(settings)} runs ({len(jobs)} to do), {len(core_sets)} at a time on {len(core_sets[0])} cores each.\n')
+    run_jobs(jobs, core_sets, on_finish=on_finish)
+    write_table(sweep_dir, settings, bodyparts)
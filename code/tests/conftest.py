@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:30 2026
+
+@author: tang
+"""
+
+import os
+import sys
+
+# the scripts import core/ and config/ relative to code/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 11:58:40 2026
+
+@author: tang
+"""
+
+import os
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+from core.fit_hooks import FitHook
+from core.aug_cache import EpochCache, cache_key, evict
+
+
+class Augmented(tf.keras.utils.Sequence):
+    """Draws a new augmentation for every batch and counts the batches it builds."""
+    def __init__(self, n=12, batch_size=4):
+        self.image_keys = list(range(n))
+        self.batch_size = batch_size
+        self.built = 0
+
+    def __len__(self):
+        return len(self.image_keys) // self.batch_size
+
+    def __getitem__(self, index):
+        self.built += 1
+        keys = np.asarray(self.image_keys[index * self.batch_size:(index + 1) * self.batch_size], dtype=np.float32)
+        return keys[:, None] + np.random.normal(0, 1, (len(keys), 1)).astype(np.float32), [2 * keys[:, None]]
+
+    def on_epoch_end(self):
+        np.random.shuffle(self.image_keys)
+
+
+def run(cache, epochs):
+    out = []
+    for _ in range(epochs):
+        out.append([cache[i] for i in range(len(cache))])
+        cache.on_epoch_end()
+    return out
+
+
+def assert_same(a, b):
+    for x, y in zip(tf.nest.flatten(a), tf.nest.flatten(b)):
+        np.testing.assert_array_equal(x, y)
+
+
+def test_epochs_are_replayed_within_and_across_runs(tmp_path):
+    sequence = Augmented()
+    first = run(EpochCache(sequence, str(tmp_path / 'key'), epochs=2), 3)
+    assert sequence.built == 2 * len(sequence)
+    assert_same(first[2], first[0])
+    assert not np.array_equal(first[0][0][0], first[1][0][0])
+
+    again = Augmented()
+    cache = EpochCache(again, str(tmp_path / 'key'), epochs=2, start_epoch=1)
+    second = run(cache, 2)
+    assert again.built == 0 and cache.hits == 2 * len(again)
+    assert_same(second[0], first[1])
+    assert_same(second[1], first[0])
+
+
+def test_an_epoch_cut_short_is_not_committed(tmp_path):
+    cache = EpochCache(Augmented(), str(tmp_path / 'key'), epochs=2)
+    cache[0], cache[1]
+    sequence = Augmented()
+    cache = EpochCache(sequence, str(tmp_path / 'key'), epochs=2)
+    assert not cache.cached and sorted(os.listdir(tmp_path / 'key')) == ['last_used']
+    run(cache, 1)
+    assert sequence.built == len(sequence)
+    assert sorted(os.listdir(tmp_path / 'key')) == ['epoch_0', 'last_used']
+
+
+def test_least_recently_used_caches_are_evicted(tmp_path):
+    for age, name in enumerate(['new', 'old', 'older']):
+        os.makedirs(tmp_path / name)
+        (tmp_path / name / 'batch.npy').write_bytes(b'x' * 100)
+        (tmp_path / name / 'last_used').write_text('')
+        os.utime(tmp_path / name / 'last_used', (1e9 - age, 1e9 - age))
+    removed = evict(str(tmp_path), 250, keep=[str(tmp_path / 'older')])
+    # the kept cache is skipped even though it is the oldest
+    assert removed == [str(tmp_path / 'old')]
+    assert sorted(os.listdir(tmp_path)) == ['new', 'older']
+
+
+def test_key_ignores_learning_rate_and_epochs():
+    config = {'initial_learning_rate': '1e-3', 'EPOCHS': 300, 'augmentation': {'preset': 'full'}, 'shuffle_num': 1}
+    key = cache_key('data', config, ['a.png'], 10)
+    assert cache_key('data', dict(config, initial_learning_rate='1e-4', EPOCHS=20), ['a.png'], 10) == key
+    assert cache_key('data', dict(config, augmentation={'preset': 'fast'}), ['a.png'], 10) != key
+    assert cache_key('data', dict(config, shuffle_num=2), ['a.png'], 10) != key
+    assert cache_key('data', config, ['b.png'], 10) != key
+
+
+def test_fit_reads_the_cache(tmp_path):
+    caches = []
+
+    def on_fit(model, x, validation_data):
+        caches.append(EpochCache(x, str(tmp_path / 'key'), epochs=2))
+        return {'x': caches[-1]}
+
+    sequence = Augmented()
+    model = tf.keras.Sequential([tf.keras.Input((1,)), tf.keras.layers.Dense(1)])
+    model.compile(optimizer='sgd', loss='mse')
+    with FitHook(on_fit=on_fit):
+        model.fit(sequence, epochs=4, verbose=0)
+    assert sequence.built == 2 * len(sequence)
+    assert caches[0].hits == 2 * len(sequence)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:58:02 2026
+
+@author: tang
+"""
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+from core.checkpointing import TrainingCheckpoint, read_state
+from core.fit_hooks import FitHook
+
+
+class Interrupt(tf.keras.callbacks.Callback):
+    def __init__(self, after):
+        super().__init__()
+        self.after = after
+        self.epochs = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epochs.append(epoch)
+
+    def on_epoch_end(self, epoch, logs=None):
+        if epoch + 1 == self.after:
+            raise KeyboardInterrupt
+
+
+def compiled_train(EPOCHS, weights=None):
+    """Stands in for core.train: a fresh model and optimizer, and fit with train()'s own arguments."""
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([tf.keras.Input((1,)), tf.keras.layers.Dense(1)])
+    model.compile(optimizer=tf.keras.optimizers.Adam(0.01), loss='mse')
+    x = np.arange(32, dtype=np.float32)[:, None] / 32
+    model.fit(x, 3 * x + 1, batch_size=8, epochs=EPOCHS, shuffle=False, verbose=0)
+    if weights is not None:
+        weights.extend(model.get_weights())
+    return model
+
+
+def test_resume_continues_from_the_last_finished_epoch(tmp_path):
+    directory = str(tmp_path / 'resume')
+    uninterrupted = []
+    compiled_train(4, uninterrupted)
+
+    interrupt = Interrupt(after=2)
+    with pytest.raises(KeyboardInterrupt):
+        with FitHook([TrainingCheckpoint(directory, 4), interrupt]):
+            compiled_train(4)
+    assert read_state(directory)['epoch'] == 2
+
+    resumed, weights = Interrupt(after=None), []
+    state = read_state(directory)
+    with FitHook([TrainingCheckpoint(directory, 4, restore=True), resumed], initial_epoch=state['epoch']):
+        compiled_train(4, weights)
+    assert interrupt.epochs == [0, 1] and resumed.epochs == [2, 3]
+    assert read_state(directory)['epoch'] == 4
+    # weights and optimizer moments come back, so the result is that of a run never interrupted
+    for a, b in zip(weights, uninterrupted):
+        assert np.allclose(a, b, atol=1e-6)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:02:40 2026
+
+@author: tang
+"""
+
+import json
+import pytest
+
+pytest.importorskip('matplotlib')
+from crossval import split_overlap, report, run_model_dir
+
+
+def test_identical_test_sets_are_flagged():
+    overlap = split_overlap([[0, 1, 2], [2, 3, 4], [0, 1, 2]])
+    assert overlap['identical'] == [(0, 2)]
+    assert overlap['max_overlap'] == 1.0
+    assert overlap['held_out_frames'] == 5
+
+
+def test_report_warns_about_repeated_splits(tmp_path, capsys):
+    runs = [{'shuffle_num': 7 + i, 'status': 'ok', 'rmse': {'nose': 2.0 + i}, 'mean_rmse': 2.0 + i, 'test': test}
+            for i, test in enumerate([[0, 1], [2, 3], [0, 1]])]
+    report(str(tmp_path), runs, ['nose'], num_frames=10)
+    out = capsys.readouterr().out
+    assert 'shuffle 7 and 9 held out the same frames' in out
+    with open(tmp_path / 'report.json') as f:
+        saved = json.load(f)
+    assert saved['average']['mean'] == 3.0 and saved['splits']['held_out_frames'] == 4
+
+
+def test_model_dir_is_found_whatever_the_animal(tmp_path):
+    (tmp_path / 'rat_model' / '_3').mkdir(parents=True)
+    (tmp_path / 'rat_model' / '_3' / 'split.json').write_text('{}')
+    (tmp_path / 'rat_model' / '_4').mkdir()
+    assert run_model_dir(str(tmp_path), 3) == str(tmp_path / 'rat_model' / '_3')
+    assert run_model_dir(str(tmp_path), 4) is None
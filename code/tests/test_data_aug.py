@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:05:51 2026
+
+@author: tang
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('imgaug')
+from core.data_aug import BatchAugmenter
+
+
+def marked_batch():
+    # one bright pixel under the first keypoint of every image, the second keypoint is missing in image 0
+    images = np.zeros((2, 100, 200, 3), dtype=np.uint8)
+    keypoints = np.array([[[30, 40], [np.nan, np.nan]], [[150, 60], [10, 10]]], dtype=np.float32)
+    for image, kps in zip(images, keypoints):
+        image[int(kps[0, 1]), int(kps[0, 0])] = 255
+    return images, keypoints
+
+
+def marked_position(image):
+    ys, xs = np.nonzero(image[:, :, 0])
+    return np.array([xs.mean(), ys.mean()])
+
+
+@pytest.mark.parametrize('op, params', [('Fliplr', {}), ('Flipud', {}), ('Affine', {'rotate': [-20, 20], 'scale': [0.8, 1.2]}),
+                                        ('PerspectiveTransform', {'scale': [0.05, 0.1]})])
+def test_keypoints_follow_geometric_ops(op, params):
+    images, keypoints = marked_batch()
+    out, kps = BatchAugmenter({'ops': [{'op': op, 'probability': 1.0, 'params': params}]}, seed=0)(images, keypoints)
+    for image, moved in zip(out, kps):
+        assert np.abs(marked_position(image) - moved[0]).max() < 2.0
+    assert np.isnan(kps[0, 1]).all() and np.isfinite(kps[1, 1]).all()
+
+
+def test_photometric_ops_keep_keypoints():
+    images, keypoints = marked_batch()
+    out, kps = BatchAugmenter({'ops': [{'op': 'MotionBlur', 'probability': 1.0, 'params': {'k': 3}}]}, seed=0)(images, keypoints)
+    assert np.array_equal(np.isnan(kps), np.isnan(keypoints))
+    assert np.allclose(kps[np.isfinite(kps)], keypoints[np.isfinite(keypoints)])
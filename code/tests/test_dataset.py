@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:31:44 2026
+
+@author: tang
+"""
+
+import json
+import numpy as np
+import pytest
+from core.dataset import key_indices, oversample, shard_keys, save_split, load_split, recorded_split
+
+
+def write_annotations(tmp_path, img_paths):
+    JSON = str(tmp_path / 'merged_annotations.json')
+    with open(JSON, 'w') as f:
+        json.dump([{'img_path': path, 'joints': [[1, 2, 1]]} for path in img_paths], f)
+    return JSON
+
+
+def test_keys_match_indices_paths_and_file_names(tmp_path):
+    JSON = write_annotations(tmp_path, ['output_frames\\a\\img001.png', 'output_frames/a/img002.png', 'b/img002.png', 'c/img003.png'])
+    IMG_DIR = str(tmp_path)
+    keys = [0, np.int64(3), 7, 'output_frames\\a\\img001.png', 'output_frames/a/img002.png',
+            str(tmp_path / 'b' / 'img002.png'), 'img003.png', 'img002.png', b'c/img003.png', 'missing.png']
+    # img002.png is ambiguous as a bare name
+    assert key_indices(keys, JSON, IMG_DIR) == [0, 3, None, 0, 1, 2, 3, None, 3, None]
+
+
+def test_oversample_repeats_new_frames_and_keeps_the_type():
+    keys = ['a', 'b', 'c']
+    assert oversample(keys, [0, 1, 2], {1}, 3) == ['a', 'b', 'c', 'b', 'b']
+    array = np.array([10, 11, 12])
+    out = oversample(array, [0, 1, None], {0, 1}, 2)
+    assert isinstance(out, np.ndarray) and out.tolist() == [10, 11, 12, 10, 11]
+    assert oversample(keys, [0, 1, 2], set(), 4) == keys
+
+
+def test_shards_have_equal_length_and_keep_the_type():
+    keys = [f'img{i}.png' for i in range(11)]
+    shards = [shard_keys(keys, i, 3) for i in range(3)]
+    assert [len(s) for s in shards] == [3, 3, 3]
+    assert not set(shards[0]) & set(shards[1])
+    assert isinstance(shard_keys(np.arange(11), 1, 2), np.ndarray)
+
+
+def test_split_round_trip(tmp_path):
+    save_split(str(tmp_path), [np.int64(4), b'a.png'], [4, None], ['b.png'], [1])
+    split = load_split(str(tmp_path))
+    assert split == {'train_keys': [4, 'a.png'], 'train': [4, None], 'test_keys': ['b.png'], 'test': [1]}
+    assert load_split(str(tmp_path / 'none')) is None
+
+
+def test_recorded_split_follows_the_annotations(tmp_path):
+    JSON = write_annotations(tmp_path, ['a.png', 'b.png', 'c.png', 'd.png'])
+    model_dir = str(tmp_path / 'model')
+    with pytest.raises(ValueError):
+        recorded_split(model_dir, JSON, 'output_frames')
+    save_split(model_dir, ['d.png', 'a.png'], [3, 0], None, None)
+    with pytest.raises(ValueError):
+        recorded_split(model_dir, JSON, 'output_frames')
+    save_split(model_dir, ['d.png', 'a.png'], [3, 0], ['c.png'], [2])
+    train, test = recorded_split(model_dir, JSON, 'output_frames')
+    assert train.tolist() == [3, 0] and test.tolist() == [2]
+    # annotations reordered since training: the recorded frames are found again
+    write_annotations(tmp_path, ['c.png', 'a.png', 'd.png', 'b.png'])
+    train, test = recorded_split(model_dir, JSON, 'output_frames')
+    assert train.tolist() == [2, 1] and test.tolist() == [0]
+    # a held-out frame no longer annotated
+    write_annotations(tmp_path, ['a.png', 'b.png', 'd.png'])
+    with pytest.raises(ValueError):
+        recorded_split(model_dir, JSON, 'output_frames')
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:24:53 2026
+
+@author: tang
+"""
+
+import os
+import sys
+import json
+import socket
+import subprocess
+import pytest
+
+pytest.importorskip('tensorflow')
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# one worker: train() stand-in that creates its own model and calls fit, run the way train.py runs core.train
+WORKER = r'''
+import os, sys, json
+sys.path.insert(0, sys.argv[1])
+import numpy as np
+import tensorflow as tf
+from core.fit_hooks import FitHook
+from core.dataset import shard_keys
+from core.loader import distribute_sequence
+
+tf_config = json.loads(os.environ['TF_CONFIG'])
+index, workers = tf_config['task']['index'], len(tf_config['cluster']['worker'])
+strategy = tf.distribute.MultiWorkerMirroredStrategy()
+trained = []
+
+def record(x):
+    trained.append(np.rint(x.numpy()[:, 0] * 64).astype(int).tolist())
+    return np.int64(0)
+
+class Recording(tf.keras.Model):
+    # the examples this worker's replica computes its gradients on
+    def train_step(self, data):
+        tf.py_function(record, [data[0]], tf.int64)
+        return super().train_step(data)
+
+class Batches(tf.keras.utils.Sequence):
+    def __init__(self):
+        self.image_keys = list(range(64))
+    def __len__(self):
+        return len(self.image_keys) // 4
+    def __getitem__(self, b):
+        keys = self.image_keys[b * 4:(b + 1) * 4]
+        x = np.asarray(keys, np.float32)[:, None] / 64
+        return x, 2 * x
+    def on_epoch_end(self):
+        np.random.shuffle(self.image_keys)
+
+def compiled_train():
+    inputs = tf.keras.Input((1,))
+    model = Recording(inputs, tf.keras.layers.Dense(1)(inputs))
+    model.compile(optimizer='sgd', loss='mse')
+    model.fit(Batches(), epochs=2, verbose=0)
+    return model
+
+def on_fit(model, x, validation_data):
+    # as train.py does it
+    x.image_keys = shard_keys(x.image_keys, index, workers)
+    x, steps_per_epoch = distribute_sequence(strategy, x)
+    return {'x': x, 'steps_per_epoch': steps_per_epoch}
+
+with strategy.scope(), FitHook(on_fit=on_fit):
+    model = compiled_train()
+print(json.dumps({'batches': trained, 'weights': [w.tolist() for w in model.get_weights()]}))
+'''
+
+
+def free_ports(n):
+    sockets = [socket.socket() for _ in range(n)]
+    for s in sockets:
+        s.bind(('localhost', 0))
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+def test_every_frame_is_trained_once_per_epoch_by_one_worker(tmp_path):
+    script = tmp_path / 'worker.py'
+    script.write_text(WORKER)
+    cluster = {'worker': [f'localhost:{port}' for port in free_ports(2)]}
+    procs = [subprocess.Popen([sys.executable, str(script), os.path.dirname(HERE)], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              env=dict(os.environ, TF_CONFIG=json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': i}})))
+             for i in range(2)]
+    outputs = [json.loads(proc.communicate(timeout=300)[0].decode().strip().splitlines()[-1]) for proc in procs]
+    assert all(proc.returncode == 0 for proc in procs)
+    for output in outputs:
+        # full batches of the Sequence, 8 steps per epoch: the global batch is 2 x 4
+        assert len(output['batches']) == 16 and all(len(batch) == 4 for batch in output['batches'])
+        epochs = [sorted(sum(output['batches'][:8], [])), sorted(sum(output['batches'][8:], []))]
+        assert epochs[0] == epochs[1] and len(set(epochs[0])) == 32
+    assert sorted(sum(outputs[0]['batches'][:8] + outputs[1]['batches'][:8], [])) == list(range(64))
+    # mirrored variables: both workers hold the same weights after the all-reduced updates
+    assert outputs[0]['weights'] == outputs[1]['weights']
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:26:51 2026
+
+@author: tang
+"""
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+from core.export import export_saved_model, export_tflite, output_order, bodypart_rmse, rmse_increase, SavedModelRunner, TFLiteRunner
+
+
+def numbered_model(outputs=12):
+    """Outputs of the same shape that hold their own position, so an order mix-up shows."""
+    inputs = tf.keras.Input((8, 8, 3))
+    return tf.keras.Model(inputs, [tf.keras.layers.Lambda(lambda x, i=i: x[..., :1] * 0 + i)(inputs) for i in range(outputs)])
+
+
+def test_output_order_is_numeric():
+    assert output_order(['output_10', 'output_2', 'output_0', 'output_1']) == ['output_0', 'output_1', 'output_2', 'output_10']
+
+
+def test_runners_return_outputs_in_model_order(tmp_path):
+    saved_model = export_saved_model(numbered_model(), str(tmp_path / 'saved_model'), 8, 8)
+    tflite = export_tflite(saved_model, str(tmp_path / 'model.tflite'))
+    batch = np.ones((2, 8, 8, 3), dtype=np.float32)
+    for runner in (SavedModelRunner(saved_model), TFLiteRunner(tflite)):
+        assert [float(output[0, 0, 0, 0]) for output in runner(batch)] == list(range(12))
+
+
+def test_gate_fails_the_bodyparts_over_the_limit():
+    joints = np.array([[[10, 10], [20, 20], [np.nan, np.nan]]] * 2, dtype=np.float32)
+    float_poses = np.concatenate([joints + 0.5, np.ones((2, 3, 1))], axis=2)
+    int8_poses = float_poses.copy()
+    int8_poses[:, 1, 0] += 3
+    parts = ['nose', 'tail', 'paw']
+    rows, failed = rmse_increase(bodypart_rmse(float_poses, joints, parts), bodypart_rmse(int8_poses, joints, parts), 1.0)
+    assert failed == ['tail']
+    # the paw is never annotated and is left out
+    assert [row['bodypart'] for row in rows] == ['nose', 'tail']
+    assert rows[0]['increase'] == pytest.approx(0) and rows[1]['increase'] == pytest.approx(np.sqrt(3.5 ** 2 + 0.5 ** 2) - np.sqrt(0.5))
+    assert rmse_increase(bodypart_rmse(float_poses, joints, parts), bodypart_rmse(int8_poses, joints, parts), 3.0)[1] == []
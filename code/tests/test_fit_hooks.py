@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:40:05 2026
+
+@author: tang
+"""
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+from core.fit_hooks import FitHook
+
+
+class Batches(tf.keras.utils.Sequence):
+    def __init__(self, image_keys, batch_size=4):
+        self.image_keys = list(image_keys)
+        self.batch_size = batch_size
+
+    def __len__(self):
+        return len(self.image_keys) // self.batch_size
+
+    def __getitem__(self, index):
+        keys = np.asarray(self.image_keys[index * self.batch_size:(index + 1) * self.batch_size], dtype=np.float32)
+        return keys[:, None], 2 * keys[:, None]
+
+
+class Epochs(tf.keras.callbacks.Callback):
+    def __init__(self):
+        super().__init__()
+        self.epochs = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epochs.append(epoch)
+
+
+def compiled_train(epochs=3):
+    """Stands in for core.train: builds its own model and calls fit with a fixed set of arguments."""
+    model = tf.keras.Sequential([tf.keras.Input((1,)), tf.keras.layers.Dense(1)])
+    model.compile(optimizer='sgd', loss='mse')
+    inner = Epochs()
+    model.fit(Batches(range(16)), validation_data=Batches(range(16, 24)), epochs=epochs, callbacks=[inner], verbose=0)
+    return inner.epochs
+
+
+def test_callbacks_initial_epoch_and_fit_kwargs_are_applied():
+    outer = Epochs()
+    seen = {}
+
+    def on_fit(model, x, validation_data):
+        seen['train'], seen['test'] = list(x.image_keys), list(validation_data.image_keys)
+        return {'max_queue_size': 3}
+
+    with FitHook(callbacks=[outer], initial_epoch=1, fit_kwargs={'workers': 2, 'no_such_argument': 1}, on_fit=on_fit) as hook:
+        inner_epochs = compiled_train()
+    assert hook.calls == 1
+    # train()'s own callbacks still run, next to the added ones
+    assert inner_epochs == outer.epochs == [1, 2]
+    assert seen == {'train': list(range(16)), 'test': list(range(16, 24))}
+
+
+def test_fit_is_restored(capsys):
+    original = tf.keras.Model.fit
+    with FitHook():
+        assert tf.keras.Model.fit is not original
+    assert tf.keras.Model.fit is original
+    assert 'never called model.fit' in capsys.readouterr().out
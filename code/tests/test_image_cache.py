@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 13:40:19 2026
+
+@author: tang
+"""
+
+import os
+import numpy as np
+import cv2
+from matplotlib import pyplot as plt
+from core.image_cache import ImageCache
+
+
+def make_frames(tmp_path):
+    rng = np.random.RandomState(0)
+    paths = []
+    for name, image in [('rgb.png', rng.randint(0, 256, (24, 32, 3))), ('gray.png', rng.randint(0, 256, (24, 32))),
+                        ('rgb.jpg', rng.randint(0, 256, (24, 32, 3)))]:
+        paths.append(str(tmp_path / name))
+        cv2.imwrite(paths[-1], image.astype(np.uint8))
+    return paths
+
+
+def reads(paths):
+    return [[cv2.imread(p) for p in paths], [cv2.imread(p, cv2.IMREAD_UNCHANGED) for p in paths], [plt.imread(p) for p in paths]]
+
+
+def assert_same(a, b):
+    for x, y in zip(a, b):
+        for u, v in zip(x, y):
+            assert u.dtype == v.dtype
+            np.testing.assert_array_equal(u, v)
+
+
+def test_decoded_frames_are_reused_unchanged(tmp_path):
+    paths = make_frames(tmp_path)
+    expected = reads(paths)
+    originals = cv2.imread, plt.imread
+    with ImageCache(str(tmp_path / 'cache'), paths) as cache:
+        assert_same(reads(paths), expected)
+    assert (cache.hits.value, cache.misses.value) == (0, 9)
+    assert (cv2.imread, plt.imread) == originals
+    # plt.imread of a png is float32, stored as its uint8 frame
+    assert sum(name.endswith('.u8.npy') for name in os.listdir(tmp_path / 'cache')) == 2
+
+    with ImageCache(str(tmp_path / 'cache'), paths) as cache:
+        assert_same(reads(paths), expected)
+    assert (cache.hits.value, cache.misses.value) == (9, 0)
+    assert 'loaded' in cache.summary()
+
+
+def test_edited_and_foreign_images_are_decoded(tmp_path):
+    paths = make_frames(tmp_path)
+    with ImageCache(str(tmp_path / 'cache'), paths[:1]) as cache:
+        cv2.imread(paths[0])
+        cv2.imwrite(paths[0], np.zeros((24, 32, 3), np.uint8))
+        os.utime(paths[0], ns=(1, 1))
+        assert cv2.imread(paths[0]).max() == 0
+        cv2.imread(paths[1])
+    assert (cache.hits.value, cache.misses.value) == (0, 2)
+    assert 'not used' in ImageCache(str(tmp_path / 'cache'), paths).summary()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:12:40 2026
+
+@author: tang
+"""
+
+import os
+import numpy as np
+import pytest
+import cv2
+from core.inference import preprocess, find_peak, decode_outputs, IdentityTracker, analyze_video, read_manifest, open_at
+from core.sharding import plan_shards, stitch
+from core.scheduler import available_cores
+
+
+def blob(shape, x, y, sigma=1.5, height=1.0):
+    rows, cols = np.mgrid[:shape[0], :shape[1]]
+    return height * np.exp(-((cols - x) ** 2 + (rows - y) ** 2) / (2 * sigma ** 2))
+
+
+def make_video(path, frames, size=(64, 96)):
+    """A bright square moving across a dark MJPG clip, one position per frame."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (size[1], size[0]))
+    for i in range(frames):
+        frame = np.full(size + (3,), 20, dtype=np.uint8)
+        x, y = 8 + (i * 3) % (size[1] - 24), 8 + (i * 2) % (size[0] - 24)
+        frame[y:y + 8, x:x + 8] = 230
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+class FakeModel:
+    """Stands in for the network: a 1:4 heatmap of the brightness of the input. fail_at makes that call raise."""
+    def __init__(self, fail_at=None):
+        self.calls = 0
+        self.fail_at = fail_at
+
+    def __call__(self, batch):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            raise RuntimeError('interrupted')
+        brightness = (batch[..., 0] + 103.939) / 255
+        heatmaps = np.stack([cv2.resize(image, (image.shape[1] // 4, image.shape[0] // 4), interpolation=cv2.INTER_AREA)
+                             for image in brightness])
+        return [heatmaps[..., None]]
+
+
+def analyze(video, model, output, **kwargs):
+    return analyze_video(video, model, 32, 48, 1, 1, ['square'], 'test', batch_size=4, report=False, output=output, **kwargs)
+
+
+def test_preprocess_matches_resnet_preprocess_input():
+    tf = pytest.importorskip('tensorflow')
+    frame = np.random.default_rng(0).integers(0, 256, (48, 80, 3), dtype=np.uint8)
+    rgb = cv2.cvtColor(cv2.resize(frame, (40, 24)), cv2.COLOR_BGR2RGB).astype(np.float32)
+    expected = tf.keras.applications.resnet.preprocess_input(rgb)
+    np.testing.assert_allclose(preprocess(frame, 24, 40), expected, atol=1e-4)
+    out = np.full((24, 40, 3), 7, dtype=np.float32)
+    assert preprocess(frame, 24, 40, out=out) is out
+    np.testing.assert_allclose(out, expected, atol=1e-4)
+
+
+def test_largest_component_wins_over_a_higher_stray_cell():
+    heatmap = blob((32, 32), 20.0, 9.0, height=0.8)
+    heatmap[3, 4] = 0.95
+    x, y, likelihood = find_peak(heatmap.astype(np.float32))
+    assert abs(x - 20) < 0.1 and abs(y - 9) < 0.1
+    assert likelihood == pytest.approx(0.8, abs=1e-6)
+    assert np.unravel_index(heatmap.argmax(), heatmap.shape) == (3, 4)
+
+
+def test_decode_maps_cells_to_frame_pixels():
+    heatmaps = np.zeros((2, 16, 16, 2), dtype=np.float32)
+    heatmaps[0, :, :, 0] = blob((16, 16), 4.0, 8.0)
+    heatmaps[0, :, :, 1] = blob((16, 16), 12.0, 2.0)
+    heatmaps[1, :, :, 0] = blob((16, 16), 3.0, 5.0)
+    heatmaps[1, :, :, 1] = blob((16, 16), 10.0, 12.0)
+    # a 1:8 heatmap of a 128 x 256 frame, and a frame twice the size
+    poses = decode_outputs([np.zeros((2, 3)), heatmaps], 2, [(128, 256), (256, 512)])
+    np.testing.assert_allclose(poses[0, :, :2], [[(4.5 * 16) - 0.5, (8.5 * 8) - 0.5], [(12.5 * 16) - 0.5, (2.5 * 8) - 0.5]], atol=0.05)
+    np.testing.assert_allclose(poses[1, :, :2], [[(3.5 * 32) - 0.5, (5.5 * 16) - 0.5], [(10.5 * 32) - 0.5, (12.5 * 16) - 0.5]], atol=0.05)
+    np.testing.assert_allclose(poses[..., 2], 1.0)
+    with pytest.raises(ValueError):
+        decode_outputs([heatmaps], 3, (128, 256))
+
+
+def test_tracker_keeps_individuals_in_their_columns():
+    # two individuals of one keypoint moving apart, reported in swapped order from the second frame
+    a = [[10.0, 10.0, 1.0], [50.0, 50.0, 1.0]]
+    b = [[48.0, 52.0, 1.0], [12.0, 11.0, 1.0]]
+    c = [[45.0, 55.0, 1.0], [14.0, 12.0, 1.0]]
+    tracked = IdentityTracker(2)(np.array([a, b, c], dtype=np.float32))
+    np.testing.assert_allclose(tracked[:, 0, :2], [[10, 10], [12, 11], [14, 12]])
+    np.testing.assert_allclose(tracked[:, 1, :2], [[50, 50], [48, 52], [45, 55]])
+    # seeded with the last frame of an earlier batch
+    tracked = IdentityTracker(2, last=tracked[-1])(np.array([c], dtype=np.float32))
+    np.testing.assert_allclose(tracked[0, :, :2], [[14, 12], [45, 55]])
+    single = np.array([a], dtype=np.float32).reshape(1, 2, 3)
+    assert IdentityTracker(1)(single) is single
+
+
+def test_analyze_video_fresh_and_resumed(tmp_path):
+    pytest.importorskip('pandas')
+    video = make_video(str(tmp_path / 'clip.avi'), 37)
+    result = analyze(video, FakeModel(), str(tmp_path / 'fresh'))
+    assert result['frames'] == 37 and result['resumed_from'] == 0
+    fresh = np.load(str(tmp_path / 'fresh_trajectory.npy'))
+    # the square's centre, 8 px across from (x, y), to within half a heatmap cell (8 video pixels)
+    expected = [[8 + (i * 3) % 72 + 3.5, 8 + (i * 2) % 40 + 3.5] for i in range(37)]
+    np.testing.assert_allclose(fresh[:, 0, :2], expected, atol=4)
+
+    with pytest.raises(RuntimeError):
+        analyze(video, FakeModel(fail_at=5), str(tmp_path / 'resumed'), resume_key='key', checkpoint_every=4)
+    assert 0 < read_manifest(str(tmp_path / 'resumed.analysis.json'))['frames_done'] < 37
+    result = analyze(video, FakeModel(), str(tmp_path / 'resumed'), resume_key='key', checkpoint_every=4)
+    assert result['resumed_from'] > 0 and result['frames'] == 37
+    np.testing.assert_array_equal(np.load(str(tmp_path / 'resumed_trajectory.npy')), fresh)
+    assert open(str(tmp_path / 'resumed.csv')).read() == open(str(tmp_path / 'fresh.csv')).read()
+    assert analyze(video, FakeModel(), str(tmp_path / 'resumed'), resume_key='key').get('skipped')
+
+
+
+def test_open_at_returns_the_frame_a_sequential_read_returns(tmp_path):
+    video = make_video(str(tmp_path / 'clip.avi'), 40)
+    cap = cv2.VideoCapture(video)
+    frames = [cap.read()[1] for _ in range(40)]
+    cap.release()
+    for index in (0, 1, 5, 17, 39):
+        cap = open_at(video, index)
+        np.testing.assert_array_equal(cap.read()[1], frames[index])
+        cap.release()
+
+
+def test_sharded_ranges_stitch_to_the_single_process_result(tmp_path):
+    pytest.importorskip('pandas')
+    video = make_video(str(tmp_path / 'clip.avi'), 50)
+    analyze(video, FakeModel(), str(tmp_path / 'single'))
+    plan = plan_shards(50, 3, 5)
+    for i, (first, owned, end) in enumerate(plan):
+        analyze(video, FakeModel(), str(tmp_path / f'part{i}'), frame_range=(first, end))
+    parts = [np.load(str(tmp_path / f'part{i}_trajectory.npy')) for i in range(len(plan))]
+    frames, boundaries = stitch(plan, parts, 1, str(tmp_path / 'stitched.npy'))
+    assert frames == 50 and all(error == 0 for _, error in boundaries)
+    np.testing.assert_array_equal(np.load(str(tmp_path / 'stitched.npy')), np.load(str(tmp_path / 'single_trajectory.npy')))
+
+
+def heatmap_model():
+    """FakeModel as a Keras network, so worker processes can load it from a file."""
+    tf = pytest.importorskip('tensorflow')
+    inputs = tf.keras.Input((32, 48, 3))
+    x = tf.keras.layers.Conv2D(1, 1)(inputs)
+    model = tf.keras.Model(inputs, tf.keras.layers.AveragePooling2D(4)(x))
+    model.layers[1].set_weights([np.array([1 / 255, 0, 0], np.float32).reshape(1, 1, 3, 1), np.array([103.939 / 255], np.float32)])
+    return model
+
+
+def test_analyze_sharded_equals_single_process(tmp_path, capsys):
+    pytest.importorskip('pandas')
+    from core.tf_runtime import RUNTIME_DEFAULTS
+    from core.inference import analyze_sharded, load_model, make_infer
+    model_path = str(tmp_path / 'model.h5')
+    heatmap_model().save(model_path)
+    video = make_video(str(tmp_path / 'clip.avi'), 50)
+    settings = dict(IMG_SIZE_H=32, IMG_SIZE_W=48, NUM_KEYPOINT=1, num_classes=1, bodyparts=['square'], scorer='test', batch_size=4)
+    analyze_sharded([video], 2, 5, dict(RUNTIME_DEFAULTS), model_path, None, settings)
+    # with a single core the two ranges become one, instead of failing
+    assert ('running 1 shards at a time instead of 2' in capsys.readouterr().out) == (len(available_cores()) < 2)
+    analyze_video(video, make_infer(load_model(model_path, None)), report=False, output=str(tmp_path / 'single'), **settings)
+    np.testing.assert_array_equal(np.load(str(tmp_path / 'clip_test_trajectory.npy')), np.load(str(tmp_path / 'single_trajectory.npy')))
+    assert open(str(tmp_path / 'clip_test.csv')).read() == open(str(tmp_path / 'single.csv')).read()
+    assert not os.path.exists(str(tmp_path / 'clip_test_shards'))
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:40:16 2026
+
+@author: tang
+"""
+
+import os
+import glob
+import yaml
+import numpy as np
+import pandas as pd
+import pytest
+import cv2
+
+pytest.importorskip('tensorflow')
+# the compiled legacy analysis only loads on the platform it was built for
+legacy = pytest.importorskip('core.predict')
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configured():
+    from config.config_training import configuration
+    from config.config_predicting import configuration_predict
+    with open(os.path.join(HERE, 'config.yaml'), 'r', encoding='utf-8') as f:
+        result = yaml.load(f.read(), Loader=yaml.FullLoader)
+    with open(os.path.join(HERE, 'config_predict.yaml'), 'r', encoding='utf-8') as f:
+        result_predict = yaml.load(f.read(), Loader=yaml.FullLoader)
+    return configuration(result), configuration_predict(result_predict)
+
+
+def clip(video, output, frames):
+    cap = cv2.VideoCapture(video)
+    writer = None
+    for _ in range(frames):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if writer is None:
+            writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*'MJPG'), 30, (frame.shape[1], frame.shape[0]))
+        writer.write(frame)
+    cap.release()
+    writer.release()
+    return output
+
+
+def test_engine_matches_legacy_predict(tmp_path):
+    from core.inference import load_model, make_infer, analyze_video
+    config, (videos, save_video, model_path, colors, pcutoff, scorer) = configured()
+    IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts, early_stop,centre,num_classes = config
+    if not videos or not glob.glob(glob.escape(model_path) + '*'):
+        pytest.skip('needs a trained model_path and a video in config_predict.yaml')
+    video = clip(videos[0], str(tmp_path / 'clip.avi'), 40)
+    predict_args = (IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts,[video],False,model_path,colors,pcutoff,num_classes,scorer,centre)
+    legacy.predict(*predict_args)
+    legacy_csv = [f for f in glob.glob(str(tmp_path / 'clip*.csv'))]
+    assert len(legacy_csv) == 1
+
+    infer = make_infer(load_model(model_path, predict_args))
+    analyze_video(video, infer, IMG_SIZE_H, IMG_SIZE_W, NUM_KEYPOINT, num_classes, bodyparts, scorer,
+                  report=False, output=str(tmp_path / 'engine'))
+    header = [0, 1, 2] if num_classes == 1 else [0, 1, 2, 3]
+    expected = pd.read_csv(legacy_csv[0], header=header, index_col=0).to_numpy(dtype=np.float32).reshape(-1, NUM_KEYPOINT * num_classes, 3)
+    engine = pd.read_csv(str(tmp_path / 'engine.csv'), header=header, index_col=0).to_numpy(dtype=np.float32).reshape(expected.shape)
+
+    # the same frames, the same peaks: positions within a pixel where both found the bodypart
+    found = (expected[..., 2] > pcutoff) & (engine[..., 2] > pcutoff)
+    assert found.mean() > 0.5
+    np.testing.assert_allclose(engine[..., :2][found], expected[..., :2][found], atol=1.0)
+    np.testing.assert_allclose(engine[..., 2], expected[..., 2], atol=0.05)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 10:02:31 2026
+
+@author: tang
+"""
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+from core.fit_hooks import FitHook
+from core.loader import ProcessLoader, ValidationCache, fork_available
+
+needs_fork = pytest.mark.skipif(not fork_available(), reason='the process loader needs fork')
+
+
+class Augmented(tf.keras.utils.Sequence):
+    """Like train()'s Sequence: reshuffles its keys every epoch and draws its augmentation from np.random."""
+    def __init__(self, n=20, batch_size=4):
+        self.image_keys = list(range(n))
+        self.batch_size = batch_size
+
+    def __len__(self):
+        return len(self.image_keys) // self.batch_size
+
+    def __getitem__(self, index):
+        keys = np.asarray(self.image_keys[index * self.batch_size:(index + 1) * self.batch_size], dtype=np.float32)
+        x = keys[:, None] + np.random.normal(0, 0.01, (len(keys), 1)).astype(np.float32)
+        return x, [2 * keys[:, None], np.random.randint(0, 9, (len(keys), 3))]
+
+    def on_epoch_end(self):
+        self.image_keys = list(np.random.permutation(self.image_keys))
+
+
+def served(workers, epochs=3, seed=7):
+    loader = ProcessLoader(Augmented(), workers, seed)
+    try:
+        out = []
+        for _ in range(epochs):
+            out.append([loader[i] for i in range(len(loader))])
+            loader.on_epoch_end()
+        return out
+    finally:
+        loader.close()
+
+
+@needs_fork
+def test_batches_do_not_depend_on_the_number_of_workers():
+    one, three = served(1), served(3)
+    for epoch_one, epoch_three in zip(one, three):
+        keys = np.concatenate([y[0][:, 0] for _, y in epoch_one]) / 2
+        # every key once per epoch
+        assert sorted(keys) == list(range(20))
+        for a, b in zip(tf.nest.flatten(epoch_one), tf.nest.flatten(epoch_three)):
+            np.testing.assert_array_equal(a, b)
+    # reshuffled and re-augmented from epoch to epoch
+    assert not np.array_equal(one[0][0][0], one[1][0][0])
+    assert not np.array_equal(served(1, epochs=1, seed=8)[0][0][0], one[0][0][0])
+
+
+@needs_fork
+def test_out_of_order_requests_are_built_locally():
+    loader = ProcessLoader(Augmented(), 2, 7)
+    try:
+        late = loader[3]
+        in_order = [loader[i] for i in range(len(loader))]
+    finally:
+        loader.close()
+    for a, b in zip(tf.nest.flatten(late), tf.nest.flatten(in_order[3])):
+        np.testing.assert_array_equal(a, b)
+
+
+@needs_fork
+def test_fit_trains_on_the_loader():
+    loaders = []
+
+    def on_fit(model, x, validation_data):
+        loaders.append(ProcessLoader(x, 2, 7))
+        return {'x': loaders[0], 'shuffle': False}
+
+    inputs = tf.keras.Input((1,))
+    model = tf.keras.Model(inputs, [tf.keras.layers.Dense(1)(inputs), tf.keras.layers.Dense(3)(inputs)])
+    model.compile(optimizer='sgd', loss='mse')
+    try:
+        with FitHook(on_fit=on_fit):
+            history = model.fit(Augmented(), epochs=3, verbose=0)
+        assert loaders[0].epoch == 3
+    finally:
+        loaders[0].close()
+    assert np.isfinite(history.history['loss']).all()
+
+
+class Validation(Augmented):
+    """Not augmented, counts the batches it builds."""
+    def __init__(self):
+        super().__init__()
+        self.built = 0
+
+    def __getitem__(self, index):
+        self.built += 1
+        keys = np.asarray(self.image_keys[index * self.batch_size:(index + 1) * self.batch_size], dtype=np.float32)
+        return keys[:, None], [2 * keys[:, None], np.zeros((len(keys), 3))]
+
+
+def test_validation_batches_are_built_once():
+    validations = []
+
+    def on_fit(model, x, validation_data):
+        validations.append(ValidationCache(validation_data, 2 ** 20))
+        return {'validation_data': validations[0]}
+
+    inputs = tf.keras.Input((1,))
+    model = tf.keras.Model(inputs, [tf.keras.layers.Dense(1)(inputs), tf.keras.layers.Dense(3)(inputs)])
+    model.compile(optimizer='sgd', loss='mse')
+    validation = Validation()
+    with FitHook(on_fit=on_fit):
+        history = model.fit(Augmented(), validation_data=validation, epochs=3, verbose=0)
+    # the determinism check builds batch 0 twice, then one pass
+    assert validation.built == 2 + len(validation)
+    # and fit's peek at the first batch
+    assert validations[0].hits == 2 * len(validation) + 1
+    np.testing.assert_allclose(history.history['val_loss'][-1], model.evaluate(Validation(), verbose=0)[0], rtol=1e-6)
+
+
+def test_random_or_oversized_validation_batches_are_not_kept():
+    assert not ValidationCache(Augmented(), 2 ** 20).deterministic
+    cache = ValidationCache(Validation(), 2 * 4 * 4)
+    [cache[i] for i in range(len(cache))]
+    assert list(cache.batches) == []
+    cache = ValidationCache(Validation(), 2 ** 20)
+    [cache[i] for i in range(len(cache))]
+    assert sorted(cache.batches) == list(range(len(cache)))
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:10:26 2026
+
+@author: tang
+"""
+
+import pytest
+from core.scheduler import partition_cores, fit_to_cores
+
+
+def test_core_sets_are_disjoint_and_capped():
+    sets = partition_cores(3, cores=list(range(8)))
+    assert sets == [[0, 1], [2, 3], [4, 5]]
+    assert partition_cores(2, cores_per_run=1, cores=list(range(8))) == [[0], [1]]
+
+
+def test_more_runs_than_cores_is_rejected():
+    with pytest.raises(ValueError):
+        partition_cores(5, cores=[0, 1, 2, 3])
+
+
+def test_parallel_runs_are_capped_at_the_cores(capsys):
+    assert fit_to_cores(3, 'workers', cores=[0, 1, 2, 3]) == 3
+    assert capsys.readouterr().out == ''
+    assert fit_to_cores(6, 'workers', cores=[0, 1, 2, 3]) == 4
+    assert 'Only 4 usable CPU cores, running 4 workers at a time instead of 6.' in capsys.readouterr().out
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:32:17 2026
+
+@author: tang
+"""
+
+import json
+import time
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+from core.telemetry import StepTelemetry, peak_memory_mb
+
+
+class Slow(tf.keras.utils.Sequence):
+    def __init__(self, fetch_s, batches=4):
+        self.fetch_s = fetch_s
+        self.batches = batches
+
+    def __len__(self):
+        return self.batches
+
+    def __getitem__(self, index):
+        time.sleep(self.fetch_s)
+        return np.ones((4, 1), np.float32), np.ones((4, 1), np.float32)
+
+
+class SlowStep(tf.keras.layers.Layer):
+    """Compute that takes 0.1 s, after the step has its batch."""
+    def call(self, x):
+        time.sleep(0.1)
+        return x
+
+
+def fit(tmp_path, x, layers=(), watch=True, **kwargs):
+    model = tf.keras.Sequential([tf.keras.Input((1,))] + list(layers) + [tf.keras.layers.Dense(1)])
+    model.compile(optimizer='sgd', loss='mse', run_eagerly=True)
+    telemetry = StepTelemetry(str(tmp_path), BATCH_SIZE=4)
+    if watch:
+        telemetry.watch(x)
+    model.fit(x, epochs=2, verbose=0, shuffle=False, callbacks=[telemetry], **kwargs)
+    with open(tmp_path / 'steps.jsonl') as f:
+        records = [json.loads(line) for line in f]
+    with open(tmp_path / 'summary.json') as f:
+        summary = json.load(f)
+    return records, summary
+
+
+def test_data_wait_is_not_measured_without_a_watched_sequence(tmp_path):
+    records, summary = fit(tmp_path, Slow(0), watch=False)
+    assert len(records) == 8
+    assert all(r['data_wait_s'] is None and r['stalled'] is None for r in records)
+    assert all(r['peak_rss_mb'] > 0 for r in records)
+    assert summary['data_wait_fraction'] is None and summary['stalled_steps'] is None
+    assert summary['peak_rss_mb'] <= peak_memory_mb()
+    assert 'max_memory_mb' not in summary and 'peak_memory_mb' not in summary
+
+
+def test_slow_batches_are_flagged_as_stalls(tmp_path, capsys):
+    original = Slow.__getitem__
+    records, summary = fit(tmp_path, Slow(0.2), validation_data=Slow(0.2))
+    assert Slow.__getitem__ is original
+    assert all(r['data_wait_s'] is not None for r in records)
+    assert summary['data_wait_fraction'] > 0.5
+    assert summary['stalled_steps'] >= 6
+    assert 'input pipeline is the bottleneck' in capsys.readouterr().out
+
+
+def test_prefetched_batches_do_not_count_as_wait(tmp_path):
+    records, summary = fit(tmp_path, Slow(0.02), layers=[SlowStep()])
+    assert summary['data_wait_fraction'] < 0.1
+    # only the first batch of an epoch is not fetched ahead of its step
+    assert [r['data_wait_s'] > 0.01 for r in records] == [True, False, False, False] * 2
+    assert summary['stalled_steps'] == 0
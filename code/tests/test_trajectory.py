@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:20:12 2026
+
+@author: tang
+"""
+
+import numpy as np
+from core.trajectory import build_quality_pyramid, query_quality
+
+
+def make_trajectory(tmp_path, frames=10000, parts=4):
+    rng = np.random.default_rng(0)
+    trajectory = np.empty((frames, parts, 3), dtype=np.float32)
+    trajectory[:, :, :2] = np.cumsum(rng.normal(0, 1, (frames, parts, 2)), axis=0)
+    trajectory[:, :, 2] = rng.uniform(0.8, 1.0, (frames, parts))
+    path = str(tmp_path / 'video.npy')
+    np.save(path, trajectory)
+    return path, trajectory
+
+
+def brute_force(trajectory, start, end, columns):
+    likelihood = trajectory[:, :, 2]
+    edges = start + (np.arange(columns + 1) * (end - start) / columns).astype(np.int64)
+    return np.stack([likelihood[a:b].min(axis=0) for a, b in zip(edges[:-1], edges[1:])])
+
+
+def test_dip_is_seen_by_every_column_it_falls_in(tmp_path):
+    path, trajectory = make_trajectory(tmp_path)
+    pyramid = build_quality_pyramid(path)
+    for frame in (100, 2047, 5001):
+        dipped = trajectory.copy()
+        dipped[frame, 1, 2] = 0.01
+        np.save(path, dipped)
+        pyramid = build_quality_pyramid(path)
+        for start, end, columns in [(0, 10000, 37), (0, 10000, 600), (90, 7333, 123), (1, 9999, 9998)]:
+            lo, mean, hi, edges = query_quality(pyramid, start, end, columns)
+            column = np.searchsorted(edges, frame, side='right') - 1
+            if start <= frame < end:
+                assert lo[column, 1, 0] == np.float32(0.01)
+            # a column never reports less than its own frames hold
+            assert (lo[:, :, 0] <= brute_force(dipped, start, end, columns) + 1e-6).all()
+
+
+def test_whole_range_matches_brute_force_at_level0(tmp_path):
+    path, trajectory = make_trajectory(tmp_path, frames=500)
+    pyramid = build_quality_pyramid(path, min_bins=1024)
+    lo, mean, hi, edges = query_quality(pyramid, 0, 500, 500)
+    assert np.allclose(lo[:, :, 0], trajectory[:, :, 2])
+    assert np.allclose(mean[:, :, 0], trajectory[:, :, 2])
+    lo, mean, hi, edges = query_quality(pyramid, 0, 500, 7)
+    assert np.allclose(lo[:, :, 0], brute_force(trajectory, 0, 500, 7))
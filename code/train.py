@@ -7,18 +7,35 @@ Created on Mon Jan  8 18:49:52 2024
 
 import warnings
 warnings.filterwarnings('ignore')
-from core.train import train
 from core.data_aug import data_augmentation
 import yaml
 from config.config_training import configuration
 import numpy as np
 import argparse
+import os
+import contextlib
+from core.tf_runtime import add_runtime_arguments, runtime_options, configure_runtime, describe_runtime
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='argparse testing')
     parser.add_argument('--config', type=str, default = 'config.yaml')
     parser.add_argument('--config_predict', type=str, default = 'config_predict.yaml')
+    parser.add_argument('--workers', type=int, default = 0, help='threads preparing training batches in parallel, passed to model.fit (0: as train() sets it)')
+    parser.add_argument('--processes', type=int, default = 0, help='worker processes building training batches into shared memory, instead of --workers threads; batches are seeded from shuffle_num (needs fork: Linux/macOS)')
+    parser.add_argument('--aug_cache', type=str, default = None, help='store the first --aug_epochs augmented epochs under this directory and replay them, in this run and in later runs with the same data, augmentation and shuffle_num')
+    parser.add_argument('--aug_epochs', type=int, default = 10)
+    parser.add_argument('--aug_budget_gb', type=float, default = 50, help='least recently used caches under --aug_cache are deleted beyond this size')
+    parser.add_argument('--image_cache', type=str, default = None, help='keep the decoded training images under this directory, so that later epochs and runs do not decode them again')
+    parser.add_argument('--val_cache_mb', type=float, default = 1024, help='memory for the validation batches, built once instead of at every epoch (0: off)')
+    parser.add_argument('--resume', action='store_true', help='continue an interrupted run from its last epoch checkpoint')
+    parser.add_argument('--finetune', type=str, nargs='?', const='', default = None, help='fine-tune from this checkpoint (default: model_path of config_predict.yaml) instead of training from scratch')
+    parser.add_argument('--finetune_epochs', type=int, default = 30)
+    parser.add_argument('--oversample', type=int, default = 4, help='how often frames labelled since the last training are repeated per fine-tuning epoch')
+    parser.add_argument('--telemetry', type=str, default = None, help='write per-step data wait / compute timings (JSONL and TensorBoard) under this directory')
+    add_runtime_arguments(parser)
     args = parser.parse_args()
+    if args.workers > 0 and args.processes > 0:
+        parser.error('--workers and --processes are alternatives, set one of them')
     json_file = args.config
     # print(json_file)
     json_file_predict = args.config_predict
@@ -28,6 +45,19 @@ if __name__ == '__main__':
         result = yaml.load(f.read(), Loader=yaml.FullLoader)
     IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts, early_stop,centre, num_classes = configuration(result)
     print(result)
+    # TensorFlow settings have to be in place before core.train builds the graph
+    runtime = configure_runtime(runtime_options(result, args))
+    print('\nRuntime: ' + describe_runtime(runtime))
+    # multi-worker data parallel training, TF_CONFIG is set by distributed_train.py
+    strategy, worker_index, num_workers = None, 0, 1
+    if 'TF_CONFIG' in os.environ:
+        import json
+        import tensorflow as tf
+        tf_config = json.loads(os.environ['TF_CONFIG'])
+        worker_index, num_workers = tf_config['task']['index'], len(tf_config['cluster']['worker'])
+        strategy = tf.distribute.MultiWorkerMirroredStrategy()
+        print(f'\nWorker {worker_index} of {num_workers}, global batch size {BATCH_SIZE * num_workers}')
+    from core.train import train
     # centre = 4
     # num_classes = 1
     stride = 8
@@ -35,7 +65,136 @@ if __name__ == '__main__':
     # shuffle_num = 3
     save_path = '_' + str(shuffle_num)
     animal = 'singel_mouse'
-    model_rmse = train('ADPT',animal, save_path, IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts,data_augmentation(), early_stop, evaluate,num_classes,centre)
+
+    from core.dataset import read_annotations, dataset_fingerprint, key_indices, frame_keys, load_trained_frames, save_trained_frames, save_split, new_frame_indices, oversample, shard_keys
+    from core.checkpointing import model_dir, resume_dir, read_state, clear_state, TrainingCheckpoint
+    paths, joints = read_annotations(JSON, IMG_DIR)
+    trained = None
+    if args.finetune is not None:
+        if args.finetune:
+            initial_weight = args.finetune
+        else:
+            with open(json_file_predict, 'r', encoding='utf-8') as f:
+                initial_weight = yaml.load(f.read(), Loader=yaml.FullLoader)['model_path']
+        EPOCHS, WARMUP_EPOCHS = args.finetune_epochs, min(WARMUP_EPOCHS, 1)
+        trained = load_trained_frames(os.path.dirname(initial_weight))
+        if trained is None:
+            print('\nNo record of the frames ' + initial_weight + ' was trained on, all frames are weighted equally.')
+        print(f'\nFine-tuning from {initial_weight} for {EPOCHS} epochs.')
+
+    checkpoint_dir = resume_dir(animal, save_path)
+    start_epoch = 0
+    if args.resume:
+        state = read_state(checkpoint_dir)
+        if state is None:
+            print('\nNothing to resume in ' + checkpoint_dir + ', starting from scratch.')
+        elif state['epoch'] >= EPOCHS:
+            raise SystemExit(f"The run in {checkpoint_dir} already finished {state['epoch']} epochs.")
+        else:
+            start_epoch = state['epoch']
+            print(f'\nResuming at epoch {start_epoch} of {EPOCHS}.')
+    else:
+        clear_state(checkpoint_dir)
+    callbacks = [TrainingCheckpoint(checkpoint_dir, EPOCHS, restore=start_epoch > 0)]
+
+    if args.telemetry:
+        from datetime import datetime
+        from core.telemetry import StepTelemetry
+        run_name = datetime.now().strftime('%Y%m%d_%H%M%S') + save_path
+        if strategy is not None:
+            run_name += f'_worker{worker_index}'
+        telemetry = StepTelemetry(os.path.join(args.telemetry, run_name), BATCH_SIZE)
+        callbacks.append(telemetry)
+
+    # the batches come from train()'s own keras Sequence, a class local to the compiled module:
+    # it cannot be pickled into spawned processes, but forked ones inherit it
+    if args.processes > 0:
+        from core.loader import ProcessLoader, fork_available
+        if not fork_available():
+            print(f'\nWorker processes need the fork start method, not available on this platform: {args.processes} threads are used instead.')
+            args.workers, args.processes = args.processes, 0
+    fit_kwargs = {}
+    if args.workers > 0:
+        fit_kwargs = {'workers': args.workers, 'use_multiprocessing': False, 'max_queue_size': 2 * args.workers}
+
+    # train() splits the frames and builds the batches itself: both are read from its keras Sequences
+    keys = frame_keys(paths, joints)
+    fitted = {}
+    loaders, caches, validation = [], [], []
+    def on_fit(model, x, validation_data):
+        if not hasattr(x, 'image_keys'):
+            print('\nThe training data of train() has no image_keys, the trained frames are not recorded.')
+            return None
+        train_keys = list(x.image_keys)
+        fitted['train_keys'], fitted['train'] = train_keys, key_indices(train_keys, JSON, IMG_DIR)
+        fitted['test_keys'] = list(validation_data.image_keys) if hasattr(validation_data, 'image_keys') else None
+        fitted['test'] = None if fitted['test_keys'] is None else key_indices(fitted['test_keys'], JSON, IMG_DIR)
+        unmatched = sum(i is None for i in fitted['train'] + (fitted['test'] or []))
+        if unmatched:
+            print(f'\n{unmatched} training/validation images do not match {JSON}.')
+        if trained is not None:
+            new_idx = set(new_frame_indices(paths, joints, [i for i in fitted['train'] if i is not None], trained))
+            if new_idx:
+                # the Sequence draws its batches from image_keys, reshuffled at every epoch end
+                x.image_keys = oversample(x.image_keys, fitted['train'], new_idx, args.oversample)
+                x.on_epoch_end()
+            print(f'\n{len(new_idx)} new frames, repeated {args.oversample}x per epoch.')
+        if strategy is not None:
+            # every worker builds the batches of its own shard only, gradients are all-reduced by the strategy
+            x.image_keys = shard_keys(x.image_keys, worker_index, num_workers)
+            x.on_epoch_end()
+        extra, fed_keys = {}, list(x.image_keys)
+        if args.val_cache_mb > 0 and hasattr(validation_data, 'image_keys'):
+            from core.loader import ValidationCache
+            validation.append(ValidationCache(validation_data, int(args.val_cache_mb * 2 ** 20)))
+            extra['validation_data'] = validation[-1]
+        if args.processes > 0:
+            # fit asks for the batches in order, the Sequence reshuffles its keys itself at every epoch end
+            loaders.append(ProcessLoader(x, args.processes, shuffle_num))
+            x = extra['x'] = loaders[-1]
+            extra['shuffle'] = False
+        if args.aug_cache:
+            from core.aug_cache import EpochCache, cache_key
+            key = cache_key(dataset_fingerprint(JSON, paths), result, fed_keys, len(x))
+            caches.append(EpochCache(x, os.path.join(args.aug_cache, key), args.aug_epochs, start_epoch, int(args.aug_budget_gb * 2 ** 30)))
+            extra['x'] = caches[-1]
+        if args.telemetry:
+            # step k is matched to batch k, the Sequence reshuffles its keys itself at every epoch end
+            telemetry.watch(extra.get('x', x))
+            extra['shuffle'] = False
+        if strategy is not None:
+            # fed per worker as they are: Keras would shard the Sequence again by data and keep 1/num_workers of every batch
+            from core.loader import distribute_sequence
+            extra['x'], extra['steps_per_epoch'] = distribute_sequence(strategy, extra.get('x', x))
+        return extra
+
+    from core.fit_hooks import FitHook
+    # train() creates the model and the optimizer, under the scope they are mirrored across the workers
+    scope = strategy.scope() if strategy is not None else contextlib.nullcontext()
+    image_cache = contextlib.nullcontext()
+    if args.image_cache:
+        from core.image_cache import ImageCache
+        # keyed by the annotations and the images, a changed dataset gets a new directory
+        image_cache = ImageCache(os.path.join(args.image_cache, dataset_fingerprint(JSON, paths)[:16]), paths)
+    try:
+        with scope, image_cache, FitHook(callbacks, initial_epoch=start_epoch, fit_kwargs=fit_kwargs, on_fit=on_fit):
+            model_rmse = train('ADPT',animal, save_path, IMG_SIZE_H_ori, IMG_SIZE_W_ori, global_scale, IMG_SIZE_H, IMG_SIZE_W, BATCH_SIZE, variation, delta, initial_learning_rate, alpha,EPOCHS, WARMUP_EPOCHS, NUM_KEYPOINT, NUM_KEYPOINTS, shuffle_num, TrainingFraction, Tranfer_LR, channels,IMG_DIR, JSON, kp_con, initial_weight, bodyparts,data_augmentation(result.get('augmentation')), early_stop, evaluate,num_classes,centre)
+    finally:
+        for loader in loaders:
+            loader.close()
+    if args.image_cache:
+        print('\n' + image_cache.summary())
+    for cache in validation:
+        if not cache.deterministic:
+            print('\nThe validation batches of train() are not the same at every pass, they were not cached.')
+        else:
+            print(f'\nValidation cache: {len(cache.batches)} of {len(cache)} batches kept ({cache.nbytes / 2 ** 20:.0f} MB), {cache.hits} batches reused.')
+    for cache in caches:
+        print(f'\nAugmented epoch cache {cache.directory}: {cache.hits} batches replayed, {cache.misses} augmented and stored.')
+    if 'train' in fitted:
+        # the split of this shuffle_num, as train() made it, for crossval.py and quantize.py
+        save_split(model_dir(animal, save_path), fitted['train_keys'], fitted['train'], fitted['test_keys'], fitted['test'])
+        save_trained_frames(model_dir(animal, save_path), [keys[i] for i in fitted['train'] if i is not None])
     
     for idx, bodypart in enumerate(bodyparts):
         print('RMSE (' + bodypart + '): ', model_rmse[0][idx])